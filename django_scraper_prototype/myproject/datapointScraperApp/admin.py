@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Datapoint, DataGroup, Organization, UserProfile
+from .models import Datapoint, DataGroup, Organization, OrganizationStatusCount, ScrapeRun, UserProfile
 
 @admin.register(Datapoint)
 class DatapointAdmin(admin.ModelAdmin):
@@ -20,4 +20,16 @@ class OrganizationAdmin(admin.ModelAdmin):
     search_fields = ('name',)
     ordering = ('name',)
 
+@admin.register(OrganizationStatusCount)
+class OrganizationStatusCountAdmin(admin.ModelAdmin):
+    list_display = ('organization', 'status', 'count', 'updated_at')
+    list_filter = ('status',)
+    ordering = ('organization__name', 'status')
+
+@admin.register(ScrapeRun)
+class ScrapeRunAdmin(admin.ModelAdmin):
+    list_display = ('__str__', 'status', 'total', 'done', 'failed', 'skipped', 'started_by', 'created_at', 'finished_at')
+    list_filter = ('status', 'scope')
+    ordering = ('-created_at',)
+
 admin.site.register(UserProfile)
\ No newline at end of file
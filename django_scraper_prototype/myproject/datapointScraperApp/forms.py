@@ -22,6 +22,7 @@ class DatapointForm(forms.ModelForm):
             'data_group',
             'organization',
             'status',
+            'refresh_interval',
         ]
         widgets = {
             'name': forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'Datapoint Name'}),
@@ -32,6 +33,10 @@ class DatapointForm(forms.ModelForm):
             'data_group': forms.Select(attrs={'class': 'form-select'}),
             'organization': forms.Select(attrs={'class': 'form-select'}),
             'status': forms.Select(attrs={'class': 'form-select'}),
+            'refresh_interval': forms.NumberInput(attrs={'class': 'form-control', 'min': 60, 'step': 60}),
+        }
+        labels = {
+            'refresh_interval': 'Refresh interval (seconds)',
         }
 
 class TestXPathForm(forms.Form):
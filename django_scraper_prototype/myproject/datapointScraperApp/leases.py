@@ -0,0 +1,168 @@
+import logging
+import os
+import random
+import socket
+import threading
+import time
+import uuid
+from datetime import timedelta
+
+from django.db import OperationalError, connection
+from django.db.models import Q
+from django.db.models.functions import Mod
+from django.utils import timezone
+
+from .models import Datapoint, url_host_hash
+
+logger = logging.getLogger(__name__)
+
+
+def new_owner():
+    """
+    Returns a lease owner name unique to this process: host, pid and a random suffix.
+    """
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+def parse_shard(value):
+    """
+    Parses "i/n" into (i, n), for run_scraper --shard.
+    """
+    try:
+        index, count = (int(part) for part in value.split('/'))
+    except ValueError:
+        raise ValueError(f"Invalid shard {value!r}; expected i/n, e.g. 0/4.")
+    if count < 1 or not 0 <= index < count:
+        raise ValueError(f"Invalid shard {value!r}; i must be in 0..n-1.")
+    return index, count
+
+
+def in_shard(queryset, shard):
+    """
+    Narrows `queryset` to the Datapoints of shard (i, n): those whose URL
+    host hashes to i modulo n, so all pages of a host stay on one machine.
+    """
+    if shard is None:
+        return queryset
+    index, count = shard
+    return queryset.annotate(shard=Mod('host_hash', count)).filter(shard=index)
+
+
+def rebuild_host_hashes(batch_size=2000):
+    """
+    Recomputes host_hash from the URL for every Datapoint whose stored hash
+    is stale, e.g. after bulk_create or QuerySet.update(url=...), which skip
+    Datapoint.save(). Returns the number of Datapoints fixed.
+    """
+    fixed, batch = 0, []
+    rows = Datapoint.objects.order_by().values_list('pk', 'url', 'host_hash').iterator(chunk_size=batch_size)
+    for pk, url, host_hash in rows:
+        expected = url_host_hash(url)
+        if host_hash != expected:
+            batch.append(Datapoint(pk=pk, host_hash=expected))
+        if len(batch) >= batch_size:
+            Datapoint.objects.bulk_update(batch, ['host_hash'])
+            fixed += len(batch)
+            batch = []
+    if batch:
+        Datapoint.objects.bulk_update(batch, ['host_hash'])
+        fixed += len(batch)
+    logger.info(f"Fixed the host hash of {fixed} Datapoint(s).")
+    return fixed
+
+
+def unleased(now):
+    return Q(lease_expires_at__isnull=True) | Q(lease_expires_at__lt=now)
+
+
+def claim(queryset, owner, limit, lease_seconds, retries=5, backoff=0.1):
+    """
+    Leases up to `limit` Datapoints of `queryset` that nobody holds a live
+    lease on to `owner`, oldest due first, and returns their ids.
+
+    The lease is taken with a conditional UPDATE, which the database applies
+    to each row atomically, so when several processes race for the same
+    rows every row ends up with exactly one of them. Returns [] only when
+    no unleased Datapoint is left.
+
+    If SQLite reports the database locked (another process held the write
+    lock past the busy timeout), waits `backoff` seconds, doubling each
+    time, and tries again up to `retries` times before raising.
+    """
+    for attempt in range(retries + 1):
+        try:
+            return _claim(queryset, owner, limit, lease_seconds)
+        except OperationalError as e:
+            # Inside a transaction the failed statement has spoiled it; only its owner can retry
+            if attempt == retries or "locked" not in str(e) or connection.in_atomic_block:
+                raise
+            delay = backoff * 2 ** attempt * random.uniform(0.5, 1.5)
+            logger.warning(f"Claiming Datapoints for {owner} failed ({e}); retrying in {delay:.2f}s")
+            time.sleep(delay)
+
+
+def _claim(queryset, owner, limit, lease_seconds):
+    while True:
+        now = timezone.now()
+        candidates = list(
+            queryset.filter(unleased(now)).order_by('next_due_at').values_list('pk', flat=True)[:limit]
+        )
+        if not candidates:
+            return []
+        Datapoint.objects.filter(unleased(now), pk__in=candidates).update(
+            lease_owner=owner,
+            lease_expires_at=now + timedelta(seconds=lease_seconds),
+        )
+        claimed = list(Datapoint.objects.filter(pk__in=candidates, lease_owner=owner).values_list('pk', flat=True))
+        # Losing every candidate to other processes does not mean there is nothing left
+        if claimed:
+            return claimed
+
+
+def release(owner, pks=None):
+    """
+    Gives up the leases of `owner`, on `pks` or on everything it holds.
+    """
+    leased = Datapoint.objects.filter(lease_owner=owner)
+    if pks is not None:
+        leased = leased.filter(pk__in=pks)
+    return leased.update(lease_owner=None, lease_expires_at=None)
+
+
+class Heartbeat:
+    """
+    Extends every lease held by `owner` every `lease_seconds / 3` while in
+    use, so leases only expire once the process holding them is gone. Use as
+    a context manager; leases still held on exit are released.
+    """
+
+    def __init__(self, owner, lease_seconds):
+        self.owner = owner
+        self.lease_seconds = lease_seconds
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="lease-heartbeat", daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+        release(self.owner)
+
+    def beat(self):
+        expires_at = timezone.now() + timedelta(seconds=self.lease_seconds)
+        return Datapoint.objects.filter(lease_owner=self.owner).update(lease_expires_at=expires_at)
+
+    def _run(self):
+        try:
+            while not self._stop.wait(self.lease_seconds / 3):
+                try:
+                    self.beat()
+                except Exception as e:
+                    # Try again on the next beat; the lease outlives one missed beat
+                    logger.warning(f"Lease heartbeat of {self.owner} failed: {e}")
+        finally:
+            # Database connections are per thread
+            connection.close()
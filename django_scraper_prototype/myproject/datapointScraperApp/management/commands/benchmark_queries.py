@@ -0,0 +1,222 @@
+# datapointScraperApp/management/commands/benchmark_queries.py
+
+import json
+import random
+import statistics
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from datapointScraperApp.models import Datapoint, Organization, url_host_hash
+
+# Share of generated Datapoints per status, roughly what a live table looks like
+STATUS_WEIGHTS = {
+    Datapoint.STATUS_AUTO: 70,
+    Datapoint.STATUS_VERIFY: 15,
+    Datapoint.STATUS_FIX: 10,
+    Datapoint.STATUS_MANUAL: 5,
+}
+PAGE_SIZE = 20
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmarks the list, dashboard and scrape-selection queries on a generated table of '
+        'Datapoints, without and with the Datapoint indexes, and prints each query plan and its latency. '
+        'Everything runs in one transaction that is rolled back, so the database is left unchanged.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1_000_000, help='Datapoints to generate (default: 1,000,000).')
+        parser.add_argument('--organizations', type=int, default=50, help='Organizations the Datapoints are spread over.')
+        parser.add_argument('--repeat', type=int, default=10, help='Timed runs of each query.')
+        parser.add_argument('--batch-size', type=int, default=10_000, help='Rows per INSERT while generating.')
+        parser.add_argument('--seed', type=int, default=0, help='Seed for the generated data.')
+        parser.add_argument('--output', help='Also write the results to this JSON file.')
+
+    def handle(self, *args, **options):
+        if not connection.features.can_rollback_ddl:
+            raise CommandError(
+                f'The {connection.vendor} backend cannot roll back schema changes, so the indexes '
+                f'cannot be dropped and restored safely. Run this against PostgreSQL or SQLite.'
+            )
+        if options['rows'] < 1 or options['organizations'] < 1 or options['repeat'] < 1:
+            raise CommandError('--rows, --organizations and --repeat must be at least 1.')
+
+        results = {}
+        with transaction.atomic():
+            sample = self._generate(options)
+            queries = self._queries(sample)
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT COUNT(*) FROM ' + connection.ops.quote_name(Datapoint._meta.db_table))
+                total = cursor.fetchone()[0]
+            self.stdout.write(f'Datapoint table holds {total:,} rows.\n')
+
+            self._set_indexes(False)
+            results['before'] = self._measure(queries, options['repeat'])
+            self._set_indexes(True)
+            results['after'] = self._measure(queries, options['repeat'])
+            transaction.set_rollback(True)
+
+        self._report(queries, results)
+        if options['output']:
+            report = {
+                'vendor': connection.vendor,
+                'rows': total,
+                'repeat': options['repeat'],
+                'queries': {
+                    name: {phase: results[phase][name] for phase in ('before', 'after')}
+                    for name, _, _ in queries
+                },
+            }
+            with open(options['output'], 'w') as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write(f"Results written to {options['output']}.")
+        self.stdout.write(self.style.SUCCESS('Benchmark finished; generated data rolled back.'))
+
+    def _generate(self, options):
+        rng = random.Random(options['seed'])
+        prefix = uuid.uuid4().hex[:8]
+        organizations = Organization.objects.bulk_create(
+            Organization(name=f'benchmark-{prefix}-{i}') for i in range(options['organizations'])
+        )
+        organization_ids = [organization.id for organization in organizations]
+        statuses = list(STATUS_WEIGHTS)
+        weights = list(STATUS_WEIGHTS.values())
+        now = timezone.now()
+        rows, batch_size = options['rows'], options['batch_size']
+
+        self.stdout.write(f'Generating {rows:,} Datapoints over {len(organization_ids)} organizations...')
+        started = time.perf_counter()
+        sample = None
+        with _explicit_created_at():
+            for start in range(0, rows, batch_size):
+                batch = []
+                for i in range(start, min(start + batch_size, rows)):
+                    url = f'https://site{rng.randrange(2000)}.example.com/page/{i}'
+                    batch.append(Datapoint(
+                        name=f'Datapoint {i}',
+                        url=url,
+                        # bulk_create skips Datapoint.save(), which sets it otherwise
+                        host_hash=url_host_hash(url),
+                        xpath=f"//div[@id='value-{rng.randrange(10)}']",
+                        data_type='STRING',
+                        current_unverified_data=f'value {i}',
+                        status=rng.choices(statuses, weights)[0],
+                        organization_id=rng.choice(organization_ids),
+                        created_at=now - timedelta(seconds=rng.randrange(365 * 24 * 3600)),
+                    ))
+                Datapoint.objects.bulk_create(batch)
+                if sample is None:
+                    sample = batch[len(batch) // 2]
+                if options['verbosity'] > 1:
+                    self.stdout.write(f'  {start + len(batch):,} rows')
+        self.stdout.write(f'Generated in {time.perf_counter() - started:.1f}s.')
+        return {'organization_id': organization_ids[len(organization_ids) // 2], 'url': sample.url, 'xpath': sample.xpath}
+
+    def _queries(self, sample):
+        """
+        The access paths the indexes are meant for, as (name, description, queryset).
+        """
+        organization_id = sample['organization_id']
+        return [
+            ('list_org_status', 'List view: one organization and status, first page',
+             Datapoint.objects.filter(organization_id=organization_id, status=Datapoint.STATUS_VERIFY).order_by('-created_at', 'id')[:PAGE_SIZE]),
+            # The paginator's COUNT(*), as a queryset so it can be explained too
+            ('list_org_status_count', 'List view: row count for the same filter',
+             Datapoint.objects.filter(organization_id=organization_id, status=Datapoint.STATUS_VERIFY)
+             .order_by().values('status').annotate(total=Count('id'))),
+            ('list_org', 'List view: one organization, first page',
+             Datapoint.objects.filter(organization_id=organization_id).order_by('-created_at', 'id')[:PAGE_SIZE]),
+            ('list_status', 'List view: one status, first page',
+             Datapoint.objects.filter(status=Datapoint.STATUS_FIX).order_by('-created_at', 'id')[:PAGE_SIZE]),
+            ('list_all', 'List view: no filters, first page',
+             Datapoint.objects.order_by('-created_at', 'id')[:PAGE_SIZE]),
+            ('dashboard_counts', 'Dashboard: Datapoints per organization and status',
+             Organization.objects.annotate(
+                 auto_count=Count('datapoints', filter=Q(datapoints__status=Datapoint.STATUS_AUTO)),
+                 manual_count=Count('datapoints', filter=Q(datapoints__status=Datapoint.STATUS_MANUAL)),
+                 verify_count=Count('datapoints', filter=Q(datapoints__status=Datapoint.STATUS_VERIFY)),
+                 fix_count=Count('datapoints', filter=Q(datapoints__status=Datapoint.STATUS_FIX)),
+             )),
+            # Scraping does not care about order, so these skip Meta.ordering
+            ('scrape_selection', 'run_scraper: AUTO Datapoints',
+             Datapoint.objects.filter(status=Datapoint.STATUS_AUTO).order_by().values_list('id', flat=True)),
+            ('scrape_all_selection', 'Scrape all: AUTO, VERIFY and FIX Datapoints',
+             Datapoint.objects.filter(status__in=[Datapoint.STATUS_AUTO, Datapoint.STATUS_VERIFY, Datapoint.STATUS_FIX])
+             .order_by().values_list('id', flat=True)),
+            ('lookup_url_xpath', 'Lookup by (url, xpath)',
+             Datapoint.objects.filter(url=sample['url'], xpath=sample['xpath'])),
+        ]
+
+    def _set_indexes(self, present):
+        """
+        Drops or recreates the indexes declared in Datapoint.Meta, then
+        refreshes the planner statistics.
+        """
+        # Used without entering it: the SQLite editor refuses to open inside a
+        # transaction, but adding and dropping an index needs no table rebuild
+        editor = connection.schema_editor()
+        editor.deferred_sql = []
+        for index in Datapoint._meta.indexes:
+            if present:
+                editor.add_index(Datapoint, index)
+            else:
+                editor.remove_index(Datapoint, index)
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE ' + connection.ops.quote_name(Datapoint._meta.db_table))
+
+    def _measure(self, queries, repeat):
+        measured = {}
+        for name, _, queryset in queries:
+            plan = queryset.explain()
+            list(queryset.all())  # warm the page cache so every phase starts alike
+            timings = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                list(queryset.all())
+                timings.append((time.perf_counter() - started) * 1000)
+            measured[name] = {
+                'plan': plan,
+                'p50_ms': round(statistics.median(timings), 3),
+                'p95_ms': round(_percentile(timings, 95), 3),
+                'mean_ms': round(statistics.fmean(timings), 3),
+            }
+        return measured
+
+    def _report(self, queries, results):
+        for name, description, _ in queries:
+            self.stdout.write(self.style.MIGRATE_HEADING(f'{name}: {description}'))
+            for phase, label in (('before', 'without indexes'), ('after', 'with indexes')):
+                result = results[phase][name]
+                self.stdout.write(
+                    f"  {label:<16} p50 {result['p50_ms']:>10.3f} ms   p95 {result['p95_ms']:>10.3f} ms"
+                )
+                for line in result['plan'].splitlines():
+                    self.stdout.write(f'      {line}')
+            before, after = results['before'][name]['p50_ms'], results['after'][name]['p50_ms']
+            if after > 0:
+                self.stdout.write(f'  speedup (p50)    {before / after:.1f}x\n')
+
+
+@contextmanager
+def _explicit_created_at():
+    # auto_now_add would stamp every generated row with the same time
+    field = Datapoint._meta.get_field('created_at')
+    field.auto_now_add = False
+    try:
+        yield
+    finally:
+        field.auto_now_add = True
+
+
+def _percentile(values, percent):
+    if len(values) < 2:
+        return values[0]
+    return statistics.quantiles(values, n=100, method='inclusive')[percent - 1]
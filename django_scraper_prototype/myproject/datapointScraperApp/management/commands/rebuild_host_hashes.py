@@ -0,0 +1,11 @@
+# datapointScraperApp/management/commands/rebuild_host_hashes.py
+
+from django.core.management.base import BaseCommand
+from datapointScraperApp.leases import rebuild_host_hashes
+
+class Command(BaseCommand):
+    help = 'Recomputes the URL host hash run_scraper --shard splits Datapoints by, where it is stale.'
+
+    def handle(self, *args, **options):
+        fixed = rebuild_host_hashes()
+        self.stdout.write(self.style.SUCCESS(f'Fixed the host hash of {fixed} Datapoint(s).'))
@@ -0,0 +1,11 @@
+# datapointScraperApp/management/commands/rebuild_status_counts.py
+
+from django.core.management.base import BaseCommand
+from datapointScraperApp.status_counts import rebuild_status_counts
+
+class Command(BaseCommand):
+    help = 'Recounts the per-organization Datapoint status counters shown on the dashboard.'
+
+    def handle(self, *args, **options):
+        counters = rebuild_status_counts()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {counters} organization status counters.'))
@@ -1,28 +1,113 @@
 # datapointScraperApp/management/commands/run_scraper.py
 
-from django.core.management.base import BaseCommand
+import signal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from datapointScraperApp.leases import Heartbeat, claim, in_shard, new_owner, parse_shard, release
 from datapointScraperApp.models import Datapoint
-from datapointScraperApp.scraper.scraper import update_datapoint
+from datapointScraperApp.scheduler import DueScheduler
+from datapointScraperApp.scraper.scraper import UpdateSummary, update_datapoints
 
 class Command(BaseCommand):
-    help = 'Runs the scraper to update Datapoint instances.'
+    help = (
+        'Runs the scraper to update Datapoint instances: once over every AUTO Datapoint, '
+        'or with --daemon continuously, scraping each one when its refresh interval is up. '
+        'Several instances can run against the same database: each Datapoint is leased to '
+        'one instance while it is scraped, and --shard splits the Datapoints by URL host.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--daemon', action='store_true', help='Keep running and scrape Datapoints as they come due.')
+        parser.add_argument('--workers', type=int, default=4, help='Pages rendered in parallel, each worker with its own browser.')
+        parser.add_argument('--executor', choices=['thread', 'process'], default='thread', help='Run the workers as threads or processes.')
+        parser.add_argument('--batch-size', type=int, default=50, help='Datapoints per batch: rendered in one browser and written back together '
+                                                                       '(and, with --daemon, fetched per query).')
+        parser.add_argument('--shard', help='Only scrape shard i of n (e.g. 0/4): Datapoints whose URL host hashes to i modulo n.')
+        parser.add_argument('--lease', type=float, default=300.0, help='Seconds a claimed Datapoint stays leased without a heartbeat, '
+                                                                      'i.e. how soon others take over from a crashed instance.')
+        parser.add_argument('--tick', type=float, default=30.0, help='Daemon: seconds of due Datapoints looked ahead per query, and the '
+                                                                     'longest a due Datapoint waits for a full dispatch (batch size x workers).')
+        parser.add_argument('--jitter', type=float, default=0.1, help='Random share of the refresh interval added or removed when scheduling the next scrape.')
 
     def handle(self, *args, **options):
+        self.options = options
+        try:
+            shard = parse_shard(options['shard']) if options['shard'] else None
+        except ValueError as e:
+            raise CommandError(str(e))
+        self.owner = new_owner()
+        datapoints = in_shard(Datapoint.objects.all(), shard)
+        if shard is not None:
+            self.stdout.write(f"Scraping shard {shard[0]}/{shard[1]} as {self.owner}.")
+
+        # Keeps the leases of this instance alive until it exits
+        with Heartbeat(self.owner, options['lease']):
+            if options['daemon']:
+                return self.run_daemon(datapoints, options)
+            self.run_once(datapoints, options)
+
+    def run_once(self, datapoints, options):
         self.stdout.write(self.style.SUCCESS('Starting scraper...'))
 
         # Fetch all Datapoints with status 'AUTO'
-        datapoints = Datapoint.objects.filter(status='AUTO')
+        # Unordered, so the dp_status_created_idx index is read without a sort
+        datapoints = datapoints.filter(status='AUTO').order_by()
 
         if not datapoints.exists():
             self.stdout.write(self.style.WARNING('No Datapoints with status AUTO found.'))
             return
 
-        for datapoint in datapoints:
-            self.stdout.write(f"Updating Datapoint: {datapoint.name} (ID: {datapoint.id})")
+        # Claim a round of batches at a time, so other instances can take the rest.
+        # Datapoints whose data is unchanged stay AUTO, so only those not written
+        # since this pass started are claimed: failed ones leave AUTO for FIX,
+        # scraped ones get a newer last_updated, and each is visited once.
+        started = timezone.now()
+        datapoints = datapoints.filter(last_updated__lt=started)
+        total = UpdateSummary()
+        while True:
+            claimed = claim(datapoints, self.owner, options['batch_size'] * options['workers'], options['lease'])
+            if not claimed:
+                break
             try:
-                update_datapoint(datapoint)
-                self.stdout.write(self.style.SUCCESS(f"Successfully updated Datapoint ID: {datapoint.id}"))
-            except Exception as e:
-                self.stdout.write(self.style.ERROR(f"Error updating Datapoint ID: {datapoint.id} - {e}"))
-
+                total.add(self.scrape(Datapoint.objects.filter(pk__in=claimed), progress=True))
+            finally:
+                release(self.owner, claimed)
+        self.stdout.write(self.style.SUCCESS(str(total)))
         self.stdout.write(self.style.SUCCESS('Scraper finished successfully.'))
+
+    def run_daemon(self, datapoints, options):
+        scheduler = DueScheduler(
+            self.scrape,
+            self.owner,
+            queryset=datapoints,
+            batch_size=options['batch_size'],
+            tick=options['tick'],
+            jitter=options['jitter'],
+            lease_seconds=options['lease'],
+            # Dispatches big enough to give every worker a batch
+            workers=options['workers'],
+        )
+        # Finish the batch being scraped, then exit
+        signal.signal(signal.SIGTERM, lambda *args: scheduler.stop())
+        signal.signal(signal.SIGINT, lambda *args: scheduler.stop())
+        self.stdout.write(self.style.SUCCESS('Starting scraper daemon...'))
+        scheduler.run()
+        self.stdout.write(self.style.SUCCESS(f'Scraper daemon stopped after {scheduler.dispatched} Datapoint(s).'))
+
+    def scrape(self, datapoints, progress=False):
+        def report(summary):
+            self.stdout.write(f"  {summary.datapoints} Datapoint(s) done: {summary.updated} updated, {summary.failed} failed")
+
+        summary = update_datapoints(
+            datapoints,
+            workers=self.options['workers'],
+            batch_size=self.options['batch_size'],
+            executor=self.options['executor'],
+            on_batch=report if progress else None,
+            owner=self.owner,
+            jitter=self.options['jitter'],
+        )
+        if not progress:
+            self.stdout.write(str(summary))
+        return summary
@@ -0,0 +1,125 @@
+import threading
+import time
+from contextlib import contextmanager
+
+# Seconds; a batch can take from a fraction of a second up to several minutes
+DURATION_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+BATCH_SIZE_BUCKETS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _format_labels(names, values, extra=""):
+    pairs = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            values = sorted(self._values.items())
+        for key, value in values:
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {value}"
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DURATION_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            # Per-bucket counts, then sum and count
+            entry = self._values.setdefault(key, [0] * len(self.buckets) + [0.0, 0])
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[i] += 1
+                    break
+            entry[-2] += value
+            entry[-1] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def samples(self):
+        with self._lock:
+            values = sorted((key, list(entry)) for key, entry in self._values.items())
+        for key, entry in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets, entry):
+                cumulative += count
+                le = 'le="' + ("+Inf" if bound == float("inf") else str(bound)) + '"'
+                yield f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(self.labelnames, key)} {entry[-2]}"
+            yield f"{self.name}_count{_format_labels(self.labelnames, key)} {entry[-1]}"
+
+
+SCRAPE_SECONDS = Histogram(
+    "datapoint_scrape_seconds",
+    "Duration of a scrape through the scraper service, by how results were fetched (stream or job).",
+    ("mode",),
+)
+WRITE_BACK_SECONDS = Histogram(
+    "datapoint_write_back_seconds",
+    "Time spent writing one chunk of scrape results to the database.",
+)
+BATCH_SIZE = Histogram(
+    "datapoint_scrape_batch_size",
+    "Datapoints sent to the scraper service per scrape.",
+    buckets=BATCH_SIZE_BUCKETS,
+)
+RESULTS = Counter(
+    "datapoint_scrape_results_total",
+    "Scrape results applied, by outcome: unchanged, changed, failed, skipped (site down) or unknown (no matching Datapoint).",
+    ("outcome",),
+)
+SERVICE_ERRORS = Counter(
+    "datapoint_scraper_service_errors_total",
+    "Scrapes that failed talking to the scraper service.",
+)
+
+METRICS = (SCRAPE_SECONDS, WRITE_BACK_SECONDS, BATCH_SIZE, RESULTS, SERVICE_ERRORS)
+
+
+def render():
+    """
+    Renders the metrics of this process in the Prometheus text format.
+    Each web server process keeps its own counts.
+    """
+    lines = []
+    for metric in METRICS:
+        lines.append(f"# HELP {metric.name} {metric.documentation}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        lines.extend(metric.samples())
+    return "\n".join(lines) + "\n"
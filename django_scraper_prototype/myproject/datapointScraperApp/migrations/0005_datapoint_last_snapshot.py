@@ -0,0 +1,18 @@
+# Generated by Django 5.1.2 on 2026-10-17 23:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('datapointScraperApp', '0004_userprofile_theme'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='datapoint',
+            name='last_snapshot',
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+    ]
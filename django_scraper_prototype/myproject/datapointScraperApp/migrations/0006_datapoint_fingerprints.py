@@ -0,0 +1,23 @@
+# Generated by Django 5.1.2 on 2026-10-17 23:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('datapointScraperApp', '0005_datapoint_last_snapshot'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='datapoint',
+            name='scraped_fingerprint',
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+        migrations.AddField(
+            model_name='datapoint',
+            name='verified_fingerprint',
+            field=models.CharField(blank=True, db_index=True, max_length=64, null=True),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.1.2 on 2026-10-17 23:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('datapointScraperApp', '0006_datapoint_fingerprints'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='datapoint',
+            index=models.Index(fields=['organization', 'status', '-created_at', 'id'], name='dp_org_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='datapoint',
+            index=models.Index(fields=['organization', '-created_at', 'id'], name='dp_org_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='datapoint',
+            index=models.Index(fields=['status', '-created_at', 'id'], name='dp_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='datapoint',
+            index=models.Index(fields=['-created_at', 'id'], name='dp_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='datapoint',
+            index=models.Index(fields=['url', 'xpath'], name='dp_url_xpath_idx'),
+        ),
+    ]
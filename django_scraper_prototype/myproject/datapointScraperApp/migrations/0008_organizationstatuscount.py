@@ -0,0 +1,41 @@
+# Generated by Django 5.1.2 on 2026-10-17 23:58
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def count_datapoints(apps, schema_editor):
+    Datapoint = apps.get_model('datapointScraperApp', 'Datapoint')
+    OrganizationStatusCount = apps.get_model('datapointScraperApp', 'OrganizationStatusCount')
+    rows = Datapoint.objects.order_by().values('organization', 'status').annotate(total=Count('id'))
+    OrganizationStatusCount.objects.bulk_create(
+        OrganizationStatusCount(organization_id=row['organization'], status=row['status'], count=row['total'])
+        for row in rows
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('datapointScraperApp', '0007_datapoint_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrganizationStatusCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('AUTO', 'Automated'), ('MANUAL', 'Manual'), ('VERIFY', 'Verification Required'), ('FIX', 'Fix Needed')], max_length=10)),
+                ('count', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('organization', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='status_counts', to='datapointScraperApp.organization')),
+            ],
+            options={
+                'verbose_name': 'Organization status count',
+                'verbose_name_plural': 'Organization status counts',
+                'constraints': [models.UniqueConstraint(fields=('organization', 'status'), name='unique_organization_status_count')],
+            },
+        ),
+        migrations.RunPython(count_datapoints, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.1.2 on 2026-10-18 01:12
+
+from datetime import timedelta
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def spread_due_times(apps, schema_editor):
+    # Existing Datapoints would all be due the moment the daemon starts;
+    # spread them over their first interval instead (by id, evenly)
+    Datapoint = apps.get_model('datapointScraperApp', 'Datapoint')
+    now = django.utils.timezone.now()
+    batch = []
+    for dp in Datapoint.objects.only('id', 'refresh_interval').iterator(chunk_size=2000):
+        offset = (dp.id * 0.6180339887) % 1
+        dp.next_due_at = now + timedelta(seconds=offset * dp.refresh_interval)
+        batch.append(dp)
+        if len(batch) >= 2000:
+            Datapoint.objects.bulk_update(batch, ['next_due_at'])
+            batch = []
+    Datapoint.objects.bulk_update(batch, ['next_due_at'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('datapointScraperApp', '0008_organizationstatuscount'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='datapoint',
+            name='next_due_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddField(
+            model_name='datapoint',
+            name='refresh_interval',
+            field=models.PositiveIntegerField(default=86400),
+        ),
+        migrations.AddIndex(
+            model_name='datapoint',
+            index=models.Index(fields=['status', 'next_due_at'], name='dp_status_due_idx'),
+        ),
+        migrations.RunPython(spread_due_times, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.1.2 on 2026-10-18 02:05
+
+import zlib
+from urllib.parse import urlsplit
+
+from django.db import migrations, models
+
+
+def hash_hosts(apps, schema_editor):
+    # Same as models.url_host_hash, which migrations should not import
+    Datapoint = apps.get_model('datapointScraperApp', 'Datapoint')
+    batch = []
+    for dp in Datapoint.objects.only('id', 'url').iterator(chunk_size=2000):
+        host = (urlsplit(dp.url).hostname or dp.url or '').lower()
+        dp.host_hash = zlib.crc32(host.encode()) & 0x7FFFFFFF
+        batch.append(dp)
+        if len(batch) >= 2000:
+            Datapoint.objects.bulk_update(batch, ['host_hash'])
+            batch = []
+    Datapoint.objects.bulk_update(batch, ['host_hash'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('datapointScraperApp', '0009_datapoint_schedule'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='datapoint',
+            name='host_hash',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='datapoint',
+            name='lease_expires_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='datapoint',
+            name='lease_owner',
+            field=models.CharField(blank=True, db_index=True, max_length=100, null=True),
+        ),
+        migrations.RunPython(hash_hosts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.1.2 on 2026-10-18 03:10
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('datapointScraperApp', '0010_datapoint_leases'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScrapeRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scope', models.CharField(choices=[('ALL', 'All Datapoints'), ('DATAGROUP', 'DataGroup'), ('ORGANIZATION', 'Organization')], default='ALL', max_length=12)),
+                ('status', models.CharField(choices=[('QUEUED', 'Queued'), ('RUNNING', 'Running'), ('DONE', 'Done'), ('FAILED', 'Failed')], default='QUEUED', max_length=10)),
+                ('total', models.IntegerField(default=0)),
+                ('done', models.IntegerField(default=0)),
+                ('failed', models.IntegerField(default=0)),
+                ('skipped', models.IntegerField(default=0)),
+                ('report', models.JSONField(blank=True, default=list)),
+                ('error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('data_group', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='scrape_runs', to='datapointScraperApp.datagroup')),
+                ('organization', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='scrape_runs', to='datapointScraperApp.organization')),
+                ('started_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='scrape_runs', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Scrape run',
+                'verbose_name_plural': 'Scrape runs',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
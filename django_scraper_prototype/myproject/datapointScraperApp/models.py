@@ -1,3 +1,6 @@
+import zlib
+from urllib.parse import urlsplit
+
 from django.db import models
 from django.utils import timezone
 
@@ -65,6 +68,14 @@ class DataGroup(models.Model):
     def __str__(self):
         return self.name
 
+def url_host_hash(url):
+    """
+    Stable hash of the URL's host, the same in every process and on every
+    machine (unlike hash()), used to shard run_scraper by host.
+    """
+    host = (urlsplit(url).hostname or url or '').lower()
+    return zlib.crc32(host.encode()) & 0x7FFFFFFF
+
 class Datapoint(models.Model):
     """
     Represents a single scraped data point.
@@ -101,6 +112,24 @@ class Datapoint(models.Model):
     last_verified = models.DateTimeField(blank=True, null=True)
     last_updated = models.DateTimeField(auto_now=True)
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_AUTO)
+    # Hash of the page snapshot the scraper service archived at the last scrape
+    last_snapshot = models.CharField(max_length=64, blank=True, null=True)
+    # Normalized content hashes from the scraper service, for the unverified
+    # and verified data, so change detection compares hashes instead of text
+    scraped_fingerprint = models.CharField(max_length=64, blank=True, null=True)
+    verified_fingerprint = models.CharField(max_length=64, blank=True, null=True, db_index=True)
+    # Seconds between two scrapes by the run_scraper daemon, and when the next
+    # one is due; new Datapoints are due at once
+    refresh_interval = models.PositiveIntegerField(default=24 * 3600)
+    next_due_at = models.DateTimeField(default=timezone.now)
+    # Set from the URL on save (and on loaddata, see signals.py); run_scraper --shard i/n
+    # takes host_hash % n == i. bulk_create and QuerySet.update(url=...) skip both: set it
+    # yourself or run rebuild_host_hashes afterwards
+    host_hash = models.IntegerField(default=0)
+    # Which run_scraper process is scraping the Datapoint and until when; an
+    # expired lease (the process died) lets another process claim it
+    lease_owner = models.CharField(max_length=100, blank=True, null=True, db_index=True)
+    lease_expires_at = models.DateTimeField(blank=True, null=True)
     data_group = models.ForeignKey(
         'DataGroup',
         on_delete=models.SET_NULL,
@@ -120,10 +149,130 @@ class Datapoint(models.Model):
         verbose_name = "Datapoint"
         verbose_name_plural = "Datapoints"
         ordering = ['-created_at']
+        # Matched to the list view (organization and/or status, keyset-paginated
+        # on (-created_at, id)), the dashboard's per-organization status counts,
+        # the scrape selection by status and lookups by (url, xpath); see the
+        # benchmark_queries command
+        indexes = [
+            models.Index(fields=['organization', 'status', '-created_at', 'id'], name='dp_org_status_created_idx'),
+            models.Index(fields=['organization', '-created_at', 'id'], name='dp_org_created_idx'),
+            models.Index(fields=['status', '-created_at', 'id'], name='dp_status_created_idx'),
+            models.Index(fields=['-created_at', 'id'], name='dp_created_idx'),
+            models.Index(fields=['url', 'xpath'], name='dp_url_xpath_idx'),
+            # run_scraper --daemon: AUTO Datapoints by due time
+            models.Index(fields=['status', 'next_due_at'], name='dp_status_due_idx'),
+        ]
         permissions = [
             ("can_scrape_datapoint", "Can scrape a specific Datapoint"),
             ("can_scrape_all_datapoints", "Can scrape all Datapoints"),
         ]
 
+    def save(self, *args, **kwargs):
+        self.host_hash = url_host_hash(self.url)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'url' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'host_hash'}
+        super().save(*args, **kwargs)
+
+    def __str__(self):
+        return f"{self.name} ({self.status})"
+
+class OrganizationStatusCount(models.Model):
+    """
+    Number of Datapoints per organization and status, kept up to date as
+    Datapoints are saved, bulk-updated and deleted (see status_counts.py),
+    so the dashboard does not have to count the whole Datapoint table.
+    """
+    organization = models.ForeignKey(
+        'Organization',
+        on_delete=models.CASCADE,
+        related_name='status_counts'
+    )
+    status = models.CharField(max_length=10, choices=Datapoint.STATUS_CHOICES)
+    count = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Organization status count"
+        verbose_name_plural = "Organization status counts"
+        constraints = [
+            models.UniqueConstraint(fields=['organization', 'status'], name='unique_organization_status_count'),
+        ]
+
+    def __str__(self):
+        return f"{self.organization_id} {self.status}: {self.count}"
+
+class ScrapeRun(models.Model):
+    """
+    A scrape of many Datapoints started from the web UI (scrape all, a
+    DataGroup or an Organization), run in the background by runs.py. The
+    counts are updated as results are written back, so the progress page
+    can show how far it has got.
+    """
+    SCOPE_ALL = 'ALL'
+    SCOPE_DATAGROUP = 'DATAGROUP'
+    SCOPE_ORGANIZATION = 'ORGANIZATION'
+    SCOPE_CHOICES = [
+        (SCOPE_ALL, 'All Datapoints'),
+        (SCOPE_DATAGROUP, 'DataGroup'),
+        (SCOPE_ORGANIZATION, 'Organization'),
+    ]
+
+    STATUS_QUEUED = 'QUEUED'
+    STATUS_RUNNING = 'RUNNING'
+    STATUS_DONE = 'DONE'
+    STATUS_FAILED = 'FAILED'
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, 'Queued'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_DONE, 'Done'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+    ACTIVE_STATUSES = [STATUS_QUEUED, STATUS_RUNNING]
+
+    scope = models.CharField(max_length=12, choices=SCOPE_CHOICES, default=SCOPE_ALL)
+    data_group = models.ForeignKey('DataGroup', on_delete=models.CASCADE, null=True, blank=True, related_name='scrape_runs')
+    organization = models.ForeignKey('Organization', on_delete=models.CASCADE, null=True, blank=True, related_name='scrape_runs')
+    started_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='scrape_runs')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_QUEUED)
+
+    # Datapoints selected, and how many of them came back scraped (unchanged or
+    # changed), failed, or were skipped (site down, or missing url or xpath)
+    total = models.IntegerField(default=0)
+    done = models.IntegerField(default=0)
+    failed = models.IntegerField(default=0)
+    skipped = models.IntegerField(default=0)
+    # The summary messages of the finished run, as [level, text] pairs
+    report = models.JSONField(default=list, blank=True)
+    error = models.TextField(blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Scrape run"
+        verbose_name_plural = "Scrape runs"
+        ordering = ['-created_at']
+
+    @property
+    def target(self):
+        return self.data_group or self.organization
+
+    @property
+    def label(self):
+        if self.target is None:
+            return 'All Datapoints'
+        return f"{self.get_scope_display()} '{self.target}'"
+
+    @property
+    def remaining(self):
+        return max(0, self.total - self.done - self.failed - self.skipped)
+
+    @property
+    def is_active(self):
+        return self.status in self.ACTIVE_STATUSES
+
     def __str__(self):
-        return f"{self.name} ({self.status})"
\ No newline at end of file
+        return f"{self.label} ({self.status})"
@@ -0,0 +1,218 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.messages import DEFAULT_TAGS
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import Datapoint, ScrapeRun
+from .utils import ScrapeSummary, run_scraping, scraping_error_message
+
+logger = logging.getLogger(__name__)
+
+# Statuses each scope scrapes, as the views did when they scraped in the request
+SCOPE_STATUSES = {
+    ScrapeRun.SCOPE_ALL: [Datapoint.STATUS_AUTO, Datapoint.STATUS_VERIFY, Datapoint.STATUS_FIX],
+    ScrapeRun.SCOPE_DATAGROUP: [Datapoint.STATUS_AUTO],
+    ScrapeRun.SCOPE_ORGANIZATION: [Datapoint.STATUS_AUTO],
+}
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=settings.SCRAPE_RUN_WORKERS, thread_name_prefix="scrape-run")
+        return _executor
+
+
+def selected_datapoints(scope, data_group=None, organization=None):
+    """
+    The Datapoints a run of `scope` scrapes.
+    """
+    # No ordering: sorting most of the table by created_at only slows the selection down
+    datapoints = Datapoint.objects.filter(status__in=SCOPE_STATUSES[scope]).order_by()
+    if data_group is not None:
+        datapoints = datapoints.filter(data_group=data_group)
+    if organization is not None:
+        datapoints = datapoints.filter(organization=organization)
+    return datapoints
+
+
+def start_run(scope, user, data_group=None, organization=None):
+    """
+    Queues a ScrapeRun of `scope` and returns (run, created). If a run of
+    the same scope and target is already queued or running, returns that
+    one instead, so a double submit does not scrape everything twice.
+
+    The run starts in a background thread once the current transaction
+    commits; the request that started it returns right away.
+    """
+    with transaction.atomic():
+        active = ScrapeRun.objects.filter(
+            scope=scope,
+            data_group=data_group,
+            organization=organization,
+            status__in=ScrapeRun.ACTIVE_STATUSES,
+        ).first()
+        if active is not None and not (is_stalled(active) and fail_stalled(active)):
+            return active, False
+        run = ScrapeRun.objects.create(
+            scope=scope,
+            data_group=data_group,
+            organization=organization,
+            started_by=user,
+            total=selected_datapoints(scope, data_group, organization).count(),
+        )
+        transaction.on_commit(lambda: _get_executor().submit(execute_run, run.pk))
+    return run, True
+
+
+def is_stalled(run):
+    """
+    Whether an active run has stopped, e.g. because the web server process
+    running it was restarted: a running run whose heartbeat (updated_at) is
+    older than SCRAPE_RUN_STALE_SECONDS, or a queued run that has waited that
+    long while no run is running anywhere to hold it up.
+    """
+    stale_before = timezone.now() - timedelta(seconds=settings.SCRAPE_RUN_STALE_SECONDS)
+    if not run.is_active or run.updated_at >= stale_before:
+        return False
+    if run.status == ScrapeRun.STATUS_RUNNING:
+        return True
+    return not ScrapeRun.objects.filter(status=ScrapeRun.STATUS_RUNNING, updated_at__gte=stale_before).exists()
+
+
+def fail_stalled(run):
+    """
+    Marks a stalled run failed, so it stops showing as running and the
+    same scope can be scraped again. Only does so if the run has not moved
+    on since it was read; returns whether it was marked failed (if not, the
+    run is reloaded).
+
+    A run marked failed while queued is never started, and one marked failed
+    while running stops at its next progress update.
+    """
+    now = timezone.now()
+    failed = ScrapeRun.objects.filter(pk=run.pk, status=run.status, updated_at=run.updated_at).update(
+        status=ScrapeRun.STATUS_FAILED,
+        error="The run stopped making progress and was abandoned.",
+        finished_at=now,
+        updated_at=now,
+    )
+    run.refresh_from_db()
+    return bool(failed)
+
+
+class RunAbandoned(Exception):
+    """
+    Raised in a run's thread once the run is no longer RUNNING in the
+    database, i.e. it was marked failed as stalled.
+    """
+
+
+def execute_run(run_pk):
+    """
+    Scrapes the Datapoints of a ScrapeRun, updating its counts after each
+    chunk of results written back. Does nothing unless the run is still
+    queued, so a run is never scraped twice.
+    """
+    try:
+        now = timezone.now()
+        if not ScrapeRun.objects.filter(pk=run_pk, status=ScrapeRun.STATUS_QUEUED).update(
+            status=ScrapeRun.STATUS_RUNNING, started_at=now, updated_at=now,
+        ):
+            logger.warning(f"Scrape run {run_pk} is no longer queued; not starting it")
+            return
+        with _Heartbeat(run_pk):
+            _scrape(run_pk)
+    finally:
+        # Database connections are per thread
+        connection.close()
+
+
+def _scrape(run_pk):
+    summary = ScrapeSummary()
+    status, error = ScrapeRun.STATUS_FAILED, ""
+    try:
+        run = ScrapeRun.objects.select_related('data_group', 'organization').get(pk=run_pk)
+        datapoints = list(selected_datapoints(run.scope, run.data_group, run.organization))
+        _update(run_pk, total=len(datapoints))
+        if datapoints and not run_scraping(datapoints, summary, on_chunk=lambda summary: _update_counts(run_pk, summary)):
+            error = "No valid Datapoints to scrape after validation."
+        status = ScrapeRun.STATUS_DONE
+    except RunAbandoned:
+        logger.warning(f"Scrape run {run_pk} was abandoned; stopping it")
+        return
+    except Exception as e:
+        logger.exception(f"Scrape run {run_pk} failed")
+        error = scraping_error_message(e)
+    try:
+        _update_counts(
+            run_pk,
+            summary,
+            status=status,
+            error=error,
+            report=[[DEFAULT_TAGS[level], text] for level, text in summary.messages()],
+            finished_at=timezone.now(),
+        )
+    except RunAbandoned:
+        logger.warning(f"Scrape run {run_pk} was abandoned before it finished")
+
+
+class _Heartbeat:
+    """
+    Touches a running run's updated_at every third of SCRAPE_RUN_STALE_SECONDS
+    from a separate thread, so a run waiting on slow pages is not taken for
+    a stalled one.
+    """
+
+    def __init__(self, run_pk):
+        self.run_pk = run_pk
+        self.interval = settings.SCRAPE_RUN_STALE_SECONDS / 3
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, name=f"scrape-run-{run_pk}-heartbeat", daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stopped.set()
+        self.thread.join()
+
+    def _run(self):
+        try:
+            while not self.stopped.wait(self.interval):
+                try:
+                    _update(self.run_pk)
+                except RunAbandoned:
+                    return
+                except Exception:
+                    logger.exception(f"Heartbeat of scrape run {self.run_pk} failed")
+        finally:
+            connection.close()
+
+
+def _update_counts(run_pk, summary, **fields):
+    _update(
+        run_pk,
+        done=summary.count("unchanged") + summary.count("changed"),
+        failed=summary.count("failed"),
+        skipped=summary.count("skipped") + summary.count("invalid"),
+        **fields,
+    )
+
+
+def _update(run_pk, **fields):
+    # update() skips auto_now; updated_at is the heartbeat that tells a live run from a stalled one
+    if not ScrapeRun.objects.filter(pk=run_pk, status=ScrapeRun.STATUS_RUNNING).update(
+        updated_at=timezone.now(), **fields,
+    ):
+        raise RunAbandoned(run_pk)
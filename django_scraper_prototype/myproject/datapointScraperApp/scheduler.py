@@ -0,0 +1,147 @@
+import heapq
+import logging
+import random
+import threading
+from datetime import timedelta
+
+from django.utils import timezone
+
+from .leases import claim, release, unleased
+from .models import Datapoint
+
+logger = logging.getLogger(__name__)
+
+
+def next_due_at(datapoint, now, jitter=0.1):
+    """
+    When a Datapoint scraped at `now` is due again: its refresh interval,
+    plus or minus up to `jitter` of it at random.
+    """
+    interval = datapoint.refresh_interval * (1 + random.uniform(-jitter, jitter))
+    return now + timedelta(seconds=interval)
+
+
+class DueScheduler:
+    """
+    Scrapes AUTO Datapoints as their `next_due_at` comes, for `run_scraper --daemon`.
+
+    Rather than scanning every AUTO Datapoint of `queryset` (all of them by
+    default, or a shard, see leases.in_shard), each tick asks the database
+    (through the (status, next_due_at) index) for at most one dispatch of
+    rows due within the next tick, and keeps them in a min-heap ordered by
+    when to dispatch them. The work per tick therefore follows how many
+    Datapoints are due, not how many exist.
+
+    A dispatch holds up to `batch_size * workers` rows, enough to give every
+    worker of update_datapoints a batch. Due rows are collected until a
+    dispatch is full or the oldest of them has waited `linger` seconds
+    (one tick by default), so the workers and their browsers are started
+    for full batches instead of for every row as it comes due.
+
+    Rows that are already overdue, e.g. after downtime, are paced evenly at
+    one dispatch per tick instead of being dispatched at once, and every
+    reschedule adds `jitter` (a fraction of the interval) so Datapoints
+    created together drift apart instead of coming due together forever.
+
+    Due Datapoints are leased to `owner` before `scrape` is called with a
+    queryset of them, and rows another process holds a lease on are
+    skipped, so several schedulers can share the table. `scrape` is
+    expected to schedule the next run and release the leases (as
+    scraper.update_datapoints does); if the process dies first, the leases
+    expire after `lease_seconds` and the rows are due for everyone again.
+    """
+
+    def __init__(self, scrape, owner, queryset=None, batch_size=50, tick=30.0, jitter=0.1,
+                 lease_seconds=300, clock=timezone.now, workers=1, linger=None):
+        if batch_size < 1 or workers < 1 or tick <= 0 or not 0 <= jitter < 1:
+            raise ValueError("batch_size and workers must be at least 1, tick positive and jitter in [0, 1).")
+        self.scrape = scrape
+        self.owner = owner
+        self.queryset = queryset if queryset is not None else Datapoint.objects.all()
+        self.lease_seconds = lease_seconds
+        self.batch_size = batch_size
+        self.dispatch_size = batch_size * workers
+        self.tick = tick
+        self.linger = timedelta(seconds=tick if linger is None else linger)
+        self.jitter = jitter
+        self.clock = clock
+        self.stop_event = threading.Event()
+        self.dispatched = 0
+        # (dispatch_at, id), with the ids also in _queued so a refill skips them
+        self._heap = []
+        self._queued = set()
+        # Dispatch time of the last overdue row queued; the next one is paced after it
+        self._paced_until = None
+
+    def stop(self):
+        self.stop_event.set()
+
+    def run(self):
+        """
+        Dispatches due Datapoints until `stop` is called.
+        """
+        logger.info(f"Scheduler started: dispatches of up to {self.dispatch_size}, ticks of {self.tick:.0f}s.")
+        while not self.stop_event.is_set():
+            self.stop_event.wait(self.run_once())
+        logger.info(f"Scheduler stopped after dispatching {self.dispatched} Datapoint(s).")
+
+    def run_once(self):
+        """
+        Refills the heap if needed and dispatches what is due. Returns the
+        number of seconds until there may be more to do.
+        """
+        now = self.clock()
+        if len(self._heap) < self.dispatch_size:
+            self._refill(now)
+        if not self._heap:
+            return self.tick
+        oldest = self._heap[0][0]
+        due = sum(1 for dispatch_at, _ in self._heap if dispatch_at <= now)
+        if due >= self.dispatch_size or (due and now - oldest >= self.linger):
+            pks = []
+            while self._heap and self._heap[0][0] <= now and len(pks) < self.dispatch_size:
+                _, pk = heapq.heappop(self._heap)
+                self._queued.discard(pk)
+                pks.append(pk)
+            self._dispatch(pks)
+            return 0
+        # Until the oldest due row has lingered long enough, or the next row comes due
+        waits = [self.tick]
+        if due:
+            waits.append((oldest + self.linger - now).total_seconds())
+        upcoming = [dispatch_at for dispatch_at, _ in self._heap if dispatch_at > now]
+        if upcoming:
+            waits.append((min(upcoming) - now).total_seconds())
+        return max(0.0, min(waits))
+
+    def _refill(self, now):
+        horizon = now + timedelta(seconds=self.tick)
+        rows = list(
+            self.queryset.filter(unleased(now), status=Datapoint.STATUS_AUTO, next_due_at__lte=horizon)
+            .exclude(pk__in=self._queued)
+            .order_by('next_due_at')
+            .values_list('pk', 'next_due_at')[:self.dispatch_size - len(self._heap)]
+        )
+        step = timedelta(seconds=self.tick / self.dispatch_size)
+        overdue = 0
+        for pk, due_at in rows:
+            if due_at <= now:
+                overdue += 1
+                due_at = now if self._paced_until is None else max(now, self._paced_until + step)
+                self._paced_until = due_at
+            heapq.heappush(self._heap, (due_at, pk))
+            self._queued.add(pk)
+        if overdue:
+            logger.debug(f"Queued {overdue} overdue Datapoint(s), paced at {self.dispatch_size} per {self.tick:.0f}s.")
+
+    def _dispatch(self, pks):
+        # Skips Datapoints that left AUTO, were deleted or were claimed elsewhere since they were queued
+        candidates = self.queryset.filter(pk__in=pks, status=Datapoint.STATUS_AUTO)
+        claimed = claim(candidates, self.owner, len(pks), self.lease_seconds)
+        if claimed:
+            self.dispatched += len(claimed)
+            try:
+                self.scrape(Datapoint.objects.filter(pk__in=claimed))
+            finally:
+                # Whatever the scrape did not get to is due again for everyone
+                release(self.owner, claimed)
@@ -1,69 +1,167 @@
 # datapointScraperApp/scraper/scraper.py
 
-from datetime import timezone
-from typing import Optional
-from lxml import html
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+from urllib.parse import urlsplit
+import django
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from lxml import etree, html
 from datapointScraperApp.models import Datapoint
+from datapointScraperApp.scheduler import next_due_at
+from datapointScraperApp.status_counts import adjust_status_counts, status_count_changes
 from playwright.sync_api import sync_playwright, TimeoutError as PlaywrightTimeoutError
+from scraper_common.fingerprint import fingerprint
+from scraper_common.timeouts import TimeoutLearner
 import logging
 
 # Configure logger
 logger = logging.getLogger(__name__)
 
-def get_page(url: str, wait_xpath: Optional[str] = None) -> html.HtmlElement:
-    try:
-        with sync_playwright() as p:
-            browser = p.chromium.launch(headless=True)
-            context = browser.new_context()
+# True once every XPath matches in the live DOM (see the FastAPI scraper's fetch.py)
+ALL_XPATHS_MATCH_JS = """
+xpaths => xpaths.every(xpath => {
+    try {
+        return document.evaluate(`boolean(${xpath})`, document, null, XPathResult.BOOLEAN_TYPE, null).booleanValue;
+    } catch (e) {
+        return true;
+    }
+})
+"""
+
+# Learned per domain, like the FastAPI scraper's; shared by every scrape in this process
+page_timeouts = TimeoutLearner()
+
+@lru_cache(maxsize=4096)
+def compile_xpath(xpath: str) -> etree.XPath:
+    """
+    Returns the compiled form of an XPath expression, reusing earlier compilations.
+    Raises etree.XPathSyntaxError for invalid expressions.
+    """
+    return etree.XPath(xpath)
+
+class BrowserSession:
+    """
+    One headless Chromium reused for many pages, each in a fresh browser
+    context. Use as a context manager, and only in the thread that opened it
+    (Playwright's sync API is bound to its thread).
+    """
+
+    def __enter__(self) -> "BrowserSession":
+        self._playwright = sync_playwright().start()
+        try:
+            self.browser = self._playwright.chromium.launch(headless=True)
+        except Exception:
+            self._playwright.stop()
+            raise
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        try:
+            self.browser.close()
+        finally:
+            self._playwright.stop()
+
+    def get_page(self, url: str, wait_xpath: Optional[str] = None,
+                 wait_xpaths: Optional[Sequence[str]] = None) -> html.HtmlElement:
+        """
+        Renders the page and parses it. With `wait_xpaths`, returns as soon as
+        all of them match in the live DOM (or with what is there on timeout).
+        The timeout is learned per domain by `page_timeouts`.
+        """
+        domain = (urlsplit(url).hostname or url).lower()
+        budget = page_timeouts.timeout_for(domain)
+        started = time.monotonic()
+
+        def remaining_ms() -> float:
+            return max(budget - (time.monotonic() - started), 1.0) * 1000
+
+        context = self.browser.new_context()
+        try:
             page = context.new_page()
-            page.goto(url, timeout=10000)
+            started = time.monotonic()
+            page.goto(url, timeout=budget * 1000, wait_until="domcontentloaded" if wait_xpaths else "load")
 
-            if wait_xpath:
-                page.wait_for_selector(f'xpath={wait_xpath}', timeout=5000)
+            if wait_xpaths:
+                try:
+                    page.wait_for_function(ALL_XPATHS_MATCH_JS, arg=list(wait_xpaths), timeout=remaining_ms(), polling=100)
+                except PlaywrightTimeoutError:
+                    logger.info(f"Not every XPath matched on URL: {url} within {budget:.1f}s; using the page as is.")
+            elif wait_xpath:
+                page.wait_for_selector(f'xpath={wait_xpath}', timeout=remaining_ms())
             else:
-                page.wait_for_load_state('networkidle', timeout=5000)
+                page.wait_for_load_state('networkidle', timeout=remaining_ms())
 
             content = page.content()
-            tree = html.fromstring(content)
-            browser.close()
-            return tree
-    except PlaywrightTimeoutError:
-        logger.error(f"Timeout while waiting for the element: {wait_xpath} on URL: {url}")
-        raise RuntimeError("Timeout while waiting for the element to appear.")
+            page_timeouts.record(domain, time.monotonic() - started)
+            return html.fromstring(content)
+        except PlaywrightTimeoutError:
+            page_timeouts.record(domain, time.monotonic() - started)
+            logger.error(f"Timeout while waiting for the element: {wait_xpath} on URL: {url}")
+            raise RuntimeError("Timeout while waiting for the element to appear.")
+        except Exception as e:
+            logger.error(f"Error fetching the page: {url} - {e}")
+            raise RuntimeError(f"Error fetching the page: {e}")
+        finally:
+            context.close()
+
+def get_page(url: str, wait_xpath: Optional[str] = None,
+             wait_xpaths: Optional[Sequence[str]] = None) -> html.HtmlElement:
+    """
+    Renders a single page in a browser of its own; see BrowserSession.get_page.
+    """
+    try:
+        with BrowserSession() as session:
+            return session.get_page(url, wait_xpath=wait_xpath, wait_xpaths=wait_xpaths)
+    except RuntimeError:
+        raise
     except Exception as e:
-        logger.error(f"Error fetching the page: {url} - {e}")
+        logger.error(f"Error launching the browser for: {url} - {e}")
         raise RuntimeError(f"Error fetching the page: {e}")
 
+def _wait_xpaths(xpath: str) -> Optional[Sequence[str]]:
+    return [xpath] if getattr(settings, "SCRAPER_WAIT_MODE", "networkidle") == "xpaths" else None
+
+def extract_txt(tree: html.HtmlElement, xpath: str, url: str = "") -> Optional[str]:
+    result = compile_xpath(xpath)(tree)
+
+    if result:
+        combined_text = " ".join([
+            element.text_content().strip() for element in result if element.text_content()
+        ])
+        return combined_text if combined_text else None
+    else:
+        logger.warning(f"No content found for XPath: {xpath} on URL: {url}")
+        return None
+
+def extract_html(tree: html.HtmlElement, xpath: str, url: str = "") -> Optional[str]:
+    result = compile_xpath(xpath)(tree)
+
+    if result:
+        combined_html = " ".join([
+            html.tostring(element, pretty_print=True, encoding="unicode") for element in result
+        ])
+        return combined_html if combined_html else None
+    else:
+        logger.warning(f"No content found for XPath: {xpath} on URL: {url}")
+        return None
+
 def scrape_content_txt(url: str, xpath: str) -> Optional[str]:
     try:
-        tree = get_page(url)
-        result = tree.xpath(xpath)
-
-        if result:
-            combined_text = " ".join([
-                element.text_content().strip() for element in result if element.text_content()
-            ])
-            return combined_text if combined_text else None
-        else:
-            logger.warning(f"No content found for XPath: {xpath} on URL: {url}")
-            return None
+        tree = get_page(url, wait_xpaths=_wait_xpaths(xpath))
+        return extract_txt(tree, xpath, url)
     except Exception as e:
         logger.error(f"Error during scraping text from URL: {url} - {e}")
         raise RuntimeError(f"Error during scraping: {e}")
 
 def scrape_content_html(url: str, xpath: str) -> Optional[str]:
     try:
-        tree = get_page(url)
-        result = tree.xpath(xpath)
-
-        if result:
-            combined_html = " ".join([
-                html.tostring(element, pretty_print=True, encoding="unicode") for element in result
-            ])
-            return combined_html if combined_html else None
-        else:
-            logger.warning(f"No content found for XPath: {xpath} on URL: {url}")
-            return None
+        tree = get_page(url, wait_xpaths=_wait_xpaths(xpath))
+        return extract_html(tree, xpath, url)
     except Exception as e:
         logger.error(f"Error during scraping HTML from URL: {url} - {e}")
         raise RuntimeError(f"Error during scraping: {e}")
@@ -77,23 +175,6 @@ def update_datapoint(datapoint: Datapoint):
             scraped_data = scrape_content_html(datapoint.url, datapoint.xpath)
         else:
             scraped_data = scrape_content_txt(datapoint.url, datapoint.xpath)
-
-        if scraped_data:
-            datapoint.current_unverified_data = scraped_data
-            datapoint.last_updated = timezone.now()
-
-            if datapoint.status == Datapoint.STATUS_AUTO:
-                datapoint.status = Datapoint.STATUS_VERIFY
-
-            datapoint.save()
-            logger.info(f"Updated Datapoint ID: {datapoint.id} with new data.")
-        else:
-            logger.warning(f"No data scraped for Datapoint ID: {datapoint.id}.")
-            # Optionally, set status to 'FIX' if scraping fails silently
-            if datapoint.status == Datapoint.STATUS_AUTO:
-                datapoint.status = Datapoint.STATUS_FIX
-                datapoint.save(update_fields=['status'])
-                logger.debug(f"Set status to 'FIX' for Datapoint ID: {datapoint.id} due to no data.")
     except Exception as e:
         logger.error(f"Error updating Datapoint ID: {datapoint.id} - {e}")
         # Optionally, set status to 'FIX' to indicate an issue
@@ -102,3 +183,212 @@ def update_datapoint(datapoint: Datapoint):
             datapoint.save(update_fields=['status'])
             logger.debug(f"Set status to 'FIX' for Datapoint ID: {datapoint.id} due to exception.")
         raise
+
+    fields = _apply_update(datapoint, scraped_data, None, timezone.now())
+    if fields:
+        datapoint.save(update_fields=fields)
+    if scraped_data:
+        logger.info(f"Updated Datapoint ID: {datapoint.id} with new data.")
+
+
+# (id, xpath, data_type) of the Datapoints on one URL
+UrlTasks = List[Tuple[int, str, str]]
+
+
+class UpdateSummary:
+    """
+    Running totals of an update_datapoints call.
+    """
+
+    def __init__(self):
+        self.datapoints = 0
+        self.pages = 0
+        self.updated = 0
+        self.failed = 0
+        self.seconds = 0.0
+
+    def add(self, other: "UpdateSummary") -> None:
+        self.datapoints += other.datapoints
+        self.pages += other.pages
+        self.updated += other.updated
+        self.failed += other.failed
+        self.seconds += other.seconds
+
+    def __str__(self):
+        seconds = max(self.seconds, 1e-9)
+        return (
+            f"Scraped {self.datapoints} Datapoint(s) on {self.pages} page(s) in {self.seconds:.1f}s "
+            f"({self.pages / seconds:.2f} pages/s, {self.datapoints / seconds:.2f} Datapoints/s): "
+            f"{self.updated} updated, {self.failed} failed."
+        )
+
+
+def scrape_url_groups(groups: List[Tuple[str, UrlTasks]], wait_mode: str = "networkidle") -> List[Tuple[int, Optional[str], Optional[str]]]:
+    """
+    Renders each URL once, all in one browser, and extracts every
+    Datapoint's XPath from it. Returns (id, scraped_data, error) per
+    Datapoint. Runs in pool workers, so it takes and returns plain data only.
+    """
+    results = []
+    try:
+        with BrowserSession() as session:
+            for url, tasks in groups:
+                wait_xpaths = [xpath for _, xpath, _ in tasks] if wait_mode == "xpaths" else None
+                try:
+                    tree = session.get_page(url, wait_xpaths=wait_xpaths)
+                except Exception as e:
+                    results.extend((pk, None, str(e)) for pk, _, _ in tasks)
+                    continue
+                for pk, xpath, data_type in tasks:
+                    extract = extract_html if data_type.upper() == 'HTML' else extract_txt
+                    try:
+                        results.append((pk, extract(tree, xpath, url), None))
+                    except Exception as e:
+                        logger.error(f"Error during scraping from URL: {url} - {e}")
+                        results.append((pk, None, f"Error during scraping: {e}"))
+    except Exception as e:
+        # The browser could not be launched (or crashed); fail what is left
+        logger.error(f"Error launching the browser: {e}")
+        done = {pk for pk, _, _ in results}
+        results.extend(
+            (pk, None, f"Error launching the browser: {e}")
+            for _, tasks in groups for pk, _, _ in tasks if pk not in done
+        )
+    return results
+
+
+def update_datapoints(queryset, workers: int = 4, batch_size: int = 50, executor: str = "thread",
+                      on_batch: Optional[Callable[[UpdateSummary], None]] = None,
+                      owner: Optional[str] = None, jitter: float = 0.1) -> UpdateSummary:
+    """
+    Scrapes the Datapoints of `queryset` like update_datapoint, but in bulk.
+
+    Datapoints sharing a URL are grouped so each page is rendered once.
+    The groups are packed into batches of about `batch_size` Datapoints,
+    rendered by `workers` threads (or processes, with executor="process"),
+    each batch in one reused browser. Each batch is written back in one
+    transaction with one bulk UPDATE per set of changed fields, which also
+    schedules each Datapoint's next scrape (see scheduler.next_due_at).
+    `on_batch` is called with the running totals after every batch.
+
+    With `owner`, the Datapoints are expected to be leased to it (see
+    leases.claim): results for Datapoints whose lease was lost to another
+    process are dropped, and the others' leases are released.
+    """
+    if executor not in ("thread", "process"):
+        raise ValueError(f"Unknown executor: {executor!r}; use 'thread' or 'process'.")
+    started = time.monotonic()
+    groups: Dict[str, UrlTasks] = defaultdict(list)
+    for pk, url, xpath, data_type in queryset.order_by().values_list('pk', 'url', 'xpath', 'data_type'):
+        groups[url].append((pk, xpath, data_type))
+
+    summary = UpdateSummary()
+    summary.pages = len(groups)
+    wait_mode = getattr(settings, "SCRAPER_WAIT_MODE", "networkidle")
+    if executor == "process":
+        # Spawned workers need Django set up before they can import this module
+        pool = ProcessPoolExecutor(max_workers=workers, initializer=django.setup)
+    else:
+        pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="scraper")
+    with pool:
+        futures = [pool.submit(scrape_url_groups, batch, wait_mode) for batch in _batch_groups(groups, batch_size)]
+        for future in as_completed(futures):
+            _write_back(future.result(), summary, owner, jitter)
+            summary.seconds = time.monotonic() - started
+            if on_batch is not None:
+                on_batch(summary)
+    summary.seconds = time.monotonic() - started
+    return summary
+
+
+def _batch_groups(groups: Dict[str, UrlTasks], batch_size: int) -> List[List[Tuple[str, UrlTasks]]]:
+    # A URL's Datapoints always stay in one batch, even if they outnumber batch_size
+    batches, batch, size = [], [], 0
+    for url, tasks in groups.items():
+        if batch and size + len(tasks) > batch_size:
+            batches.append(batch)
+            batch, size = [], 0
+        batch.append((url, tasks))
+        size += len(tasks)
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+def _write_back(results, summary: UpdateSummary, owner: Optional[str] = None, jitter: float = 0.1) -> None:
+    now = timezone.now()
+    with transaction.atomic():
+        # Reloaded, so changes made while the batch was scraped are not overwritten
+        datapoints = Datapoint.objects.in_bulk([pk for pk, _, _ in results])
+        previous = {dp.pk: (dp.organization_id, dp.status) for dp in datapoints.values()}
+        updates = defaultdict(list)
+        for pk, scraped_data, error in results:
+            dp = datapoints.get(pk)
+            if dp is None:
+                continue
+            if owner is not None and dp.lease_owner != owner:
+                logger.warning(f"Lease on Datapoint ID: {dp.id} expired and was taken over; dropping its result.")
+                continue
+            summary.datapoints += 1
+            fields = _apply_update(dp, scraped_data, error, now)
+            if scraped_data:
+                summary.updated += 1
+            else:
+                summary.failed += 1
+            dp.next_due_at = next_due_at(dp, now, jitter)
+            dp.lease_owner = None
+            dp.lease_expires_at = None
+            updates[fields + ('next_due_at', 'lease_owner', 'lease_expires_at')].append(dp)
+        for fields, changed in updates.items():
+            Datapoint.objects.bulk_update(changed, fields)
+        # bulk_update sends no signals
+        adjust_status_counts(status_count_changes(previous, datapoints.values()))
+
+
+def _apply_update(datapoint: Datapoint, scraped_data: Optional[str], error: Optional[str], now) -> tuple:
+    """
+    Applies a scrape result in memory the way update_datapoint does, and
+    returns the fields to write.
+
+    Like the scraper service's write-back (utils._apply_scrape_result), an
+    AUTO Datapoint whose data matches its verified data stays AUTO, so it
+    is scraped again when its refresh interval is up; only changed data
+    goes to VERIFY. The scraped text is only rewritten when its
+    fingerprint changed.
+    """
+    if scraped_data:
+        # Set explicitly: bulk_update does not apply auto_now
+        datapoint.last_updated = now
+        datapoint.updated_at = now
+        fields = ('last_updated', 'updated_at')
+        data_fingerprint = fingerprint(scraped_data, datapoint.data_type)
+        if datapoint.verified_fingerprint:
+            unchanged = data_fingerprint == datapoint.verified_fingerprint
+        else:
+            # Verified before fingerprints existed (or edited since): fingerprint
+            # the verified text once and remember it if it matches
+            verified = datapoint.current_verified_data
+            unchanged = verified is not None and fingerprint(verified, datapoint.data_type) == data_fingerprint
+            if unchanged:
+                datapoint.verified_fingerprint = data_fingerprint
+                fields += ('verified_fingerprint',)
+        if data_fingerprint != datapoint.scraped_fingerprint:
+            datapoint.current_unverified_data = scraped_data
+            datapoint.scraped_fingerprint = data_fingerprint
+            fields += ('current_unverified_data', 'scraped_fingerprint')
+        if datapoint.status == Datapoint.STATUS_AUTO:
+            if unchanged:
+                datapoint.last_verified = now
+                fields += ('last_verified',)
+            else:
+                datapoint.status = Datapoint.STATUS_VERIFY
+                fields += ('status',)
+        return fields
+    if error:
+        logger.error(f"Error updating Datapoint ID: {datapoint.id} - {error}")
+    else:
+        logger.warning(f"No data scraped for Datapoint ID: {datapoint.id}.")
+    if datapoint.status == Datapoint.STATUS_AUTO:
+        datapoint.status = Datapoint.STATUS_FIX
+        return ('status',)
+    return ()
@@ -1,12 +1,60 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save, pre_save
 from django.dispatch import receiver
 from django.contrib.auth.models import User
 from .models import UserProfile
-from .models import Datapoint
+from .models import Datapoint, url_host_hash
+from .status_counts import adjust_status_counts
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Fields that move a Datapoint between the organization status counters
+STATUS_COUNT_FIELDS = {'status', 'organization', 'organization_id'}
+
+
+@receiver(pre_save, sender=Datapoint)
+def remember_status_count_key(sender, instance, raw=False, update_fields=None, **kwargs):
+    """
+    Reads the stored organization and status of a Datapoint about to be
+    saved, so the counters can be moved if either changes.
+    """
+    instance._status_count_key = None
+    if raw or instance.pk is None:
+        return
+    if update_fields is not None and not STATUS_COUNT_FIELDS.intersection(update_fields):
+        return
+    instance._status_count_key = (
+        Datapoint.objects.filter(pk=instance.pk).values_list('organization_id', 'status').first()
+    )
+
+
+@receiver(pre_save, sender=Datapoint)
+def set_host_hash_on_raw_save(sender, instance, raw=False, **kwargs):
+    """
+    Datapoint.save() sets host_hash, but loaddata saves fixtures raw,
+    without calling it.
+    """
+    if raw:
+        instance.host_hash = url_host_hash(instance.url)
+
+
+@receiver(post_save, sender=Datapoint)
+def update_status_counts_on_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        # Loading fixtures; run rebuild_status_counts afterwards
+        return
+    key = (instance.organization_id, instance.status)
+    previous = getattr(instance, '_status_count_key', None)
+    if created:
+        adjust_status_counts({key: 1})
+    elif previous is not None and previous != key:
+        adjust_status_counts({previous: -1, key: 1})
+
+
+@receiver(post_delete, sender=Datapoint)
+def update_status_counts_on_delete(sender, instance, **kwargs):
+    adjust_status_counts({(instance.organization_id, instance.status): -1})
+
 # @receiver(post_save, sender=Datapoint)
 # def trigger_scraping_on_auto_status(sender, instance, created, **kwargs):
 #     """
@@ -0,0 +1,84 @@
+import logging
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import Count, F
+from django.utils import timezone
+
+from .models import Datapoint, Organization, OrganizationStatusCount
+
+logger = logging.getLogger(__name__)
+
+
+def adjust_status_counts(deltas):
+    """
+    Applies {(organization_id, status): delta} to the counters table with
+    relative UPDATEs, so concurrent writers do not overwrite each other.
+    """
+    deltas = {key: delta for key, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    now = timezone.now()
+    with transaction.atomic():
+        for (organization_id, status), delta in sorted(deltas.items()):
+            counters = OrganizationStatusCount.objects.filter(organization_id=organization_id, status=status)
+            if counters.update(count=F('count') + delta, updated_at=now) or delta < 0:
+                # A missing row on a decrement means the organization is being deleted
+                continue
+            counter, created = OrganizationStatusCount.objects.get_or_create(
+                organization_id=organization_id, status=status, defaults={'count': delta}
+            )
+            if not created:
+                # Another writer created the row in the meantime
+                counters.update(count=F('count') + delta, updated_at=now)
+
+
+def status_count_changes(previous, datapoints):
+    """
+    Returns the counter deltas for Datapoints whose status or organization
+    changed in memory, given `previous` as {id: (organization_id, status)}
+    taken before the change. For bulk paths, which send no signals.
+    """
+    deltas = Counter()
+    for dp in datapoints:
+        before = previous.get(dp.pk)
+        after = (dp.organization_id, dp.status)
+        if before is not None and before != after:
+            deltas[before] -= 1
+            deltas[after] += 1
+    return deltas
+
+
+def rebuild_status_counts():
+    """
+    Recounts the counters table from the Datapoints. Returns the number of counters written.
+    """
+    with transaction.atomic():
+        OrganizationStatusCount.objects.all().delete()
+        rows = (
+            Datapoint.objects.order_by()
+            .values('organization', 'status')
+            .annotate(total=Count('id'))
+        )
+        counters = OrganizationStatusCount.objects.bulk_create(
+            OrganizationStatusCount(organization_id=row['organization'], status=row['status'], count=row['total'])
+            for row in rows
+        )
+    logger.info(f"Rebuilt {len(counters)} organization status counters.")
+    return len(counters)
+
+
+def organizations_with_status_counts():
+    """
+    Returns the organizations by name, each with an `<status>_count`
+    attribute per Datapoint status, read from the counters table.
+    """
+    counts = {
+        (organization_id, status): count
+        for organization_id, status, count in OrganizationStatusCount.objects.values_list('organization_id', 'status', 'count')
+    }
+    organizations = list(Organization.objects.order_by('name'))
+    for org in organizations:
+        for status, _ in Datapoint.STATUS_CHOICES:
+            setattr(org, f"{status.lower()}_count", counts.get((org.id, status), 0))
+    return organizations
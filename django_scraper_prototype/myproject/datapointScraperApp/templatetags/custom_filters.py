@@ -11,14 +11,15 @@ def display_data_group(data_group):
     return 'N/A'
 
 @register.filter
-def get_organization_name(organizations, org_id):
+def get_organization_name(organization_names, org_id):
     """
-    Given a list of organizations and an organization ID, return the organization's name.
+    Given an {id: name} map of organizations (see DatapointListView) and an
+    organization ID, return the organization's name.
     """
-    for org in organizations:
-        if str(org.id) == str(org_id):
-            return org.name
-    return 'Unknown Organization'
+    try:
+        return organization_names.get(int(org_id), 'Unknown Organization')
+    except (TypeError, ValueError):
+        return 'Unknown Organization'
 
 @register.filter
 def get_status_display(status_code):
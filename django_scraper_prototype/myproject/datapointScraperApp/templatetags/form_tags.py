@@ -1,6 +1,6 @@
 from django import template
 
-from datapointScraperApp.models import Organization
+from datapointScraperApp.templatetags import custom_filters
 
 register = template.Library()
 
@@ -12,10 +12,5 @@ def add_class(field, css):
 def get_status_count(organization, status):
     return getattr(organization, f"{status.lower()}_count", 0)
 
-@register.filter
-def get_organization_name(organizations, org_id):
-    try:
-        org = organizations.get(id=org_id)
-        return org.name
-    except Organization.DoesNotExist:
-        return "Unknown Organization"
\ No newline at end of file
+# Looks the name up in an {id: name} map; see custom_filters
+register.filter('get_organization_name', custom_filters.get_organization_name)
\ No newline at end of file
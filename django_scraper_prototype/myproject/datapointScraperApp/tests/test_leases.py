@@ -0,0 +1,163 @@
+import threading
+import time
+from io import StringIO
+from unittest import mock
+from datetime import timedelta
+
+from django.core.management import call_command
+from django.db import OperationalError, connection
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+
+from datapointScraperApp.leases import Heartbeat, claim, in_shard, parse_shard, rebuild_host_hashes, release
+from datapointScraperApp.models import Datapoint, Organization, url_host_hash
+
+
+def create_datapoints(count, organization):
+    return [
+        Datapoint.objects.create(
+            name=f"dp{i}", url=f"https://site{i}.example.com/", xpath="//h1", data_type="TXT", organization=organization,
+        )
+        for i in range(count)
+    ]
+
+
+class HostHashTests(TestCase):
+    def setUp(self):
+        self.organization = Organization.objects.create(name="org")
+
+    def test_save_sets_host_hash(self):
+        [dp] = create_datapoints(1, self.organization)
+        self.assertEqual(dp.host_hash, url_host_hash("https://site0.example.com/"))
+        dp.url = "https://other.example.com/page"
+        dp.save(update_fields=['url'])
+        dp.refresh_from_db()
+        self.assertEqual(dp.host_hash, url_host_hash("https://other.example.com/"))
+
+    def test_raw_save_sets_host_hash(self):
+        dp = Datapoint(
+            pk=1000, name="fixture", url="https://fixture.example.com/", xpath="//h1", data_type="TXT",
+            organization=self.organization, created_at=timezone.now(), updated_at=timezone.now(), last_updated=timezone.now(),
+        )
+        dp.save_base(raw=True)
+        self.assertEqual(Datapoint.objects.get(pk=1000).host_hash, url_host_hash("https://fixture.example.com/"))
+
+    def test_rebuild_fixes_hashes_skipped_by_bulk_writes(self):
+        Datapoint.objects.bulk_create([
+            Datapoint(name="bulk", url="https://bulk.example.com/", xpath="//h1", data_type="TXT", organization=self.organization),
+        ])
+        create_datapoints(2, self.organization)
+        Datapoint.objects.filter(name="dp0").update(url="https://moved.example.com/")
+        self.assertEqual(rebuild_host_hashes(), 2)
+        for dp in Datapoint.objects.all():
+            self.assertEqual(dp.host_hash, url_host_hash(dp.url))
+        call_command('rebuild_host_hashes', stdout=StringIO())
+        self.assertEqual(rebuild_host_hashes(), 0)
+
+    def test_shards_partition_the_datapoints(self):
+        create_datapoints(20, self.organization)
+        shards = [set(in_shard(Datapoint.objects.all(), (i, 3)).values_list('pk', flat=True)) for i in range(3)]
+        self.assertEqual(sum(len(shard) for shard in shards), 20)
+        self.assertEqual(set.union(*shards), set(Datapoint.objects.values_list('pk', flat=True)))
+
+    def test_parse_shard(self):
+        self.assertEqual(parse_shard("1/4"), (1, 4))
+        for value in ("4/4", "-1/4", "1/0", "a/b", "1"):
+            with self.assertRaises(ValueError):
+                parse_shard(value)
+
+
+class LeaseTests(TestCase):
+    def setUp(self):
+        self.datapoints = create_datapoints(5, Organization.objects.create(name="org"))
+        self.all = Datapoint.objects.all()
+
+    def test_claim_skips_rows_leased_to_others(self):
+        first = claim(self.all, "a", 3, 60)
+        self.assertEqual(len(first), 3)
+        second = claim(self.all, "b", 5, 60)
+        self.assertEqual(sorted(first + second), sorted(dp.pk for dp in self.datapoints))
+        self.assertEqual(claim(self.all, "c", 5, 60), [])
+
+    def test_expired_lease_is_taken_over(self):
+        claimed = claim(self.all, "crashed", 5, 60)
+        Datapoint.objects.filter(pk__in=claimed[:2]).update(lease_expires_at=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(sorted(claim(self.all, "b", 5, 60)), sorted(claimed[:2]))
+
+    def test_heartbeat_extends_and_releases_leases(self):
+        claimed = claim(self.all, "a", 5, 60)
+        Datapoint.objects.update(lease_expires_at=timezone.now() + timedelta(seconds=1))
+        heartbeat = Heartbeat("a", 60)
+        self.assertEqual(heartbeat.beat(), 5)
+        self.assertEqual(claim(self.all, "b", 5, 60), [])
+        self.assertEqual(release("a", claimed[:1]), 1)
+        self.assertEqual(claim(self.all, "b", 5, 60), claimed[:1])
+        self.assertEqual(release("a"), 4)
+
+
+class ClaimRetryTests(TransactionTestCase):
+    # Outside a transaction, as in run_scraper: claim does not retry inside one
+    def setUp(self):
+        create_datapoints(2, Organization.objects.create(name="org"))
+
+    def test_claim_retries_while_the_database_is_locked(self):
+        locked = OperationalError("database is locked")
+        with mock.patch("datapointScraperApp.leases._claim", side_effect=[locked, locked, [1, 2]]) as attempt, \
+                mock.patch("datapointScraperApp.leases.time.sleep") as sleep:
+            self.assertEqual(claim(Datapoint.objects.all(), "a", 5, 60), [1, 2])
+        self.assertEqual(attempt.call_count, 3)
+        self.assertEqual(sleep.call_count, 2)
+
+    def test_claim_gives_up_after_its_retries(self):
+        with mock.patch("datapointScraperApp.leases._claim", side_effect=OperationalError("database is locked")) as attempt, \
+                mock.patch("datapointScraperApp.leases.time.sleep"):
+            with self.assertRaises(OperationalError):
+                claim(Datapoint.objects.all(), "a", 5, 60, retries=2)
+        self.assertEqual(attempt.call_count, 3)
+
+    def test_claim_does_not_retry_other_errors(self):
+        with mock.patch("datapointScraperApp.leases._claim", side_effect=OperationalError("no such table")) as attempt:
+            with self.assertRaises(OperationalError):
+                claim(Datapoint.objects.all(), "a", 5, 60)
+        self.assertEqual(attempt.call_count, 1)
+
+
+class ClaimRaceTests(TransactionTestCase):
+    # The test database is a file (see settings.DATABASES), so each thread
+    # has its own connection and they contend for SQLite's write lock
+    def test_concurrent_claims_lease_every_row_once(self):
+        organization = Organization.objects.create(name="org")
+        expected = {dp.pk for dp in create_datapoints(60, organization)}
+        claims = {}
+        errors = []
+        barrier = threading.Barrier(4)
+
+        def worker(owner):
+            claimed = claims[owner] = []
+            try:
+                barrier.wait()
+                while True:
+                    pks = claim(Datapoint.objects.all(), owner, 5, 60)
+                    if not pks:
+                        return
+                    claimed.extend(pks)
+                    # Stands in for scraping the batch, letting the others in
+                    time.sleep(0.005)
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker, args=(f"owner{i}",)) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        every_claim = [pk for pks in claims.values() for pk in pks]
+        self.assertEqual(len(every_claim), len(set(every_claim)), "a row was leased twice")
+        self.assertEqual(set(every_claim), expected)
+        self.assertGreater(sum(1 for pks in claims.values() if pks), 1, "the claims did not overlap")
+        for owner, pks in claims.items():
+            self.assertEqual(set(Datapoint.objects.filter(lease_owner=owner).values_list('pk', flat=True)), set(pks))
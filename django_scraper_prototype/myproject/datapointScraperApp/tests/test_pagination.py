@@ -0,0 +1,85 @@
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.utils import timezone
+
+from datapointScraperApp.models import Datapoint, Organization
+from datapointScraperApp.pagination import InvalidCursor, decode_cursor, encode_cursor, keyset_page
+
+
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        organization = Organization.objects.create(name="org")
+        for i in range(8):
+            Datapoint.objects.create(
+                name=f"dp{i}", url="https://example.com/", xpath="//h1", data_type="TXT", organization=organization,
+            )
+        # Ties on created_at: three pairs share a timestamp, so only the id orders them
+        now = timezone.now()
+        for i, dp in enumerate(Datapoint.objects.order_by('id')):
+            Datapoint.objects.filter(pk=dp.pk).update(created_at=now - timedelta(minutes=i // 2))
+        self.queryset = Datapoint.objects.all()
+        self.expected = list(self.queryset.order_by('-created_at', 'id').values_list('pk', flat=True))
+
+    def walk_forward(self, per_page):
+        pages, after = [], None
+        while True:
+            page = keyset_page(self.queryset, per_page, after=after)
+            pages.append(page)
+            if not page.has_next():
+                return pages
+            after = page.next_cursor
+
+    def test_forward_pages_cover_every_row_once_in_order(self):
+        pages = self.walk_forward(3)
+        self.assertEqual([dp.pk for page in pages for dp in page], self.expected)
+        self.assertEqual([len(page) for page in pages], [3, 3, 2])
+        self.assertFalse(pages[0].has_previous())
+        self.assertTrue(pages[1].has_previous())
+
+    def test_before_cursor_returns_the_previous_page(self):
+        pages = self.walk_forward(3)
+        for earlier, later in zip(pages, pages[1:]):
+            page = keyset_page(self.queryset, 3, before=later.previous_cursor)
+            self.assertEqual([dp.pk for dp in page], [dp.pk for dp in earlier])
+        # Back on the first page there is nothing before it, and next leads forward again
+        first = keyset_page(self.queryset, 3, before=pages[1].previous_cursor)
+        self.assertFalse(first.has_previous())
+        self.assertEqual(first.next_cursor, pages[0].next_cursor)
+
+    def test_cursor_round_trip(self):
+        dp = self.queryset.first()
+        self.assertEqual(decode_cursor(encode_cursor(dp)), (dp.created_at, dp.pk))
+
+    def test_invalid_cursors(self):
+        for token in ("garbage", "", encode_cursor(self.queryset.first())[:-4] + "!!!!"):
+            with self.assertRaises(InvalidCursor):
+                decode_cursor(token)
+        cursor = encode_cursor(self.queryset.first())
+        with self.assertRaises(InvalidCursor):
+            keyset_page(self.queryset, 3, after=cursor, before=cursor)
+
+
+class DatapointListViewTests(TestCase):
+    def setUp(self):
+        organization = Organization.objects.create(name="org")
+        for i in range(25):
+            Datapoint.objects.create(
+                name=f"dp{i}", url="https://example.com/", xpath="//h1", data_type="TXT", organization=organization,
+            )
+        self.client.force_login(User.objects.create_user("u", "u@example.com", "p"))
+
+    def test_pages_by_cursor(self):
+        first = self.client.get('/datapoints/')
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(len(first.context['datapoints']), 20)
+        self.assertEqual(first.context['total_count'], 25)
+        second = self.client.get('/datapoints/', {'after': first.context['page_obj'].next_cursor})
+        self.assertEqual(len(second.context['datapoints']), 5)
+        shown = [dp.pk for dp in first.context['datapoints']] + [dp.pk for dp in second.context['datapoints']]
+        self.assertEqual(sorted(shown), sorted(Datapoint.objects.values_list('pk', flat=True)))
+
+    def test_invalid_cursor_is_a_404(self):
+        self.assertEqual(self.client.get('/datapoints/', {'after': 'not-a-cursor'}).status_code, 404)
+        self.assertEqual(self.client.get('/datapoints/', {'before': 'bm90fGE'}).status_code, 404)
@@ -0,0 +1,142 @@
+import threading
+import time
+from datetime import timedelta
+from unittest import mock
+
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from datapointScraperApp.models import Datapoint, Organization, ScrapeRun
+from datapointScraperApp.runs import execute_run, fail_stalled, is_stalled, start_run
+from datapointScraperApp.utils import ScrapeSummary, run_scraping
+
+
+def create_datapoints(count, organization):
+    return [
+        Datapoint.objects.create(
+            name=f"dp{i}", url=f"https://example.com/{i}", xpath="//h1", data_type="TXT", organization=organization,
+        )
+        for i in range(count)
+    ]
+
+
+def results_for(datapoints):
+    return [{"id": dp.pk, "url": dp.url, "status": "failed", "error": "timeout"} for dp in datapoints]
+
+
+class RunScrapingProgressTests(TestCase):
+    def setUp(self):
+        self.datapoints = create_datapoints(5, Organization.objects.create(name="org"))
+
+    def scrape(self):
+        counts = []
+        summary = ScrapeSummary()
+        with mock.patch("datapointScraperApp.utils.stream_scraping_results", return_value=iter(results_for(self.datapoints))):
+            run_scraping(self.datapoints, summary, on_chunk=lambda s: counts.append(s.count("failed")))
+        return counts
+
+    @override_settings(SCRAPER_WRITE_BATCH_SIZE=200, SCRAPER_WRITE_INTERVAL=3600)
+    def test_writes_full_chunks(self):
+        self.assertEqual(self.scrape(), [5])
+
+    @override_settings(SCRAPER_WRITE_BATCH_SIZE=200, SCRAPER_WRITE_INTERVAL=0)
+    def test_writes_partial_chunk_after_interval(self):
+        self.assertEqual(self.scrape(), [1, 2, 3, 4, 5])
+        self.assertEqual(Datapoint.objects.filter(status=Datapoint.STATUS_FIX).count(), 5)
+
+
+def age(run, seconds):
+    ScrapeRun.objects.filter(pk=run.pk).update(updated_at=timezone.now() - timedelta(seconds=seconds))
+    run.refresh_from_db()
+
+
+@override_settings(SCRAPE_RUN_STALE_SECONDS=900)
+class StalledRunTests(TestCase):
+    def test_running_run_is_stalled_once_its_heartbeat_stops(self):
+        run = ScrapeRun.objects.create(status=ScrapeRun.STATUS_RUNNING)
+        self.assertFalse(is_stalled(run))
+        age(run, 1000)
+        self.assertTrue(is_stalled(run))
+
+    def test_queued_run_waiting_behind_a_live_run_is_not_stalled(self):
+        queued = ScrapeRun.objects.create()
+        age(queued, 1000)
+        running = ScrapeRun.objects.create(status=ScrapeRun.STATUS_RUNNING)
+        self.assertFalse(is_stalled(queued))
+        age(running, 1000)
+        self.assertTrue(is_stalled(queued))
+
+    def test_fail_stalled_leaves_a_run_that_moved_on(self):
+        run = ScrapeRun.objects.create(status=ScrapeRun.STATUS_RUNNING)
+        age(run, 1000)
+        ScrapeRun.objects.filter(pk=run.pk).update(updated_at=timezone.now())
+        self.assertFalse(fail_stalled(run))
+        self.assertEqual(run.status, ScrapeRun.STATUS_RUNNING)
+
+    def test_start_run_replaces_only_a_stalled_run(self):
+        live, created = start_run(ScrapeRun.SCOPE_ALL, None)
+        self.assertTrue(created)
+        self.assertEqual(start_run(ScrapeRun.SCOPE_ALL, None), (live, False))
+        ScrapeRun.objects.filter(pk=live.pk).update(status=ScrapeRun.STATUS_RUNNING)
+        age(live, 1000)
+        run, created = start_run(ScrapeRun.SCOPE_ALL, None)
+        self.assertTrue(created)
+        self.assertNotEqual(run.pk, live.pk)
+        live.refresh_from_db()
+        self.assertEqual(live.status, ScrapeRun.STATUS_FAILED)
+
+
+class ExecuteRunTests(TransactionTestCase):
+    def setUp(self):
+        create_datapoints(3, Organization.objects.create(name="org"))
+
+    def execute(self, run_pk):
+        # execute_run closes its thread's database connection, as the executor's threads need
+        thread = threading.Thread(target=execute_run, args=(run_pk,))
+        thread.start()
+        thread.join()
+
+    def test_run_is_scraped_once(self):
+        run = ScrapeRun.objects.create()
+        with mock.patch("datapointScraperApp.runs.run_scraping", return_value=3) as scrape:
+            self.execute(run.pk)
+            self.execute(run.pk)
+        self.assertEqual(scrape.call_count, 1)
+        run.refresh_from_db()
+        self.assertEqual((run.status, run.total), (ScrapeRun.STATUS_DONE, 3))
+
+    def test_abandoned_run_is_not_started(self):
+        run = ScrapeRun.objects.create(status=ScrapeRun.STATUS_FAILED)
+        with mock.patch("datapointScraperApp.runs.run_scraping") as scrape:
+            self.execute(run.pk)
+        scrape.assert_not_called()
+
+    def test_run_abandoned_while_running_stops_and_stays_failed(self):
+        run = ScrapeRun.objects.create()
+
+        def scrape(datapoints, summary, on_chunk):
+            fail_stalled(ScrapeRun.objects.get(pk=run.pk))
+            on_chunk(summary)
+            raise AssertionError("the run kept going after it was abandoned")
+
+        with mock.patch("datapointScraperApp.runs.run_scraping", side_effect=scrape):
+            self.execute(run.pk)
+        run.refresh_from_db()
+        self.assertEqual(run.status, ScrapeRun.STATUS_FAILED)
+        self.assertEqual(run.error, "The run stopped making progress and was abandoned.")
+
+    @override_settings(SCRAPE_RUN_STALE_SECONDS=0.3)
+    def test_heartbeat_keeps_a_slow_run_alive(self):
+        run = ScrapeRun.objects.create()
+        stalled = []
+
+        def scrape(datapoints, summary, on_chunk):
+            time.sleep(0.5)
+            stalled.append(is_stalled(ScrapeRun.objects.get(pk=run.pk)))
+            return len(datapoints)
+
+        with mock.patch("datapointScraperApp.runs.run_scraping", side_effect=scrape):
+            self.execute(run.pk)
+        self.assertEqual(stalled, [False])
+        run.refresh_from_db()
+        self.assertEqual(run.status, ScrapeRun.STATUS_DONE)
@@ -0,0 +1,130 @@
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from datapointScraperApp.models import Datapoint, Organization
+from datapointScraperApp.scheduler import DueScheduler
+from datapointScraperApp.scraper.scraper import UpdateSummary, _write_back
+from scraper_common.fingerprint import fingerprint
+
+
+class RescheduleTests(TestCase):
+    def setUp(self):
+        self.organization = Organization.objects.create(name="org")
+
+    def datapoint(self, **fields):
+        return Datapoint.objects.create(
+            name="dp", url="https://example.com/", xpath="//h1", data_type="TXT",
+            organization=self.organization, refresh_interval=3600, **fields,
+        )
+
+    def test_unchanged_data_stays_auto_and_is_due_again(self):
+        dp = self.datapoint(current_verified_data="value")
+        before = timezone.now()
+        _write_back([(dp.pk, " value ", None)], UpdateSummary(), jitter=0)
+        dp.refresh_from_db()
+        self.assertEqual(dp.status, Datapoint.STATUS_AUTO)
+        self.assertEqual(dp.verified_fingerprint, fingerprint("value", "TXT"))
+        self.assertGreaterEqual(dp.last_verified, before)
+        self.assertGreaterEqual(dp.next_due_at, before + timedelta(seconds=3600))
+
+    def test_unchanged_by_fingerprint(self):
+        dp = self.datapoint(current_verified_data="old text", verified_fingerprint=fingerprint("value", "TXT"))
+        _write_back([(dp.pk, "value", None)], UpdateSummary())
+        dp.refresh_from_db()
+        self.assertEqual(dp.status, Datapoint.STATUS_AUTO)
+
+    def test_changed_data_goes_to_verify_and_missing_data_to_fix(self):
+        changed = self.datapoint(current_verified_data="old")
+        missing = self.datapoint(current_verified_data="old")
+        _write_back([(changed.pk, "new", None), (missing.pk, None, "timeout")], UpdateSummary())
+        self.assertEqual(Datapoint.objects.get(pk=changed.pk).status, Datapoint.STATUS_VERIFY)
+        self.assertEqual(Datapoint.objects.get(pk=missing.pk).status, Datapoint.STATUS_FIX)
+
+    def test_daemon_scrapes_an_unchanged_datapoint_every_interval(self):
+        dp = self.datapoint(current_verified_data="value")
+        scraped = []
+
+        def scrape(queryset):
+            pks = list(queryset.values_list('pk', flat=True))
+            scraped.extend(pks)
+            _write_back([(pk, "value", None) for pk in pks], UpdateSummary(), owner="test", jitter=0)
+
+        now = [timezone.now()]
+        scheduler = DueScheduler(scrape, "test", batch_size=10, tick=30, jitter=0, linger=0, clock=lambda: now[0])
+        scheduler.run_once()
+        scheduler.run_once()
+        self.assertEqual(scraped, [dp.pk])
+        now[0] += timedelta(seconds=3600 + 60)
+        scheduler.run_once()
+        self.assertEqual(scraped, [dp.pk, dp.pk])
+        dp.refresh_from_db()
+        self.assertEqual(dp.status, Datapoint.STATUS_AUTO)
+        self.assertIsNone(dp.lease_owner)
+
+
+class DispatchSizeTests(TestCase):
+    def setUp(self):
+        organization = Organization.objects.create(name="org")
+        self.pks = [
+            Datapoint.objects.create(
+                name=f"dp{i}", url=f"https://example.com/{i}", xpath="//h1", data_type="TXT", organization=organization,
+            ).pk
+            for i in range(4)
+        ]
+        self.dispatches = []
+        self.now = [timezone.now()]
+        self.scheduler = DueScheduler(
+            lambda queryset: self.dispatches.append(sorted(queryset.values_list('pk', flat=True))),
+            "test", batch_size=2, workers=2, tick=30, jitter=0, clock=lambda: self.now[0],
+        )
+
+    def advance(self, seconds):
+        self.now[0] += timedelta(seconds=seconds)
+        return self.scheduler.run_once()
+
+    def test_overdue_rows_are_collected_into_one_dispatch_for_all_workers(self):
+        # Paced at tick / (batch_size * workers) apart: 0, 7.5, 15 and 22.5s
+        self.assertEqual(self.advance(0), 7.5)
+        self.advance(15)
+        self.assertEqual(self.dispatches, [])
+        self.advance(7.5)
+        self.assertEqual(self.dispatches, [sorted(self.pks)])
+
+    def test_a_lone_due_row_waits_at_most_linger(self):
+        Datapoint.objects.exclude(pk=self.pks[0]).update(next_due_at=self.now[0] + timedelta(days=1))
+        self.assertEqual(self.advance(0), 30)
+        self.advance(29)
+        self.assertEqual(self.dispatches, [])
+        self.advance(1)
+        self.assertEqual(self.dispatches, [[self.pks[0]]])
+
+
+class RunOnceTests(TestCase):
+    def setUp(self):
+        organization = Organization.objects.create(name="org")
+        self.datapoints = [
+            Datapoint.objects.create(
+                name=f"dp{i}", url=f"https://example.com/{i}", xpath="//h1", data_type="TXT",
+                organization=organization, current_verified_data="value",
+            )
+            for i in range(3)
+        ]
+        self.scraped = []
+
+    def scrape_url_groups(self, groups, wait_mode="networkidle"):
+        if len(self.scraped) > 10:
+            raise AssertionError("run_scraper keeps scraping the same Datapoints")
+        results = [(pk, "value", None) for _, tasks in groups for pk, _, _ in tasks]
+        self.scraped.extend(pk for pk, _, _ in results)
+        return results
+
+    def test_one_shot_run_ends_when_the_data_is_unchanged(self):
+        with mock.patch("datapointScraperApp.scraper.scraper.scrape_url_groups", side_effect=self.scrape_url_groups):
+            call_command("run_scraper", "--batch-size", "1", "--workers", "1", stdout=StringIO())
+        self.assertEqual(sorted(self.scraped), sorted(dp.pk for dp in self.datapoints))
+        self.assertEqual(Datapoint.objects.filter(status=Datapoint.STATUS_AUTO).count(), 3)
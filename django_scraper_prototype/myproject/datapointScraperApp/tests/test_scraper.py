@@ -0,0 +1,57 @@
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.utils import timezone
+
+from datapointScraperApp.models import Datapoint, Organization
+from datapointScraperApp.scraper.scraper import UpdateSummary, _apply_update, _write_back
+from scraper_common.fingerprint import fingerprint
+
+
+class FingerprintTests(TestCase):
+    def test_ignores_whitespace_attribute_order_and_volatile_attributes(self):
+        self.assertEqual(fingerprint("  a \n b ", "TXT"), fingerprint("a b", "TXT"))
+        self.assertEqual(
+            fingerprint('<p class="x" id="y" nonce="1">a  b</p>', "HTML"),
+            fingerprint('<p id="y" class="x" nonce="2">a b</p>', "HTML"),
+        )
+        self.assertNotEqual(fingerprint("a", "TXT"), fingerprint("b", "TXT"))
+
+    def test_matches_the_scraper_service(self):
+        # sha256("hello world") after collapsing whitespace, as the service computes it
+        self.assertEqual(
+            fingerprint(" hello\tworld ", "TXT"),
+            "b94d27b9934d3e08a52e52d7da7dabfac484efe37a5380ee9088f7ace2efcde9",
+        )
+
+
+class ApplyUpdateTests(TestCase):
+    def setUp(self):
+        self.organization = Organization.objects.create(name="org")
+
+    def datapoint(self, **fields):
+        return Datapoint.objects.create(
+            name="dp", url="https://example.com/", xpath="//h1", data_type="TXT",
+            organization=self.organization, **fields,
+        )
+
+    def test_stores_the_fingerprint_of_new_data(self):
+        dp = self.datapoint()
+        _write_back([(dp.pk, "new value", None)], UpdateSummary())
+        dp.refresh_from_db()
+        self.assertEqual(dp.current_unverified_data, "new value")
+        self.assertEqual(dp.scraped_fingerprint, fingerprint("new value", "TXT"))
+
+    def test_skips_rewriting_unchanged_data(self):
+        dp = self.datapoint(current_unverified_data="value", scraped_fingerprint=fingerprint("value", "TXT"))
+        fields = _apply_update(dp, "value ", None, timezone.now())
+        self.assertNotIn('current_unverified_data', fields)
+        self.assertNotIn('scraped_fingerprint', fields)
+
+    def test_verifying_keeps_the_fingerprint(self):
+        dp = self.datapoint()
+        _write_back([(dp.pk, "value", None)], UpdateSummary())
+        dp.refresh_from_db()
+        self.client.force_login(User.objects.create_user("u", "u@example.com", "p"))
+        self.client.post(f'/datapoints/verify/{dp.pk}/')
+        dp.refresh_from_db()
+        self.assertEqual(dp.verified_fingerprint, fingerprint("value", "TXT"))
@@ -0,0 +1,93 @@
+from django.db.models import Count
+from django.test import TestCase
+
+from datapointScraperApp.models import Datapoint, Organization, OrganizationStatusCount
+from datapointScraperApp.scraper.scraper import UpdateSummary, _write_back
+from datapointScraperApp.status_counts import organizations_with_status_counts, rebuild_status_counts
+from datapointScraperApp.utils import ScrapeSummary, apply_scrape_results
+
+
+class StatusCountTests(TestCase):
+    def setUp(self):
+        self.a = Organization.objects.create(name="a")
+        self.b = Organization.objects.create(name="b")
+
+    def datapoint(self, organization, **fields):
+        return Datapoint.objects.create(
+            name="dp", url="https://example.com/", xpath="//h1", data_type="TXT", organization=organization, **fields,
+        )
+
+    def assertCountersMatch(self):
+        counters = {
+            (c.organization_id, c.status): c.count
+            for c in OrganizationStatusCount.objects.all() if c.count
+        }
+        truth = {
+            (row['organization'], row['status']): row['total']
+            for row in Datapoint.objects.order_by().values('organization', 'status').annotate(total=Count('id'))
+        }
+        self.assertEqual(counters, truth)
+
+    def test_create(self):
+        self.datapoint(self.a)
+        self.datapoint(self.a, status=Datapoint.STATUS_VERIFY)
+        self.datapoint(self.b)
+        self.assertCountersMatch()
+
+    def test_status_and_organization_change(self):
+        dp = self.datapoint(self.a)
+        dp.status = Datapoint.STATUS_FIX
+        dp.save()
+        self.assertCountersMatch()
+        dp.organization = self.b
+        dp.save(update_fields=['organization'])
+        self.assertCountersMatch()
+
+    def test_save_of_unrelated_fields_leaves_counters_alone(self):
+        dp = self.datapoint(self.a)
+        dp.name = "renamed"
+        dp.save(update_fields=['name'])
+        self.assertCountersMatch()
+
+    def test_delete(self):
+        dp = self.datapoint(self.a)
+        self.datapoint(self.a)
+        dp.delete()
+        self.assertCountersMatch()
+        self.b.delete()
+        self.a.delete()
+        self.assertFalse(OrganizationStatusCount.objects.exists())
+
+    def test_apply_scrape_results_bulk_path(self):
+        changed = self.datapoint(self.a, current_verified_data="old")
+        unchanged = self.datapoint(self.a, current_verified_data="same")
+        failed = self.datapoint(self.b)
+        apply_scrape_results([
+            {"id": changed.id, "status": "success", "scraped_data": "new"},
+            {"id": unchanged.id, "status": "success", "scraped_data": "same"},
+            {"id": failed.id, "status": "failed", "error": "timeout"},
+        ], ScrapeSummary())
+        self.assertEqual(Datapoint.objects.get(pk=changed.pk).status, Datapoint.STATUS_VERIFY)
+        self.assertEqual(Datapoint.objects.get(pk=unchanged.pk).status, Datapoint.STATUS_AUTO)
+        self.assertEqual(Datapoint.objects.get(pk=failed.pk).status, Datapoint.STATUS_FIX)
+        self.assertCountersMatch()
+
+    def test_run_scraper_bulk_path(self):
+        scraped = self.datapoint(self.a)
+        missing = self.datapoint(self.b)
+        _write_back([(scraped.pk, "value", None), (missing.pk, None, "timeout")], UpdateSummary())
+        self.assertCountersMatch()
+
+    def test_rebuild(self):
+        self.datapoint(self.a)
+        self.datapoint(self.b, status=Datapoint.STATUS_MANUAL)
+        OrganizationStatusCount.objects.update(count=99)
+        rebuild_status_counts()
+        self.assertCountersMatch()
+
+    def test_organizations_with_status_counts(self):
+        self.datapoint(self.a)
+        self.datapoint(self.a, status=Datapoint.STATUS_FIX)
+        a, b = organizations_with_status_counts()
+        self.assertEqual((a.auto_count, a.fix_count, a.verify_count), (1, 1, 0))
+        self.assertEqual(b.auto_count, 0)
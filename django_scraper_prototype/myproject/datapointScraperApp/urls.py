@@ -7,17 +7,22 @@ urlpatterns = [
     path('settings/', views.user_settings, name='user-settings'),
 
     path('testPage/', views.testPage, name='testPage'),
+    path('metrics/', views.metrics_view, name='metrics'),
+    path('dashboard/chart-data/', views.dashboard_chart_data, name='dashboard-chart-data'),
 
     path('datapoints/create/', views.DatapointCreateView.as_view(), name='datapoint-create'),
     path('datapoints/', views.DatapointListView.as_view(), name='datapoint-list'),
     path('datapoints/<int:datapoint_id>/scrape/', views.ScrapeDatapointView.as_view(), name='scrape_datapoint'),
-    # path('datagroups/<int:datagroup_id>/scrape/', views.ScrapeDataGroupView.as_view(), name='scrape_datagroup'),
-    # path('organisations/<int:organisation_id>/scrape/', views.ScrapeOrganizationView.as_view(), name='scrape_organisation'),
+    path('datagroups/<int:datagroup_id>/scrape/', views.ScrapeDataGroupView.as_view(), name='scrape_datagroup'),
+    path('organisations/<int:organisation_id>/scrape/', views.ScrapeOrganizationView.as_view(), name='scrape_organisation'),
     path('datapoints/scrape_all/', views.ScrapeAllDatapointsView.as_view(), name='scrape_all_datapoints'),
+    path('scrape_runs/<int:pk>/', views.scrape_run_detail, name='scrape_run_detail'),
+    path('scrape_runs/<int:pk>/progress/', views.scrape_run_progress, name='scrape_run_progress'),
     path('test-xpath/', views.TestXPathView.as_view(), name='test_xpath'),
 
     path('datapoints/detail/<int:pk>/', views.datapoint_detail, name='datapoint-detail'),
     path('datapoints/edit/<int:pk>/', views.datapoint_edit, name='datapoint-edit'),
+    path('datapoints/snapshot/<int:pk>/', views.datapoint_snapshot, name='datapoint-snapshot'),
     path('datapoints/verify/<int:pk>/', views.datapoint_verify, name='datapoint-verify'),
     path('datapoints/delete/<int:pk>/', views.datapoint_delete, name='datapoint-delete'),
     path('datapoints/revert/<int:pk>/', views.datapoint_revert, name='datapoint-revert'),
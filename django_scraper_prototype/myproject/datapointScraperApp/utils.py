@@ -1,21 +1,82 @@
 import requests
 import json
 import logging
+import time
+from collections import defaultdict
 from django.conf import settings
+from django.db import transaction
 from django.utils import timezone
 from .models import Datapoint, UserProfile
+from .metrics import BATCH_SIZE, RESULTS, SCRAPE_SECONDS, SERVICE_ERRORS, WRITE_BACK_SECONDS
+from .status_counts import adjust_status_counts, status_count_changes
 from django.contrib import messages
 
 logger = logging.getLogger(__name__)
 
+def scraper_url(path):
+    """
+    Builds the URL of an endpoint on the FastAPI scraper service.
+    """
+    return settings.SCRAPER_SERVICE_URL.rstrip("/") + path
+
+
+def scraper_headers(**extra):
+    # Retrieve the API token from Django settings
+    API_TOKEN = settings.SCRAPER_API_TOKEN
+    return {
+        "Authorization": f"Bearer {API_TOKEN}",
+        "Content-Type": "application/json",
+        **extra,
+    }
+
+
 def perform_scraping(request, datapoints):
     """
     Performs scraping for a list of datapoints.
+    Results are streamed back from the scraper service and written back in
+    chunks as they arrive; the user gets one summary message at the end.
     """
     if not datapoints:
         messages.warning(request, "No Datapoints available for scraping.")
         return
 
+    summary = ScrapeSummary()
+    try:
+        if not run_scraping(datapoints, summary):
+            messages.warning(request, "No valid Datapoints to scrape after validation.")
+            return
+    except (ScraperServiceError, requests.exceptions.RequestException, json.JSONDecodeError) as e:
+        logger.error(f"Scraping failed: {e!r}")
+        messages.error(request, scraping_error_message(e))
+    summary.report(request)
+
+
+def scraping_error_message(e):
+    """
+    What to tell the user when run_scraping raised `e`.
+    """
+    if isinstance(e, ScraperServiceError):
+        return f"Failed to initiate scraping: {e}"
+    if isinstance(e, requests.exceptions.RequestException):
+        return f"Error connecting to the scraper service: {e}"
+    if isinstance(e, json.JSONDecodeError):
+        return "Invalid response from the scraper service."
+    return f"Scraping failed: {e}"
+
+
+def run_scraping(datapoints, summary, on_chunk=None):
+    """
+    Sends the datapoints to the scraper service and writes the results back
+    in chunks as they arrive, counting outcomes in `summary`. A chunk is
+    written when it has SCRAPER_WRITE_BATCH_SIZE results or has waited
+    SCRAPER_WRITE_INTERVAL seconds. Calls `on_chunk(summary)` after each
+    chunk. Returns the number of tasks sent (0 if none of the datapoints
+    was valid).
+
+    Raises ScraperServiceError, requests.exceptions.RequestException or
+    json.JSONDecodeError if talking to the scraper service fails; results
+    written back before that are kept.
+    """
     payload = {
         "tasks": []
     }
@@ -23,7 +84,7 @@ def perform_scraping(request, datapoints):
     for dp in datapoints:
         if not dp.url or not dp.xpath:
             logger.warning(f"Datapoint '{dp.name}' is missing 'url' or 'xpath'. Skipping.")
-            messages.warning(request, f"Datapoint '{dp.name}' is missing 'url' or 'xpath'. Skipping.")
+            summary.add("invalid", dp.name)
             continue
 
         if dp.data_type.upper() not in ['TXT', 'HTML']:
@@ -33,89 +94,286 @@ def perform_scraping(request, datapoints):
             data_type = dp.data_type.upper()
 
         payload["tasks"].append({
+            "id": dp.id,
             "url": dp.url,
             "xpath": dp.xpath,
             "data_type": data_type
         })
 
     if not payload["tasks"]:
-        messages.warning(request, "No valid Datapoints to scrape after validation.")
-        return
+        return 0
 
     # Log the payload
     logger.debug(f"Scraping payload: {json.dumps(payload)}")
 
-    # Retrieve the API token from Django settings
-    API_TOKEN = settings.SCRAPER_API_TOKEN
+    BATCH_SIZE.observe(len(payload["tasks"]))
+    mode = "job" if len(payload["tasks"]) > settings.SCRAPER_JOB_THRESHOLD else "stream"
+    try:
+        with SCRAPE_SECONDS.time(mode=mode):
+            if mode == "job":
+                # Large batches run as a background job, so no single request has to outlast the batch
+                job = submit_scraping_job(payload)
+                logger.info(f"Submitted scraping job {job['job_id']} with {job['total']} task(s).")
+                results = iter_scraping_job_results(job["job_id"])
+            else:
+                results = stream_scraping_results(payload)
 
-    headers = {
-        "Authorization": f"Bearer {API_TOKEN}",
-        "Content-Type": "application/json"
-    }
+            # Write results back as they arrive, a chunk at a time: when the chunk is
+            # full or has waited SCRAPER_WRITE_INTERVAL seconds, whichever comes first
+            chunk = []
+            written_at = time.monotonic()
+            for result in results:
+                chunk.append(result)
+                if (len(chunk) >= settings.SCRAPER_WRITE_BATCH_SIZE
+                        or time.monotonic() - written_at >= settings.SCRAPER_WRITE_INTERVAL):
+                    apply_scrape_results(chunk, summary)
+                    chunk = []
+                    written_at = time.monotonic()
+                    if on_chunk is not None:
+                        on_chunk(summary)
+            if chunk:
+                apply_scrape_results(chunk, summary)
+                if on_chunk is not None:
+                    on_chunk(summary)
+    except (ScraperServiceError, requests.exceptions.RequestException, json.JSONDecodeError):
+        SERVICE_ERRORS.inc()
+        raise
+    return len(payload["tasks"])
 
-    try:
-        # Send POST request to FastAPI scraper
-        response = requests.post(
-            "http://127.0.0.1:8001/scrape/batch",  # FastAPI batch endpoint on port 8001
-            json=payload,
-            headers=headers,
-            timeout=60  # Adjust timeout as needed
-        )
 
-        logger.info(f"FastAPI Response Status Code: {response.status_code}")
-        logger.info(f"FastAPI Response Content: {response.text}")
+class ScrapeSummary:
+    """
+    Counts scrape outcomes so a batch ends in a handful of messages instead of one per Datapoint.
+    """
+    # Names listed per outcome in the summary; the rest are only counted
+    MAX_NAMES = 5
+
+    def __init__(self):
+        self.names = defaultdict(list)
+
+    def add(self, outcome, name):
+        self.names[outcome].append(name)
+
+    def count(self, outcome):
+        return len(self.names[outcome])
+
+    def _names(self, outcome):
+        names = self.names[outcome]
+        listed = ", ".join(names[:self.MAX_NAMES])
+        if len(names) > self.MAX_NAMES:
+            listed += f" and {len(names) - self.MAX_NAMES} more"
+        return listed
 
-        if response.status_code == 200:
-            response_data = response.json()
-            results = response_data.get("results", [])
+    def report(self, request):
+        for level, text in self.messages():
+            messages.add_message(request, level, text)
 
+    def messages(self):
+        """
+        The summary as (message level, text) pairs, for the messages framework
+        or for a ScrapeRun to keep.
+        """
+        lines = []
+        done = self.count("unchanged") + self.count("changed")
+        if done:
+            lines.append((
+                messages.SUCCESS,
+                f"Scraped {done} Datapoint(s): {self.count('unchanged')} unchanged, "
+                f"{self.count('changed')} changed and set to VERIFY for user verification.",
+            ))
+        if self.count("failed"):
+            lines.append((messages.ERROR, f"Failed to scrape {self.count('failed')} Datapoint(s), set to FIX: {self._names('failed')}."))
+        if self.count("skipped"):
+            lines.append((
+                messages.WARNING,
+                f"Skipped {self.count('skipped')} Datapoint(s) because their site keeps failing to load: {self._names('skipped')}.",
+            ))
+        if self.count("invalid"):
+            lines.append((messages.WARNING, f"Skipped {self.count('invalid')} Datapoint(s) missing 'url' or 'xpath': {self._names('invalid')}."))
+        if self.count("unknown"):
+            lines.append((messages.ERROR, f"{self.count('unknown')} result(s) did not match any Datapoint: {self._names('unknown')}."))
+        return lines
+
+
+def apply_scrape_results(results, summary):
+    """
+    Writes a chunk of scrape results back to their Datapoints, matched by the
+    task `id` echoed in each result: one query to load them, one transaction,
+    and one bulk UPDATE per set of changed fields. bulk_update sends no
+    signals, so the organization status counters are adjusted here.
+    """
+    with WRITE_BACK_SECONDS.time():
+        with transaction.atomic():
+            ids = [result["id"] for result in results if result.get("id") is not None]
+            datapoints = Datapoint.objects.in_bulk(ids)
+            previous = {dp.pk: (dp.organization_id, dp.status) for dp in datapoints.values()}
+            now = timezone.now()
+            updates = defaultdict(list)
             for result in results:
-                url = result.get("url")
-                xpath = result.get("xpath")
-                scraped_data = result.get("scraped_data")
-                status = result.get("status")
-                error = result.get("error")
-
-                try:
-                    # Retrieve the corresponding Datapoint instance
-                    dp = Datapoint.objects.get(url=url, xpath=xpath)
-
-                    if status == "success":
-                        # Compare scraped_data with current_verified_data
-                        if dp.current_verified_data == scraped_data:
-                            dp.status = Datapoint.STATUS_AUTO
-                            messages.success(request, f"No changes detected for Datapoint: {dp.name}. Status set to AUTO.")
-                        else:
-                            dp.status = Datapoint.STATUS_VERIFY
-                            messages.info(request, f"Changes detected for Datapoint: {dp.name}. Status set to VERIFY for user verification.")
-
-                        dp.current_unverified_data = scraped_data
-                        dp.last_verified = timezone.now()
-                        dp.last_updated = timezone.now()
-                        dp.save()
-                    else:
-                        dp.status = Datapoint.STATUS_FIX
-                        dp.last_updated = timezone.now()
-                        dp.save()
-                        messages.error(request, f"Failed to scrape Datapoint: {dp.name}. Error: {error}")
-                except Datapoint.DoesNotExist:
-                    messages.error(request, f"Datapoint with URL {url} and XPath {xpath} does not exist.")
+                dp = datapoints.get(result.get("id"))
+                if dp is None:
+                    outcome, fields = "unknown", ()
+                else:
+                    outcome, fields = _apply_scrape_result(dp, result, now)
+                summary.add(outcome, dp.name if dp is not None else result.get("url"))
+                RESULTS.inc(outcome=outcome)
+                if fields:
+                    updates[fields].append(dp)
+            for fields, changed in updates.items():
+                Datapoint.objects.bulk_update(changed, fields)
+            adjust_status_counts(status_count_changes(previous, datapoints.values()))
 
-        else:
-            # Attempt to extract error message from FastAPI response
-            try:
-                error_detail = response.json().get("detail", "Unknown error")
-            except json.JSONDecodeError:
-                error_detail = response.text  # Capture raw response
-            logger.error(f"FastAPI Error Response: {response.text}")
-            messages.error(request, f"Failed to initiate scraping: {error_detail}")
-
-    except requests.exceptions.RequestException as e:
-        logger.error(f"RequestException: {e}")
-        messages.error(request, f"Error connecting to the scraper service: {e}")
-    except json.JSONDecodeError:
-        logger.error("JSONDecodeError: Invalid response from FastAPI.")
-        messages.error(request, "Invalid response from the scraper service.")
+
+def _apply_scrape_result(dp, result, now):
+    """
+    Applies a single scrape result to its Datapoint in memory and returns
+    the outcome ("unchanged", "changed", "failed" or "skipped") and the
+    fields that need to be written.
+    """
+    scraped_data = result.get("scraped_data")
+    status = result.get("status")
+    error = result.get("error")
+    fingerprint = result.get("fingerprint")
+
+    if status == "circuit_open":
+        # The scraper did not try the page because its site is down; the Datapoint itself is fine
+        logger.info(f"Skipped Datapoint '{dp.name}': {error}")
+        return "skipped", ()
+
+    fields = ['status', 'last_updated', 'updated_at', 'last_snapshot']
+    dp.last_updated = now
+    dp.updated_at = now
+    dp.last_snapshot = result.get("snapshot")
+
+    if status != "success":
+        logger.warning(f"Failed to scrape Datapoint '{dp.name}'. Error: {error}")
+        dp.status = Datapoint.STATUS_FIX
+        return "failed", tuple(fields)
+
+    if fingerprint and dp.verified_fingerprint:
+        unchanged = fingerprint == dp.verified_fingerprint
+    else:
+        # Verified before fingerprints existed (or edited since): compare the
+        # full text once and remember the fingerprint if it matches
+        unchanged = dp.current_verified_data == scraped_data
+        if unchanged and fingerprint:
+            dp.verified_fingerprint = fingerprint
+            fields.append('verified_fingerprint')
+
+    dp.status = Datapoint.STATUS_AUTO if unchanged else Datapoint.STATUS_VERIFY
+    dp.last_verified = now
+    fields.append('last_verified')
+    if not fingerprint or fingerprint != dp.scraped_fingerprint:
+        # Only rewrite the (potentially large) scraped text when it changed
+        dp.current_unverified_data = scraped_data
+        dp.scraped_fingerprint = fingerprint
+        fields += ['current_unverified_data', 'scraped_fingerprint']
+    return ("unchanged" if unchanged else "changed"), tuple(fields)
+
+
+class ScraperServiceError(Exception):
+    """
+    Raised when the scraper service answers a request with an error status.
+    """
+
+
+def stream_scraping_results(payload, timeout=60):
+    """
+    Sends a batch to the FastAPI scraper in streaming mode and yields each
+    result dict as soon as it arrives, so callers can apply results while the
+    rest of the batch is still being scraped. `timeout` is the longest wait
+    for the next result rather than for the whole batch.
+    """
+    # Send POST request to FastAPI scraper
+    with requests.post(
+        scraper_url("/scrape/batch"),
+        json=payload,
+        headers=scraper_headers(Accept="application/x-ndjson"),
+        timeout=timeout,
+        stream=True,
+    ) as response:
+        logger.info(f"FastAPI Response Status Code: {response.status_code}")
+
+        if response.status_code != 200:
+            raise ScraperServiceError(format_scraper_error(response))
+
+        for line in response.iter_lines():
+            if line:
+                yield json.loads(line)
+
+
+def submit_scraping_job(payload, timeout=30):
+    """
+    Queues a batch as a background job on the scraper service.
+    Returns the job's progress dict, including its 'job_id'.
+    """
+    response = requests.post(
+        scraper_url("/jobs"),
+        json=payload,
+        headers=scraper_headers(),
+        timeout=timeout,
+    )
+    if response.status_code != 202:
+        raise ScraperServiceError(format_scraper_error(response))
+    return response.json()
+
+
+def get_scraping_job(job_id, timeout=30):
+    """
+    Returns the status and progress counts of a scraping job.
+    """
+    response = requests.get(scraper_url(f"/jobs/{job_id}"), headers=scraper_headers(), timeout=timeout)
+    if response.status_code != 200:
+        raise ScraperServiceError(format_scraper_error(response))
+    return response.json()
+
+
+def iter_scraping_job_results(job_id, poll_interval=2, page_size=500, timeout=30):
+    """
+    Polls a scraping job and yields each result once it is available, until
+    the job has finished and every result has been fetched.
+    """
+    offset = 0
+    while True:
+        response = requests.get(
+            scraper_url(f"/jobs/{job_id}/results"),
+            params={"offset": offset, "limit": page_size},
+            headers=scraper_headers(),
+            timeout=timeout,
+        )
+        if response.status_code != 200:
+            raise ScraperServiceError(format_scraper_error(response))
+
+        data = response.json()
+        yield from data["results"]
+        offset = data["next_offset"]
+
+        if not data["results"]:
+            if data["status"] == "done":
+                return
+            if data["status"] == "failed":
+                error = get_scraping_job(job_id).get("error")
+                raise ScraperServiceError(f"Scraping job {job_id} failed: {error}")
+            time.sleep(poll_interval)
+
+
+def format_scraper_error(response):
+    """
+    Extracts a readable error message from a failed scraper service response.
+    Validation errors (HTTP 422, e.g. an invalid XPath) list the offending task fields.
+    """
+    try:
+        detail = response.json().get("detail", "Unknown error")
+    except (json.JSONDecodeError, AttributeError):
+        return response.text  # Capture raw response
+
+    if isinstance(detail, list):
+        # FastAPI validation errors: [{"loc": ["body", "tasks", 0, "xpath"], "msg": "..."}]
+        return "; ".join(
+            f"{'.'.join(str(part) for part in error.get('loc', [])[1:])}: {error.get('msg')}"
+            for error in detail
+        )
+    return detail
 
 
 def get_user_profile(user):
@@ -2,6 +2,7 @@ from datetime import datetime
 import logging
 from django.forms import ValidationError
 from django.core.validators import URLValidator
+from django.http import Http404, HttpResponse, JsonResponse
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth import views as auth_views
@@ -13,16 +14,24 @@ from django.views.generic import CreateView, ListView, DetailView, UpdateView, D
 from django.urls import reverse_lazy
 from django.contrib.auth.mixins import LoginRequiredMixin, PermissionRequiredMixin
 from django.db import models
-from django.db.models import Count, Q
+from django.db.models import Sum
 import requests
 import os
 import json
+import hashlib
 
 from .forms import RegisterForm, DatapointForm, TestXPathForm, UserSettingsForm
-from .models import Datapoint, Organization, DataGroup
+from .models import Datapoint, Organization, DataGroup, OrganizationStatusCount, ScrapeRun
 from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag, urlencode
+from django.views.decorators.cache import cache_control, never_cache
 
-from .utils import perform_scraping, get_user_profile
+from . import metrics
+from .pagination import InvalidCursor, keyset_page
+from .runs import fail_stalled, is_stalled, selected_datapoints, start_run
+from .status_counts import organizations_with_status_counts
+from .utils import perform_scraping, get_user_profile, format_scraper_error, scraper_url, scraper_headers
 
 logger = logging.getLogger(__name__)
 
@@ -90,6 +99,28 @@ def datapoint_detail(request, pk):
     datapoint = get_object_or_404(Datapoint, pk=pk)
     return render(request, 'datapoint_detail.html', {'datapoint': datapoint})
 
+def datapoint_snapshot(request, pk):
+    """
+    Downloads the page snapshot archived at the datapoint's last scrape, as
+    plain text so the archived page's scripts never run on this site.
+    """
+    datapoint = get_object_or_404(Datapoint, pk=pk)
+    if not datapoint.last_snapshot:
+        raise Http404("No snapshot was archived for this datapoint.")
+    try:
+        response = requests.get(
+            scraper_url(f"/snapshots/{datapoint.last_snapshot}"), headers=scraper_headers(), timeout=30
+        )
+    except requests.RequestException as e:
+        messages.error(request, f"Could not reach the scraper service: {e}")
+        return redirect('datapoint-detail', pk=pk)
+    if response.status_code != 200:
+        messages.error(request, f"Snapshot unavailable: {format_scraper_error(response)}")
+        return redirect('datapoint-detail', pk=pk)
+    download = HttpResponse(response.text, content_type='text/plain; charset=utf-8')
+    download['Content-Disposition'] = f'attachment; filename="datapoint-{pk}-{datapoint.last_snapshot[:12]}.html"'
+    return download
+
 def datapoint_edit(request, pk):
     """
     Allows editing of a specific datapoint.
@@ -98,6 +129,9 @@ def datapoint_edit(request, pk):
     if request.method == 'POST':
         form = DatapointForm(request.POST, instance=datapoint)
         if form.is_valid():
+            if 'current_verified_data' in form.changed_data:
+                # The stored fingerprint no longer describes the verified data
+                datapoint.verified_fingerprint = None
             form.save()
             messages.success(request, 'Datapoint updated successfully.')
             return redirect('datapoint-list')
@@ -115,6 +149,7 @@ def datapoint_verify(request, pk):
         datapoint.last_verified = timezone.now()
         datapoint.previously_verified_data=datapoint.current_unverified_data
         datapoint.current_verified_data=datapoint.current_unverified_data
+        datapoint.verified_fingerprint = datapoint.scraped_fingerprint
         datapoint.save()
         messages.success(request, 'Datapoint verified successfully.')
         return redirect('datapoint-list')
@@ -132,6 +167,38 @@ def datapoint_revert(request, pk):
     # Implement revert logic here
     return redirect('datapoint-list')
 
+def metrics_view(request):
+    """
+    Exposes scraping and database write-back timings of this process in the
+    Prometheus text format. Scraper service internals are at its own /metrics.
+    """
+    return HttpResponse(metrics.render(), content_type=metrics.CONTENT_TYPE)
+
+@login_required
+@cache_control(private=True, max_age=60)
+def dashboard_chart_data(request):
+    """
+    Chart data for the overview dashboard: Datapoints per status per
+    organization. Browsers may reuse it for a minute and revalidate it with
+    its ETag afterwards.
+    """
+    organizations = organizations_with_status_counts()
+    data = {
+        'labels': [org.name for org in organizations],
+        'datasets': [
+            {
+                'status': status,
+                'label': display,
+                'data': [getattr(org, f"{status.lower()}_count") for org in organizations],
+            }
+            for status, display in Datapoint.STATUS_CHOICES
+        ],
+    }
+    response = JsonResponse(data)
+    etag = quote_etag(hashlib.md5(response.content).hexdigest())
+    response['ETag'] = etag
+    return get_conditional_response(request, etag=etag, response=response)
+
 class DatapointCreateView(LoginRequiredMixin, CreateView):
     model = Datapoint
     form_class = DatapointForm
@@ -206,7 +273,7 @@ class DatapointListView(ListView):
     paginate_by = 20  # Adjust as needed
     
     def get_queryset(self):
-        queryset = super().get_queryset()
+        queryset = super().get_queryset().select_related('organization', 'data_group')
         organization_id = self.request.GET.get('organization')
         status = self.request.GET.get('status')
         
@@ -216,17 +283,58 @@ class DatapointListView(ListView):
         if status:
             queryset = queryset.filter(status=status)
         
-        return queryset.order_by('-created_at')
+        return queryset.order_by('-created_at', 'id')
+
+    def paginate_queryset(self, queryset, page_size):
+        """
+        Pages by ?after= / ?before= cursors on (-created_at, id) instead of
+        ?page= offsets, so every page costs the same.
+        """
+        try:
+            page = keyset_page(
+                queryset,
+                page_size,
+                after=self.request.GET.get('after') or None,
+                before=self.request.GET.get('before') or None,
+            )
+        except InvalidCursor as e:
+            raise Http404(str(e))
+        return (None, page, page.object_list, page.has_other_pages())
+
+    def count_datapoints(self):
+        """
+        Counts the filtered Datapoints as configured by DATAPOINT_LIST_COUNT.
+        Returns (count, approximate), with a count of None if counting is off.
+        """
+        mode = settings.DATAPOINT_LIST_COUNT
+        if mode == 'none':
+            return None, False
+        if mode == 'approximate':
+            # Sums at most one counter per organization and status
+            counters = OrganizationStatusCount.objects.all()
+            if self.request.GET.get('organization'):
+                counters = counters.filter(organization_id=self.request.GET['organization'])
+            if self.request.GET.get('status'):
+                counters = counters.filter(status=self.request.GET['status'])
+            return counters.aggregate(total=Sum('count'))['total'] or 0, True
+        return self.object_list.count(), False
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['organizations'] = Organization.objects.all()
+        organizations = list(Organization.objects.order_by('name'))
+        context['organizations'] = organizations
+        # Looked up by the get_organization_name filter without a query per call
+        context['organization_names'] = {org.id: org.name for org in organizations}
         context['status_choices'] = Datapoint.STATUS_CHOICES
         # Preserve current filters in the context for template usage (e.g., in breadcrumbs)
         context['current_filters'] = {
             'organization': self.request.GET.get('organization', ''),
             'status': self.request.GET.get('status', ''),
         }
+        # Query string prefix that keeps the filters on the page links
+        filters = urlencode({key: value for key, value in context['current_filters'].items() if value})
+        context['filter_query'] = filters + '&' if filters else ''
+        context['total_count'], context['count_is_approximate'] = self.count_datapoints()
 
          # Determine which columns to show based on user preferences
         user_profile = self.request.user.profile
@@ -264,29 +372,15 @@ class OverviewDashboardView(LoginRequiredMixin, TemplateView):
         # Define the status choices as per your Datapoint model
         status_choices = Datapoint.STATUS_CHOICES  # Now includes class attributes
 
-        # Aggregate the number of Datapoints per status per organization
-        organizations = Organization.objects.annotate(
-            auto_count=Count('datapoints', filter=Q(datapoints__status=Datapoint.STATUS_AUTO)),
-            manual_count=Count('datapoints', filter=Q(datapoints__status=Datapoint.STATUS_MANUAL)),
-            verify_count=Count('datapoints', filter=Q(datapoints__status=Datapoint.STATUS_VERIFY)),
-            fix_count=Count('datapoints', filter=Q(datapoints__status=Datapoint.STATUS_FIX)),
-        )
-
-        # Prepare data for Chart.js
-        chart_labels = [org.name for org in organizations]
-        auto_counts = [org.auto_count for org in organizations]
-        manual_counts = [org.manual_count for org in organizations]
-        verify_counts = [org.verify_count for org in organizations]
-        fix_counts = [org.fix_count for org in organizations]
+        # Datapoints per status per organization, from the counters table
+        # (one row per organization and status) instead of counting Datapoints
+        organizations = organizations_with_status_counts()
 
+        # The chart loads its data from dashboard_chart_data
         context.update({
             'organizations': organizations,
-            'chart_labels': chart_labels,
-            'auto_counts': auto_counts,
-            'manual_counts': manual_counts,
-            'verify_counts': verify_counts,
-            'fix_counts': fix_counts,
             'status_choices': status_choices,
+            'scrape_runs': ScrapeRun.objects.select_related('data_group', 'organization')[:5],
         })
 
         return context
@@ -313,60 +407,104 @@ class ScrapeDatapointView(LoginRequiredMixin, PermissionRequiredMixin, View):
         return redirect('datapoint_detail', pk=datapoint.id)
 
 
-# class ScrapeDataGroupView(LoginRequiredMixin, PermissionRequiredMixin, View):
-#     """
-#     View to trigger scraping for a specific DataGroup.
-#     """
-#     permission_required = 'datapointScraperApp.can_scrape_datagroup'  # Define appropriate permission
+class ScrapeRunStartMixin:
+    """
+    Queues a background ScrapeRun and sends the user to its progress page,
+    instead of scraping while the request waits.
+    """
 
-#     def post(self, request, datagroup_id):
-#         datagroup = get_object_or_404(DataGroup, id=datagroup_id)
-#         # Optionally, check if any Datapoints are in 'AUTO' status
-#         auto_datapoints = datagroup.datapoints.filter(status=Datapoint.STATUS_AUTO)
-#         if not auto_datapoints.exists():
-#             messages.warning(request, f"No Datapoints in DataGroup '{datagroup.name}' are in 'AUTO' status.")
-#             return redirect('datagroup_detail', datagroup_id=datagroup.id)
-        
-#         scrape_datagroup_task.delay(datagroup.id)
-#         messages.success(request, f"Scraping initiated for DataGroup '{datagroup.name}'.")
-#         return redirect('datagroup_detail', datagroup_id=datagroup.id)
-
-# class ScrapeOrganizationView(LoginRequiredMixin, PermissionRequiredMixin, View):
-#     """
-#     View to trigger scraping for a specific Organization.
-#     """
-#     permission_required = 'datapointScraperApp.can_scrape_organisation'  # Define appropriate permission
-
-#     def post(self, request, organisation_id):
-#         organisation = get_object_or_404(Organization, id=organisation_id)
-#         # Optionally, check if any Datapoints are in 'AUTO' status
-#         auto_datapoints = organisation.datapoints.filter(status=Datapoint.STATUS_AUTO)
-#         if not auto_datapoints.exists():
-#             messages.warning(request, f"No Datapoints in Organization '{organisation.name}' are in 'AUTO' status.")
-#             return redirect('organisation_detail', organisation_id=organisation.id)
-        
-#         scrape_organisation_task.delay(organisation.id)
-#         messages.success(request, f"Scraping initiated for Organization '{organisation.name}'.")
-#         return redirect('organisation_detail', organisation_id=organisation.id)
+    def start_scrape_run(self, request, scope, empty_message, data_group=None, organization=None):
+        if not selected_datapoints(scope, data_group, organization).exists():
+            messages.warning(request, empty_message)
+            return redirect('home')
+
+        run, created = start_run(scope, request.user, data_group=data_group, organization=organization)
+        if created:
+            messages.success(request, f"Scraping initiated for {run.label}: {run.total} Datapoint(s) queued.")
+        else:
+            messages.info(request, f"{run.label} is already being scraped.")
+        return redirect('scrape_run_detail', pk=run.pk)
+
+
+class ScrapeDataGroupView(LoginRequiredMixin, PermissionRequiredMixin, ScrapeRunStartMixin, View):
+    """
+    View to trigger scraping for the 'AUTO' Datapoints of a specific DataGroup.
+    """
+    permission_required = 'datapointScraperApp.can_scrape_datagroup'
+
+    def post(self, request, datagroup_id):
+        datagroup = get_object_or_404(DataGroup, id=datagroup_id)
+        return self.start_scrape_run(
+            request,
+            ScrapeRun.SCOPE_DATAGROUP,
+            f"No Datapoints in DataGroup '{datagroup.name}' are in 'AUTO' status.",
+            data_group=datagroup,
+        )
+
+class ScrapeOrganizationView(LoginRequiredMixin, PermissionRequiredMixin, ScrapeRunStartMixin, View):
+    """
+    View to trigger scraping for the 'AUTO' Datapoints of a specific Organization.
+    """
+    permission_required = 'datapointScraperApp.can_scrape_organisation'
+
+    def post(self, request, organisation_id):
+        organisation = get_object_or_404(Organization, id=organisation_id)
+        return self.start_scrape_run(
+            request,
+            ScrapeRun.SCOPE_ORGANIZATION,
+            f"No Datapoints in Organization '{organisation.name}' are in 'AUTO' status.",
+            organization=organisation,
+        )
 
-class ScrapeAllDatapointsView(LoginRequiredMixin, PermissionRequiredMixin, View):
+class ScrapeAllDatapointsView(LoginRequiredMixin, PermissionRequiredMixin, ScrapeRunStartMixin, View):
     """
     View to trigger scraping for all Datapoints with status 'AUTO', 'VERIFY', or 'FIX'.
     """
     permission_required = 'datapointScraperApp.can_scrape_all_datapoints'
 
     def post(self, request):
-        # Get all Datapoint instances with status 'AUTO', 'VERIFY', or 'FIX'
-        datapoints = Datapoint.objects.filter(status__in=[Datapoint.STATUS_AUTO, Datapoint.STATUS_VERIFY, Datapoint.STATUS_FIX])
-
-        if not datapoints.exists():
-            messages.warning(request, "No Datapoints in 'AUTO', 'VERIFY', or 'FIX' status to scrape.")
-            return redirect('home')  # Adjust as per your URL naming
+        return self.start_scrape_run(
+            request,
+            ScrapeRun.SCOPE_ALL,
+            "No Datapoints in 'AUTO', 'VERIFY', or 'FIX' status to scrape.",
+        )
 
-        # Trigger scraping for all relevant datapoints
-        perform_scraping(request, datapoints)
+@login_required
+def scrape_run_detail(request, pk):
+    """
+    Progress page of a ScrapeRun; polls scrape_run_progress until the run has finished.
+    """
+    run = get_object_or_404(ScrapeRun.objects.select_related('data_group', 'organization', 'started_by'), pk=pk)
+    if is_stalled(run):
+        fail_stalled(run)
+    return render(request, 'scrape_run_detail.html', {'run': run, 'progress': _scrape_run_progress(run)})
 
-        return redirect('home')
+@login_required
+@never_cache
+def scrape_run_progress(request, pk):
+    """
+    Counts of a ScrapeRun as JSON, for the progress page to poll.
+    """
+    run = get_object_or_404(ScrapeRun, pk=pk)
+    if is_stalled(run):
+        fail_stalled(run)
+    return JsonResponse(_scrape_run_progress(run))
+
+def _scrape_run_progress(run):
+    processed = run.done + run.failed + run.skipped
+    return {
+        'status': run.status,
+        'status_display': run.get_status_display(),
+        'active': run.is_active,
+        'total': run.total,
+        'done': run.done,
+        'failed': run.failed,
+        'skipped': run.skipped,
+        'remaining': run.remaining,
+        'percent': round(100 * processed / run.total) if run.total else (0 if run.is_active else 100),
+        'error': run.error,
+        'report': run.report,
+    }
 
 class TestXPathView(View):
     """
@@ -405,20 +543,12 @@ class TestXPathView(View):
             # Log the scraping task
             logger.debug(f"TestXPath Scraping task: {json.dumps(task)}")
 
-            # Retrieve the API token from Django settings
-            API_TOKEN = settings.SCRAPER_API_TOKEN  # Ensure this is set in settings.py and loaded from .env
-
-            headers = {
-                "Authorization": f"Bearer {API_TOKEN}",
-                "Content-Type": "application/json"
-            }
-
             try:
                 # Send POST request to FastAPI scraper
                 response = requests.post(
-                    "http://127.0.0.1:8001/scrape/batch",  # FastAPI batch endpoint on port 8001
+                    scraper_url("/scrape/batch"),
                     json=task,
-                    headers=headers,
+                    headers=scraper_headers(),
                     timeout=60  # Adjust timeout as needed
                 )
 
@@ -463,10 +593,7 @@ class TestXPathView(View):
                         return render(request, self.template_name, {'form': form})
                 else:
                     # Attempt to extract error message from FastAPI response
-                    try:
-                        error_detail = response.json().get("detail", "Unknown error")
-                    except json.JSONDecodeError:
-                        error_detail = response.text  # Capture raw response
+                    error_detail = format_scraper_error(response)
                     logger.error(f"FastAPI Error Response: {response.text}")
                     messages.error(request, f"Failed to initiate scraping: {error_detail}")
                     return render(request, self.template_name, {'form': form})
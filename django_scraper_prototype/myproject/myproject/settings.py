@@ -12,16 +12,54 @@ https://docs.djangoproject.com/en/5.1/ref/settings/
 
 from pathlib import Path
 import os
+import sys
 from decouple import config
 from dotenv import load_dotenv
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
+# scraper_common, at the repository root, is shared with the FastAPI scraper service
+REPOSITORY_ROOT = str(BASE_DIR.parent.parent)
+if REPOSITORY_ROOT not in sys.path:
+    sys.path.append(REPOSITORY_ROOT)
+
 load_dotenv(os.path.join(BASE_DIR, '.env'))
 
 SCRAPER_API_TOKEN = os.getenv("SCRAPER_API_TOKEN")
 
+# Base URL of the FastAPI scraper service
+SCRAPER_SERVICE_URL = os.getenv("SCRAPER_SERVICE_URL", "http://127.0.0.1:8001")
+
+# Batches with more tasks than this are submitted as background jobs on the
+# scraper service and polled, instead of being scraped in one streaming request
+SCRAPER_JOB_THRESHOLD = int(os.getenv("SCRAPER_JOB_THRESHOLD", "50"))
+
+# Scrape results are written back to the database in chunks of this many,
+# one transaction and a few bulk UPDATEs per chunk
+SCRAPER_WRITE_BATCH_SIZE = int(os.getenv("SCRAPER_WRITE_BATCH_SIZE", "200"))
+
+# A partial chunk is written back once it has waited this many seconds, so
+# slow scrapes still show their progress (and keep their results) as they go
+SCRAPER_WRITE_INTERVAL = float(os.getenv("SCRAPER_WRITE_INTERVAL", "2"))
+
+# How the run_scraper command waits for rendered pages: "networkidle", or
+# "xpaths" to continue as soon as the datapoint's XPath matches
+SCRAPER_WAIT_MODE = os.getenv("SCRAPER_WAIT_MODE", "networkidle")
+
+# How the Datapoint list counts its rows: "exact" (COUNT(*) per page view),
+# "approximate" (from the dashboard's organization status counters, cheap on
+# very large tables) or "none"
+DATAPOINT_LIST_COUNT = os.getenv("DATAPOINT_LIST_COUNT", "exact")
+
+# Scrape runs started from the web UI (scrape all, a DataGroup or an
+# Organization) run in background threads of the web server process: at most
+# this many at once, the rest queue. A running run sends a heartbeat every
+# third of SCRAPE_RUN_STALE_SECONDS; one silent for that long (e.g. after a
+# restart) is considered abandoned.
+SCRAPE_RUN_WORKERS = int(os.getenv("SCRAPE_RUN_WORKERS", "1"))
+SCRAPE_RUN_STALE_SECONDS = int(os.getenv("SCRAPE_RUN_STALE_SECONDS", "900"))
+
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/5.1/howto/deployment/checklist/
 
@@ -90,6 +128,17 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {
+            # Several run_scraper processes write at once: take the write lock
+            # when a transaction starts, and wait for it instead of failing
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': 20,
+        },
+        # On disk rather than in memory, so tests of concurrent run_scraper
+        # instances get one real connection per thread, locking as in production
+        'TEST': {
+            'NAME': BASE_DIR / 'test_db.sqlite3',
+        },
     }
 }
 
@@ -1,10 +1,14 @@
 import sys
 import asyncio
 import os
-from fastapi import FastAPI, HTTPException, Header
-from pydantic import BaseModel
-from typing import List, Optional
+from contextlib import asynccontextmanager
+import httpx
+from fastapi import FastAPI, HTTPException, Header, Depends, Query, Request
+from fastapi.responses import Response, StreamingResponse
+from pydantic import BaseModel, field_validator
+from typing import List, Optional, Union
 import json
+import dataclasses
 import logging
 from dotenv import load_dotenv
 from pathlib import Path  # For path management
@@ -21,6 +25,74 @@ load_dotenv(dotenv_path=env_path)
 
 API_TOKEN = os.getenv("SCRAPER_API_TOKEN")
 
+# Browser pool configuration
+POOL_SIZE = int(os.getenv("SCRAPER_POOL_SIZE", "2"))
+POOL_CONTEXTS_PER_BROWSER = int(os.getenv("SCRAPER_POOL_CONTEXTS_PER_BROWSER", "2"))
+POOL_MAX_CONTEXT_USES = int(os.getenv("SCRAPER_POOL_MAX_CONTEXT_USES", "50"))
+POOL_CHECKOUT_TIMEOUT = float(os.getenv("SCRAPER_POOL_CHECKOUT_TIMEOUT", "30"))
+POOL_HEALTH_INTERVAL = float(os.getenv("SCRAPER_POOL_HEALTH_INTERVAL", "60"))
+
+# "async" renders in this process; "process" spreads pages over worker processes with one browser each
+EXECUTION_MODE = os.getenv("SCRAPER_EXECUTION_MODE", "async").lower()
+PROCESS_WORKERS = int(os.getenv("SCRAPER_PROCESS_WORKERS", "0")) or os.cpu_count() or 1
+
+# Maximum number of batch tasks scraped at the same time (defaults to the pool capacity)
+MAX_IN_FLIGHT = int(os.getenv("SCRAPER_MAX_IN_FLIGHT", "0")) or None
+
+# Background job workers for POST /jobs
+JOB_WORKERS = int(os.getenv("SCRAPER_JOB_WORKERS", "2"))
+JOB_MAX_QUEUED = int(os.getenv("SCRAPER_JOB_MAX_QUEUED", "100"))
+JOB_TTL = float(os.getenv("SCRAPER_JOB_TTL", "3600"))
+
+# Static HTTP fetch tier, tried before rendering pages in the browser
+STATIC_FETCH_ENABLED = os.getenv("SCRAPER_STATIC_FETCH", "true").lower() in ("1", "true", "yes")
+STATIC_FETCH_TIMEOUT = float(os.getenv("SCRAPER_STATIC_FETCH_TIMEOUT", "15"))
+INTERCEPTION_PROFILE = os.getenv("SCRAPER_INTERCEPTION_PROFILE", s.DEFAULT_PROFILE)
+RENDER_MODE_RELEARN_AFTER = float(os.getenv("SCRAPER_RENDER_MODE_RELEARN_AFTER", "3600"))
+# "networkidle" waits for the network to go quiet; "xpaths" returns as soon as every requested XPath matches
+WAIT_MODE = os.getenv("SCRAPER_WAIT_MODE", s.WAIT_NETWORKIDLE).lower()
+# Render timeouts in seconds; learned per domain from the p95 load time, within these bounds
+RENDER_TIMEOUT = float(os.getenv("SCRAPER_RENDER_TIMEOUT", "15"))
+RENDER_TIMEOUT_MIN = float(os.getenv("SCRAPER_RENDER_TIMEOUT_MIN", "3"))
+RENDER_TIMEOUT_MAX = float(os.getenv("SCRAPER_RENDER_TIMEOUT_MAX", "60"))
+# Page cache shared by all requests
+CACHE_ENABLED = os.getenv("SCRAPER_CACHE", "true").lower() in ("1", "true", "yes")
+CACHE_TTL = float(os.getenv("SCRAPER_CACHE_TTL", "300"))
+CACHE_MAX_BYTES = int(os.getenv("SCRAPER_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+CACHE_DIR = os.getenv("SCRAPER_CACHE_DIR") or None
+CACHE_DISK_MAX_BYTES = int(os.getenv("SCRAPER_CACHE_DISK_MAX_BYTES", str(512 * 1024 * 1024)))
+
+# Per-host politeness limits, e.g. SCRAPER_HOST_OVERRIDES={"example.com": {"max_concurrency": 4, "min_interval": 0}}
+HOST_MAX_CONCURRENCY = int(os.getenv("SCRAPER_HOST_MAX_CONCURRENCY", "2"))
+HOST_MIN_INTERVAL = float(os.getenv("SCRAPER_HOST_MIN_INTERVAL", "0.5"))
+HOST_OVERRIDES = json.loads(os.getenv("SCRAPER_HOST_OVERRIDES") or "{}")
+HOST_MAX_RETRY_AFTER = float(os.getenv("SCRAPER_HOST_MAX_RETRY_AFTER", "120"))
+MAX_RETRIES = int(os.getenv("SCRAPER_MAX_RETRIES", "2"))
+
+# Per-host circuit breaker: fail pages of hosts that keep failing to load instead of waiting out their timeouts
+CIRCUIT_BREAKER_ENABLED = os.getenv("SCRAPER_CIRCUIT_BREAKER", "true").lower() in ("1", "true", "yes")
+CIRCUIT_WINDOW = int(os.getenv("SCRAPER_CIRCUIT_WINDOW", "20"))
+CIRCUIT_MIN_REQUESTS = int(os.getenv("SCRAPER_CIRCUIT_MIN_REQUESTS", "5"))
+CIRCUIT_FAILURE_RATIO = float(os.getenv("SCRAPER_CIRCUIT_FAILURE_RATIO", "0.5"))
+CIRCUIT_OPEN_FOR = float(os.getenv("SCRAPER_CIRCUIT_OPEN_FOR", "30"))
+CIRCUIT_HALF_OPEN_PROBES = int(os.getenv("SCRAPER_CIRCUIT_HALF_OPEN_PROBES", "1"))
+CIRCUIT_PROBE_TIMEOUT = float(os.getenv("SCRAPER_CIRCUIT_PROBE_TIMEOUT", "120"))
+
+# Archive of the page HTML behind every result; disabled unless a directory is set
+SNAPSHOT_DIR = os.getenv("SCRAPER_SNAPSHOT_DIR") or None
+SNAPSHOT_MAX_BYTES = int(os.getenv("SCRAPER_SNAPSHOT_MAX_BYTES", str(1024 * 1024 * 1024)))
+SNAPSHOT_COMPRESSION = os.getenv("SCRAPER_SNAPSHOT_COMPRESSION", "auto")
+
+# Normalization applied before fingerprinting results (see s.Normalization)
+FINGERPRINT_COLLAPSE_WHITESPACE = os.getenv("SCRAPER_FINGERPRINT_COLLAPSE_WHITESPACE", "true").lower() in ("1", "true", "yes")
+FINGERPRINT_SORT_ATTRIBUTES = os.getenv("SCRAPER_FINGERPRINT_SORT_ATTRIBUTES", "true").lower() in ("1", "true", "yes")
+FINGERPRINT_STRIP_ATTRIBUTES = os.getenv("SCRAPER_FINGERPRINT_STRIP_ATTRIBUTES")
+
+USER_AGENT = os.getenv(
+    "SCRAPER_USER_AGENT",
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/130.0 Safari/537.36",
+)
+
 # Configure Logging
 logging.basicConfig(
     level=logging.INFO,
@@ -31,17 +103,197 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-app = FastAPI(title="FastAPI Web Scraper")
+async def _pool_health_loop(pool: Union[s.BrowserPool, s.ProcessWorkerPool]):
+    """
+    Periodically relaunches browsers that have crashed or disconnected.
+    """
+    while True:
+        await asyncio.sleep(POOL_HEALTH_INTERVAL)
+        try:
+            await pool.health_check()
+        except Exception as e:
+            logger.error(f"Browser pool health check failed: {e}")
+
+def _normalization() -> s.Normalization:
+    strip_attributes = s.VOLATILE_ATTRIBUTES
+    if FINGERPRINT_STRIP_ATTRIBUTES is not None:
+        strip_attributes = frozenset(a.strip().lower() for a in FINGERPRINT_STRIP_ATTRIBUTES.split(",") if a.strip())
+    return s.Normalization(
+        collapse_whitespace=FINGERPRINT_COLLAPSE_WHITESPACE,
+        sort_attributes=FINGERPRINT_SORT_ATTRIBUTES,
+        strip_attributes=strip_attributes,
+    )
+
+def _host_scheduler() -> s.HostScheduler:
+    default_policy = s.HostPolicy(max_concurrency=HOST_MAX_CONCURRENCY, min_interval=HOST_MIN_INTERVAL)
+    overrides = {
+        domain: s.HostPolicy(
+            max_concurrency=int(limits.get("max_concurrency", default_policy.max_concurrency)),
+            min_interval=float(limits.get("min_interval", default_policy.min_interval)),
+        )
+        for domain, limits in HOST_OVERRIDES.items()
+    }
+    return s.HostScheduler(default_policy, overrides=overrides, max_retry_after=HOST_MAX_RETRY_AFTER)
+
+def _circuit_breaker() -> Optional[s.CircuitBreaker]:
+    if not CIRCUIT_BREAKER_ENABLED:
+        return None
+    return s.CircuitBreaker(s.BreakerPolicy(
+        window=CIRCUIT_WINDOW,
+        min_requests=CIRCUIT_MIN_REQUESTS,
+        failure_ratio=CIRCUIT_FAILURE_RATIO,
+        open_for=CIRCUIT_OPEN_FOR,
+        half_open_probes=CIRCUIT_HALF_OPEN_PROBES,
+        probe_timeout=CIRCUIT_PROBE_TIMEOUT,
+    ))
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Starts the browser pool (or worker processes) when the app starts and closes it on shutdown.
+    """
+    pool_options = dict(
+        contexts_per_browser=POOL_CONTEXTS_PER_BROWSER,
+        max_context_uses=POOL_MAX_CONTEXT_USES,
+        checkout_timeout=POOL_CHECKOUT_TIMEOUT,
+    )
+    http_options = dict(
+        timeout=STATIC_FETCH_TIMEOUT,
+        follow_redirects=True,
+        headers={"User-Agent": USER_AGENT},
+    ) if STATIC_FETCH_ENABLED else None
+    timeouts_options = dict(default=RENDER_TIMEOUT, minimum=RENDER_TIMEOUT_MIN, maximum=RENDER_TIMEOUT_MAX)
+    cache_options = dict(
+        ttl=CACHE_TTL,
+        max_bytes=CACHE_MAX_BYTES,
+        disk_dir=CACHE_DIR,
+        disk_max_bytes=CACHE_DISK_MAX_BYTES,
+    ) if CACHE_ENABLED else None
+    snapshot_options = dict(
+        root=SNAPSHOT_DIR,
+        max_bytes=SNAPSHOT_MAX_BYTES,
+        compression=SNAPSHOT_COMPRESSION,
+    ) if SNAPSHOT_DIR else None
+    # Serves GET /snapshots; in process mode the workers write to the same directory
+    snapshots = s.SnapshotStore(**snapshot_options) if snapshot_options is not None else None
+
+    http_client = None
+    if EXECUTION_MODE == "process":
+        # Each worker process fetches, caches and learns render modes on its own
+        pool = s.ProcessWorkerPool(
+            workers=PROCESS_WORKERS,
+            pool_options=pool_options,
+            engine_options=dict(default_profile=INTERCEPTION_PROFILE, wait_mode=WAIT_MODE, normalization=_normalization()),
+            modes_options=dict(relearn_after=RENDER_MODE_RELEARN_AFTER),
+            timeouts_options=timeouts_options,
+            http_options=http_options,
+            cache_options=cache_options,
+            snapshot_options=snapshot_options,
+        )
+        cache = None
+    else:
+        pool = s.BrowserPool(size=POOL_SIZE, **pool_options)
+        if http_options is not None:
+            http_client = httpx.AsyncClient(**http_options)
+        cache = s.PageCache(**cache_options) if cache_options is not None else None
+    await pool.start()
+    app.state.browser_pool = pool
+    app.state.engine = s.ScrapeEngine(
+        pool,
+        max_in_flight=MAX_IN_FLIGHT,
+        http_client=http_client,
+        modes=s.RenderModeRegistry(relearn_after=RENDER_MODE_RELEARN_AFTER),
+        default_profile=INTERCEPTION_PROFILE,
+        cache=cache,
+        scheduler=_host_scheduler(),
+        max_retries=MAX_RETRIES,
+        wait_mode=WAIT_MODE,
+        timeouts=s.TimeoutLearner(**timeouts_options),
+        snapshots=snapshots,
+        normalization=_normalization(),
+        breaker=_circuit_breaker(),
+    )
+    app.state.snapshots = snapshots
+    app.state.job_manager = s.JobManager(
+        app.state.engine,
+        workers=JOB_WORKERS,
+        max_queued=JOB_MAX_QUEUED,
+        ttl=JOB_TTL,
+    )
+    await app.state.job_manager.start()
+    health_task = asyncio.create_task(_pool_health_loop(pool))
+    try:
+        yield
+    finally:
+        health_task.cancel()
+        await app.state.job_manager.stop()
+        if http_client is not None:
+            await http_client.aclose()
+        await pool.stop()
+
+app = FastAPI(title="FastAPI Web Scraper", lifespan=lifespan)
+
+def get_browser_pool(request: Request) -> Union[s.BrowserPool, s.ProcessWorkerPool]:
+    return request.app.state.browser_pool
+
+def get_engine(request: Request) -> s.ScrapeEngine:
+    return request.app.state.engine
+
+def get_job_manager(request: Request) -> s.JobManager:
+    return request.app.state.job_manager
+
+def get_breaker(request: Request) -> s.CircuitBreaker:
+    breaker = request.app.state.engine.breaker
+    if breaker is None:
+        raise HTTPException(status_code=404, detail="The circuit breaker is disabled; set SCRAPER_CIRCUIT_BREAKER=true.")
+    return breaker
+
+def get_snapshots(request: Request) -> s.SnapshotStore:
+    snapshots = request.app.state.snapshots
+    if snapshots is None:
+        raise HTTPException(status_code=404, detail="Snapshots are disabled; set SCRAPER_SNAPSHOT_DIR.")
+    return snapshots
 
 # Pydantic models for batch scraping
 class ScrapeTask(BaseModel):
+    id: Optional[Union[int, str]] = None  # Caller's reference for the task, echoed in its result
     url: str
     xpath: str
     data_type: Optional[str] = "TXT"  # Default to TXT; can be "HTML" if needed
+    profile: Optional[str] = None  # Interception profile; defaults to SCRAPER_INTERCEPTION_PROFILE
+    max_age: Optional[float] = None  # Oldest cached page (in seconds) this task accepts; defaults to SCRAPER_CACHE_TTL
+    no_cache: bool = False  # Always fetch the page again instead of using the cache
+
+    @field_validator("xpath")
+    @classmethod
+    def validate_xpath(cls, value: str) -> str:
+        # Compiling here rejects bad expressions with a 422 and warms the XPath cache
+        s.compile_xpath(value)
+        return value
+
+    @field_validator("profile")
+    @classmethod
+    def validate_profile(cls, value: Optional[str]) -> Optional[str]:
+        if value is not None:
+            s.get_profile(value)
+        return value
 
 class ScrapeBatchRequest(BaseModel):
     tasks: List[ScrapeTask]
 
+class SnapshotTask(BaseModel):
+    xpath: str
+    data_type: Optional[str] = "TXT"
+
+    @field_validator("xpath")
+    @classmethod
+    def validate_xpath(cls, value: str) -> str:
+        s.compile_xpath(value)
+        return value
+
+class SnapshotExtractRequest(BaseModel):
+    tasks: List[SnapshotTask]
+
 @app.get("/debug/token")
 def debug_token():
     """
@@ -54,43 +306,115 @@ def debug_token():
 def read_root():
     return {"message": "Welcome to the FastAPI web scraper!"}
 
+@app.get("/health")
+async def health(pool: Union[s.BrowserPool, s.ProcessWorkerPool] = Depends(get_browser_pool)):
+    """
+    Reports the state of the browser pool, relaunching any dead browsers
+    (or worker processes, in process mode).
+    """
+    return {"pool": await pool.health_check()}
+
+@app.get("/stats")
+async def stats(
+    engine: s.ScrapeEngine = Depends(get_engine),
+    jobs: s.JobManager = Depends(get_job_manager),
+):
+    """
+    Reports scraper counters: requests blocked per interception profile,
+    the fetch tier learned per domain, page cache and XPath cache usage.
+    In process mode the per-worker counters are listed under "workers".
+    """
+    workers = None
+    if isinstance(engine.pool, s.ProcessWorkerPool):
+        workers = await engine.pool.worker_stats()
+    return {
+        "xpath_cache": s.xpath_cache_info(),
+        "interception": engine.interception_stats.snapshot(),
+        "render_modes": engine.modes.snapshot(),
+        "render_timeouts": engine.timeouts.snapshot(),
+        "cache": engine.cache.stats() if engine.cache is not None else None,
+        "snapshots": engine.snapshots.stats() if engine.snapshots is not None else None,
+        "hosts": engine.scheduler.snapshot(),
+        "circuits": engine.breaker.snapshot() if engine.breaker is not None else None,
+        "jobs": jobs.stats(),
+        "workers": workers,
+    }
+
+@app.get("/metrics")
+async def metrics(engine: s.ScrapeEngine = Depends(get_engine)):
+    """
+    Exposes scraper metrics in the Prometheus text format: per-stage
+    latency histograms, results per domain, batch sizes, pages in flight
+    and cache hit ratios. In process mode the workers' metrics are added up.
+    """
+    merge = None
+    if isinstance(engine.pool, s.ProcessWorkerPool):
+        merge = await engine.pool.worker_metrics()
+    return Response(content=s.REGISTRY.render(merge), media_type=s.METRICS_CONTENT_TYPE)
+
 @app.get("/scrape/txt")
-def scrape_content_txt(url: str, xpath: str):
+async def scrape_content_txt(
+    url: str,
+    xpath: str,
+    profile: Optional[str] = None,
+    max_age: Optional[float] = None,
+    no_cache: bool = False,
+    engine: s.ScrapeEngine = Depends(get_engine),
+):
     """
     Scrape text content from a website using the provided URL and XPath.
     """
     try:
-        # Call the scraper function to get the content
-        scraped_data = s.scrape_content_txt(url, xpath)
-        if scraped_data:
-            return {"scraped_data": scraped_data}
+        s.compile_xpath(xpath)
+    except s.InvalidXPathError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+    try:
+        # Scrape through the static and browser tiers
+        result = await engine.scrape(ScrapeTask(
+            url=url, xpath=xpath, data_type="TXT", profile=profile, max_age=max_age, no_cache=no_cache
+        ))
+        if result["status"] == "success":
+            return {"scraped_data": result["scraped_data"]}
         else:
-            return {"error": "No content found at the provided XPath."}
+            return {"error": result["error"]}
     except Exception as e:
         logger.error(f"Error in /scrape/txt: {e}")
         return {"error": f"An error occurred: {str(e)}"}
 
 @app.get("/scrape/html")
-def scrape_content_html(url: str, xpath: str):
+async def scrape_content_html(
+    url: str,
+    xpath: str,
+    profile: Optional[str] = None,
+    max_age: Optional[float] = None,
+    no_cache: bool = False,
+    engine: s.ScrapeEngine = Depends(get_engine),
+):
     """
     Scrape HTML content from a website using the provided URL and XPath.
     """
     try:
-        # Call the scraper function to get the content
-        scraped_data = s.scrape_content_html(url, xpath)
-        if scraped_data:
-            return {"scraped_data": scraped_data}
+        s.compile_xpath(xpath)
+    except s.InvalidXPathError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+    try:
+        # Scrape through the static and browser tiers
+        result = await engine.scrape(ScrapeTask(
+            url=url, xpath=xpath, data_type="HTML", profile=profile, max_age=max_age, no_cache=no_cache
+        ))
+        if result["status"] == "success":
+            return {"scraped_data": result["scraped_data"]}
         else:
-            return {"error": "No content found at the provided XPath."}
+            return {"error": result["error"]}
     except Exception as e:
         logger.error(f"Error in /scrape/html: {e}")
         return {"error": f"An error occurred: {str(e)}"}
 
-@app.post("/scrape/batch")
-def scrape_batch(request: ScrapeBatchRequest, authorization: Optional[str] = Header(None)):
+def verify_token(authorization: Optional[str] = Header(None)) -> None:
     """
-    Batch scrape multiple Datapoints based on provided tasks.
-    Expects a list of tasks each containing 'url', 'xpath', and optionally 'data_type'.
+    Rejects requests that do not carry the API token as a Bearer token.
     """
     # Log the incoming authorization header
     logger.info(f"Authorization header received: {authorization}")
@@ -105,46 +429,159 @@ def scrape_batch(request: ScrapeBatchRequest, authorization: Optional[str] = Hea
         logger.warning("Unauthorized access attempt.")
         raise HTTPException(status_code=403, detail="Unauthorized.")
 
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+async def _stream_batch(engine: s.ScrapeEngine, tasks: List[ScrapeTask]):
+    async for index, result in engine.iter_batch(tasks):
+        yield json.dumps({"index": index, **result}) + "\n"
+
+@app.post("/scrape/batch")
+async def scrape_batch(
+    request: ScrapeBatchRequest,
+    _: None = Depends(verify_token),
+    engine: s.ScrapeEngine = Depends(get_engine),
+    stream: bool = False,
+    accept: Optional[str] = Header(None),
+):
+    """
+    Batch scrape multiple Datapoints based on provided tasks.
+    Expects a list of tasks each containing 'url', 'xpath', and optionally 'data_type'.
+    Tasks are scraped concurrently; results are returned in task order.
+
+    With `?stream=true` or an `Accept: application/x-ndjson` header, results
+    are streamed as newline-delimited JSON, one line per task as soon as it
+    finishes (in completion order, with the task's `index`).
+    """
     logger.info(f"Received batch scraping request: {request.tasks}")
 
-    results = []
+    if stream or (accept and NDJSON_MEDIA_TYPE in accept):
+        return StreamingResponse(_stream_batch(engine, request.tasks), media_type=NDJSON_MEDIA_TYPE)
 
-    for task in request.tasks:
-        url = task.url
-        xpath = task.xpath
-        data_type = task.data_type.upper()
+    results = await engine.run_batch(request.tasks)
 
+    return {"results": results}
+
+@app.post("/jobs", status_code=202)
+async def submit_job(
+    request: ScrapeBatchRequest,
+    _: None = Depends(verify_token),
+    jobs: s.JobManager = Depends(get_job_manager),
+):
+    """
+    Queues a batch scrape as a background job and returns its id right away.
+    Poll `GET /jobs/{job_id}` for progress and page through
+    `GET /jobs/{job_id}/results` while it runs.
+    """
+    try:
+        job = jobs.submit(request.tasks)
+    except s.JobQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "10"})
+    return job.progress()
+
+@app.get("/jobs/{job_id}")
+async def get_job(
+    job_id: str,
+    _: None = Depends(verify_token),
+    jobs: s.JobManager = Depends(get_job_manager),
+):
+    """
+    Reports the status and progress counts of a job.
+    """
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found or expired.")
+    return job.progress()
+
+@app.get("/jobs/{job_id}/results")
+async def get_job_results(
+    job_id: str,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    _: None = Depends(verify_token),
+    jobs: s.JobManager = Depends(get_job_manager),
+):
+    """
+    Pages through a job's results in completion order. Each result carries
+    the `index` of its task. Results are appended as tasks finish, so
+    polling with the returned `next_offset` only fetches new results.
+    """
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found or expired.")
+    page = job.results[offset:offset + limit]
+    return {
+        "job_id": job.id,
+        "status": job.status,
+        "total": job.total,
+        "offset": offset,
+        "next_offset": offset + len(page),
+        "results": page,
+    }
+
+@app.get("/snapshots/{digest}")
+async def get_snapshot(
+    digest: str,
+    _: None = Depends(verify_token),
+    snapshots: s.SnapshotStore = Depends(get_snapshots),
+):
+    """
+    Returns the archived HTML of a snapshot, as referenced by a result's `snapshot` hash.
+    """
+    content = await snapshots.get(digest)
+    if content is None:
+        raise HTTPException(status_code=404, detail="Snapshot not found or deleted.")
+    return Response(content=content, media_type="text/html")
+
+@app.post("/snapshots/{digest}/extract")
+async def extract_snapshot(
+    digest: str,
+    request: SnapshotExtractRequest,
+    _: None = Depends(verify_token),
+    snapshots: s.SnapshotStore = Depends(get_snapshots),
+):
+    """
+    Re-runs XPaths against an archived snapshot, without fetching the page again.
+    Useful to debug or fix a Datapoint's XPath against what the scraper saw.
+    """
+    content = await snapshots.get(digest)
+    if content is None:
+        raise HTTPException(status_code=404, detail="Snapshot not found or deleted.")
+    tree = s.parse_html(content)
+    results = []
+    for task in request.tasks:
         try:
-            if data_type == "TXT":
-                scraped_data = s.scrape_content_txt(url, xpath)
-            elif data_type == "HTML":
-                scraped_data = s.scrape_content_html(url, xpath)
-            else:
-                raise ValueError(f"Unsupported data_type '{task.data_type}'. Use 'TXT' or 'HTML'.")
-
-            if scraped_data:
-                results.append({
-                    "url": url,
-                    "xpath": xpath,
-                    "scraped_data": scraped_data,
-                    "status": "success"
-                })
-                logger.info(f"Successfully scraped data for URL: {url}, XPath: {xpath}")
-            else:
-                results.append({
-                    "url": url,
-                    "xpath": xpath,
-                    "error": "No content found at the provided XPath.",
-                    "status": "failed"
-                })
-                logger.warning(f"No content found for URL: {url}, XPath: {xpath}")
+            scraped_data = s.extract(tree, task.xpath, (task.data_type or "TXT").upper())
         except Exception as e:
-            results.append({
-                "url": url,
-                "xpath": xpath,
-                "error": str(e),
-                "status": "failed"
-            })
-            logger.error(f"Error scraping URL: {url}, XPath: {xpath}. Error: {e}")
+            results.append({"xpath": task.xpath, "error": f"Error during scraping: {e}", "status": "failed"})
+            continue
+        if scraped_data:
+            results.append({"xpath": task.xpath, "scraped_data": scraped_data, "status": "success"})
+        else:
+            results.append({"xpath": task.xpath, "error": "No content found at the provided XPath.", "status": "failed"})
+    return {"snapshot": digest, "results": results}
 
-    return {"results": results}
+@app.get("/admin/circuits")
+async def list_circuits(
+    _: None = Depends(verify_token),
+    breaker: s.CircuitBreaker = Depends(get_breaker),
+):
+    """
+    Reports the circuit breaker state of every host seen so far: "closed",
+    "open" (pages fail fast with status "circuit_open") or "half_open".
+    """
+    return {"policy": dataclasses.asdict(breaker.policy), "circuits": breaker.snapshot()}
+
+@app.post("/admin/circuits/reset")
+async def reset_circuits(
+    host: Optional[str] = None,
+    _: None = Depends(verify_token),
+    breaker: s.CircuitBreaker = Depends(get_breaker),
+):
+    """
+    Closes the circuit of `host`, or of every host when none is given,
+    e.g. once a site that was down is known to be back.
+    """
+    reset = breaker.reset(host.lower() if host else None)
+    if host and not reset:
+        raise HTTPException(status_code=404, detail=f"No circuit for host '{host}'.")
+    return {"reset": reset}
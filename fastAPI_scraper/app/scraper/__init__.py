@@ -1,47 +1,52 @@
+import sys
+from pathlib import Path
 from typing import Optional
-from lxml import html
-from playwright.sync_api import sync_playwright, TimeoutError as PlaywrightTimeoutError
 
-def get_page(url: str, wait_xpath: Optional[str] = None) -> html.HtmlElement:
-    """
-    Fetches the page content using Playwright, waiting for a specific element if provided.
-
-    Args:
-        url (str): The URL of the website to fetch.
-        wait_xpath (Optional[str]): The XPath of the element to wait for.
-
-    Returns:
-        html.HtmlElement: The parsed HTML tree of the page content.
-    """
-    try:
-        with sync_playwright() as p:
-            browser = p.chromium.launch(headless=True)
-            context = browser.new_context()
-            page = context.new_page()
-            page.goto(url, timeout=15000)
+# scraper_common, at the repository root, is shared with the Django app
+_REPOSITORY_ROOT = str(Path(__file__).resolve().parents[3])
+if _REPOSITORY_ROOT not in sys.path:
+    sys.path.append(_REPOSITORY_ROOT)
 
-            if wait_xpath:
-                # Wait for the element matching the XPath to be visible
-                page.wait_for_selector(f'xpath={wait_xpath}', timeout=15000)
-            else:
-                # Wait for the network to be idle
-                page.wait_for_load_state('networkidle', timeout=15000)
+from scraper_common.fingerprint import VOLATILE_ATTRIBUTES, Normalization, fingerprint
+from scraper_common.timeouts import TimeoutLearner
 
-            content = page.content()
-            tree = html.fromstring(content)
-            browser.close()
-            return tree
-    except PlaywrightTimeoutError:
-        raise RuntimeError("Timeout while waiting for the element to appear.")
-    except Exception as e:
-        raise RuntimeError(f"Error fetching the page: {e}")
+from .metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, REGISTRY, Counter, Gauge, Histogram, Registry
+from .pool import BrowserPool
+from .fetch import (
+    WAIT_MODES,
+    WAIT_NETWORKIDLE,
+    WAIT_XPATHS,
+    fetch_static,
+    get_page,
+    get_static_page,
+    parse_html,
+    render_content,
+)
+from .cache import CacheControl, CachedPage, PageCache
+from .snapshots import SnapshotStore
+from .xpath import InvalidXPathError, compile_xpath, xpath_cache_info
+from .extract import extract, extract_html, extract_txt
+from .modes import RenderModeRegistry, TIER_BROWSER, TIER_STATIC
+from .interception import (
+    DEFAULT_PROFILE,
+    INTERCEPTION_PROFILES,
+    InterceptionProfile,
+    InterceptionStats,
+    get_profile,
+)
+from .scheduler import HostPolicy, HostScheduler, RateLimitedError, parse_retry_after
+from .breaker import CLOSED, HALF_OPEN, OPEN, BreakerPolicy, CircuitBreaker, PageLoadError, Permit
+from .processes import ProcessWorkerPool, WorkerCrashed
+from .engine import ScrapeEngine
+from .jobs import Job, JobManager, JobQueueFull
 
-def scrape_content_txt(url: str, xpath: str) -> Optional[str]:
+async def scrape_content_txt(pool: BrowserPool, url: str, xpath: str) -> Optional[str]:
     """
     Scrape text content from the given URL using the provided XPath,
     combining the text of multiple elements into a single string.
 
     Args:
+        pool (BrowserPool): The pool to borrow a browser page from.
         url (str): The URL of the website to scrape.
         xpath (str): The XPath to target the content.
 
@@ -49,26 +54,18 @@ def scrape_content_txt(url: str, xpath: str) -> Optional[str]:
         Optional[str]: Combined text content from all matching elements, or None if no content found.
     """
     try:
-        tree = get_page(url)
-        result = tree.xpath(xpath)
-
-        if result:
-            # Combine all matching elements' text content into a single string
-            combined_text = " ".join([
-                element.text_content().strip() for element in result if element.text_content()
-            ])
-            return combined_text if combined_text else None
-        else:
-            return None
+        tree = await get_page(pool, url)
+        return extract_txt(tree, xpath)
     except Exception as e:
         raise RuntimeError(f"Error during scraping: {e}")
 
-def scrape_content_html(url: str, xpath: str) -> Optional[str]:
+async def scrape_content_html(pool: BrowserPool, url: str, xpath: str) -> Optional[str]:
     """
     Scrape HTML content from the given URL using the provided XPath,
     combining the HTML of multiple elements into a single string.
 
     Args:
+        pool (BrowserPool): The pool to borrow a browser page from.
         url (str): The URL of the website to scrape.
         xpath (str): The XPath to target the content.
 
@@ -76,16 +73,7 @@ def scrape_content_html(url: str, xpath: str) -> Optional[str]:
         Optional[str]: Combined HTML from all matching elements, or None if no content found.
     """
     try:
-        tree = get_page(url)
-        result = tree.xpath(xpath)
-
-        if result:
-            # Combine all matching elements' HTML content into a single string
-            combined_html = " ".join([
-                html.tostring(element, pretty_print=True, encoding="unicode") for element in result
-            ])
-            return combined_html if combined_html else None
-        else:
-            return None
+        tree = await get_page(pool, url)
+        return extract_html(tree, xpath)
     except Exception as e:
         raise RuntimeError(f"Error during scraping: {e}")
@@ -0,0 +1,202 @@
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Callable, Deque, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class PageLoadError(RuntimeError):
+    """
+    Raised when a page could not be loaded at all, so nothing could be
+    extracted from it. Carries the failed results of the page's tasks.
+    """
+
+    def __init__(self, url: str, message: str, results: List[dict]):
+        super().__init__(message)
+        self.url = url
+        self.results = results
+
+    def __reduce__(self):
+        # Lets the error cross process boundaries (see ProcessWorkerPool)
+        return type(self), (self.url, str(self), self.results)
+
+
+@dataclass(frozen=True)
+class BreakerPolicy:
+    """
+    When a host's circuit opens and how it recovers.
+
+    The circuit opens once at least `min_requests` of the host's last
+    `window` page loads are known and `failure_ratio` of them failed. It
+    stays open for `open_for` seconds, then lets `half_open_probes` pages
+    through: if they load, the circuit closes again, otherwise it reopens.
+    A probe that has not reported back after `probe_timeout` seconds is
+    presumed lost, and another page is let through in its place.
+    """
+    window: int = 20
+    min_requests: int = 5
+    failure_ratio: float = 0.5
+    open_for: float = 30.0
+    half_open_probes: int = 1
+    probe_timeout: float = 120.0
+
+
+@dataclass(frozen=True)
+class Permit:
+    """
+    Lets one page load through a host's circuit; see CircuitBreaker.allow.
+
+    `epoch` is the circuit's epoch when the permit was given. The epoch
+    moves on whenever the circuit changes state (or a probe is presumed
+    lost), so outcomes of loads let through before that are told apart and
+    ignored. `probe` is set for the loads a half-open circuit lets through.
+    """
+    epoch: int
+    probe: bool = False
+
+
+class _Circuit:
+    def __init__(self, window: int):
+        self.state = CLOSED
+        self.epoch = 0
+        self.outcomes: Deque[bool] = deque(maxlen=window)
+        self.opened_until = 0.0
+        self.probes = 0
+        # Half-open: when the probes let through last are presumed lost
+        self.probes_until = 0.0
+        self.trips = 0
+        self.rejected = 0
+
+
+class CircuitBreaker:
+    """
+    Per-host circuit breaker that fails pages of unreachable hosts fast.
+
+    A host whose pages keep failing to load (timeouts, refused or reset
+    connections) gets an open circuit, and its pages are rejected at once
+    instead of each waiting out a full render timeout. Extraction misses
+    and rate limiting do not count as failures: the host answered.
+    """
+
+    def __init__(self, policy: BreakerPolicy = BreakerPolicy(), clock: Callable[[], float] = time.monotonic):
+        if not 0 < policy.failure_ratio <= 1:
+            raise ValueError("failure_ratio must be in (0, 1].")
+        self.policy = policy
+        self.clock = clock
+        self._circuits: Dict[str, _Circuit] = {}
+
+    def _circuit(self, host: str) -> _Circuit:
+        circuit = self._circuits.get(host)
+        if circuit is None:
+            circuit = self._circuits[host] = _Circuit(self.policy.window)
+        return circuit
+
+    def allow(self, host: str) -> Optional[Permit]:
+        """
+        Returns a Permit if a page of the host may be loaded now, else
+        None. A permit must be handed back exactly once: to `record` with
+        the load's outcome, or to `release` if the load was abandoned
+        before its outcome was known.
+        """
+        circuit = self._circuit(host)
+        now = self.clock()
+        if circuit.state == OPEN and now >= circuit.opened_until:
+            circuit.state = HALF_OPEN
+            circuit.epoch += 1
+            circuit.probes = 0
+            logger.info(f"Circuit for {host} is half-open; probing.")
+        if circuit.state == CLOSED:
+            return Permit(circuit.epoch)
+        if circuit.state == HALF_OPEN and circuit.probes and now >= circuit.probes_until:
+            logger.warning(f"Probe of {host} did not report back in {self.policy.probe_timeout:.0f}s; probing again.")
+            # Whatever the lost probes report later is ignored
+            circuit.epoch += 1
+            circuit.probes = 0
+        if circuit.state == HALF_OPEN and circuit.probes < self.policy.half_open_probes:
+            circuit.probes += 1
+            circuit.probes_until = now + self.policy.probe_timeout
+            return Permit(circuit.epoch, probe=True)
+        circuit.rejected += 1
+        return None
+
+    def record(self, host: str, success: bool, permit: Permit) -> None:
+        """
+        Records whether the page load let through by `permit` succeeded.
+        Outcomes of loads let through before the circuit last changed state
+        are ignored: only a half-open circuit's own probes close or reopen it.
+        """
+        circuit = self._circuit(host)
+        if permit.epoch != circuit.epoch:
+            logger.debug(f"Ignoring a late outcome for {host}; its circuit has changed state since.")
+            return
+        if circuit.state == HALF_OPEN:
+            circuit.probes = max(0, circuit.probes - 1)
+            if success:
+                self._close(host, circuit)
+            else:
+                self._open(host, circuit)
+            return
+        circuit.outcomes.append(success)
+        if circuit.state == CLOSED and len(circuit.outcomes) >= self.policy.min_requests:
+            failures = circuit.outcomes.count(False)
+            if failures / len(circuit.outcomes) >= self.policy.failure_ratio:
+                self._open(host, circuit)
+
+    def release(self, host: str, permit: Permit) -> None:
+        """
+        Gives back a permit whose page load ended without an outcome, e.g.
+        because it was cancelled, so a half-open circuit can send another
+        probe.
+        """
+        circuit = self._circuit(host)
+        if permit.probe and permit.epoch == circuit.epoch and circuit.state == HALF_OPEN:
+            circuit.probes = max(0, circuit.probes - 1)
+
+    def reset(self, host: Optional[str] = None) -> List[str]:
+        """
+        Closes the circuit of `host`, or of every host, and returns the hosts that were reset.
+        """
+        hosts = [host] if host is not None else list(self._circuits)
+        reset = []
+        for name in hosts:
+            circuit = self._circuits.get(name)
+            if circuit is not None:
+                self._close(name, circuit)
+                reset.append(name)
+        return reset
+
+    def snapshot(self) -> Dict[str, dict]:
+        now = self.clock()
+        return {
+            host: {
+                "state": circuit.state,
+                "failures": circuit.outcomes.count(False),
+                "requests": len(circuit.outcomes),
+                "open_for": round(max(0.0, circuit.opened_until - now), 1) if circuit.state == OPEN else 0.0,
+                "trips": circuit.trips,
+                "rejected": circuit.rejected,
+            }
+            for host, circuit in self._circuits.items()
+        }
+
+    def _open(self, host: str, circuit: _Circuit) -> None:
+        circuit.state = OPEN
+        circuit.epoch += 1
+        circuit.opened_until = self.clock() + self.policy.open_for
+        circuit.trips += 1
+        logger.warning(f"Circuit for {host} opened; failing its pages fast for {self.policy.open_for:.0f}s.")
+
+    def _close(self, host: str, circuit: _Circuit) -> None:
+        if circuit.state != CLOSED:
+            logger.info(f"Circuit for {host} closed.")
+            circuit.epoch += 1
+        circuit.state = CLOSED
+        circuit.outcomes.clear()
+        circuit.probes = 0
+        circuit.opened_until = 0.0
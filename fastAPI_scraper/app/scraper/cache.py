@@ -0,0 +1,234 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Dict, Hashable, List, Optional, Tuple
+
+from .metrics import PAGE_CACHE_LOOKUPS
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CachedPage:
+    """
+    Page content as fetched or rendered, plus the HTTP validators needed to revalidate it.
+
+    `waited_for` lists the XPaths an early-exit render waited for; the page
+    may be incomplete for any other XPath. It is None for full page loads.
+    """
+    content: str
+    stored_at: float
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    waited_for: Optional[List[str]] = None
+
+    def covers(self, xpaths) -> bool:
+        """
+        Tells whether the page was rendered completely enough for all of `xpaths`.
+        """
+        return self.waited_for is None or set(xpaths) <= set(self.waited_for)
+
+    @property
+    def size(self) -> int:
+        return len(self.content)
+
+    def age(self) -> float:
+        return time.time() - self.stored_at
+
+    def validators(self) -> Dict[str, str]:
+        """
+        Returns the conditional request headers for revalidating this entry.
+        """
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+@dataclass(frozen=True)
+class CacheControl:
+    """
+    Per-request cache policy.
+
+    `max_age` overrides how old (in seconds) a cached page may be to be used
+    without refetching; `no_cache` always refetches (revalidating where possible).
+    """
+    max_age: Optional[float] = None
+    no_cache: bool = False
+
+    @classmethod
+    def for_tasks(cls, tasks) -> "CacheControl":
+        """
+        Combines the cache options of tasks sharing one page, keeping the strictest.
+        """
+        max_ages = [t.max_age for t in tasks if getattr(t, "max_age", None) is not None]
+        return cls(
+            max_age=min(max_ages) if max_ages else None,
+            no_cache=any(getattr(t, "no_cache", False) for t in tasks),
+        )
+
+
+class PageCache:
+    """
+    LRU cache of page content keyed by URL and render options.
+
+    Entries are served while younger than `ttl` seconds (or the request's
+    `max_age`). Older entries are kept until evicted so that static fetches
+    can revalidate them with ETag/If-Modified-Since. Memory use is bounded by
+    `max_bytes` of content; when `disk_dir` is set, entries are also written
+    there and survive restarts, bounded by `disk_max_bytes`.
+    """
+
+    def __init__(
+        self,
+        ttl: float = 300.0,
+        max_bytes: int = 64 * 1024 * 1024,
+        disk_dir: Optional[str] = None,
+        disk_max_bytes: int = 512 * 1024 * 1024,
+    ):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.disk_dir = Path(disk_dir) if disk_dir else None
+        self.disk_max_bytes = disk_max_bytes
+        self._disk_bytes = 0
+        if self.disk_dir is not None:
+            self.disk_dir.mkdir(parents=True, exist_ok=True)
+            self._disk_bytes = sum(p.stat().st_size for p in self.disk_dir.glob("*/*.json"))
+
+        self._entries: "OrderedDict[str, CachedPage]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "revalidations": 0, "evictions": 0, "disk_hits": 0}
+
+    async def lookup(self, key: Hashable, control: CacheControl = CacheControl()) -> Tuple[Optional[CachedPage], bool]:
+        """
+        Looks up a page and decides whether it is fresh enough to use.
+
+        Returns:
+            Tuple[Optional[CachedPage], bool]: The cached entry, if any (it may be
+            stale and still useful for revalidation), and whether it can be used as is.
+        """
+        digest = self._digest(key)
+        entry = self._get_memory(digest)
+        if entry is None and self.disk_dir is not None:
+            entry = await asyncio.to_thread(self._read_disk, digest)
+            if entry is not None:
+                self._count("disk_hits")
+                self._put_memory(digest, entry)
+
+        max_age = self.ttl if control.max_age is None else control.max_age
+        fresh = entry is not None and not control.no_cache and entry.age() <= max_age
+        self._count("hits" if fresh else "misses")
+        PAGE_CACHE_LOOKUPS.inc(result="hit" if fresh else "miss")
+        return entry, fresh
+
+    async def put(self, key: Hashable, entry: CachedPage) -> None:
+        digest = self._digest(key)
+        self._put_memory(digest, entry)
+        if self.disk_dir is not None:
+            await asyncio.to_thread(self._write_disk, digest, entry)
+
+    async def revalidated(self, key: Hashable, entry: CachedPage) -> None:
+        """
+        Marks an entry as confirmed unchanged by the origin (HTTP 304).
+        """
+        self._count("revalidations")
+        entry.stored_at = time.time()
+        await self.put(key, entry)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["misses"]
+            return dict(
+                self._stats,
+                entries=len(self._entries),
+                bytes=self._bytes,
+                disk_bytes=self._disk_bytes,
+                hit_ratio=round(self._stats["hits"] / lookups, 4) if lookups else None,
+            )
+
+    @staticmethod
+    def _digest(key: Hashable) -> str:
+        return hashlib.sha256(json.dumps(key, default=str).encode("utf-8")).hexdigest()
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._stats[name] += 1
+
+    def _get_memory(self, digest: str) -> Optional[CachedPage]:
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is not None:
+                self._entries.move_to_end(digest)
+            return entry
+
+    def _put_memory(self, digest: str, entry: CachedPage) -> None:
+        if entry.size > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(digest, None)
+            if previous is not None:
+                self._bytes -= previous.size
+            self._entries[digest] = entry
+            self._bytes += entry.size
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.size
+                self._stats["evictions"] += 1
+
+    def _disk_path(self, digest: str) -> Path:
+        return self.disk_dir / digest[:2] / f"{digest}.json"
+
+    def _read_disk(self, digest: str) -> Optional[CachedPage]:
+        path = self._disk_path(digest)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return CachedPage(**json.load(f))
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, TypeError) as e:
+            logger.warning(f"Discarding unreadable cache file {path}: {e}")
+            path.unlink(missing_ok=True)
+            return None
+
+    def _write_disk(self, digest: str, entry: CachedPage) -> None:
+        path = self._disk_path(digest)
+        try:
+            path.parent.mkdir(exist_ok=True)
+            previous_size = path.stat().st_size if path.exists() else 0
+            tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(asdict(entry), f)
+            os.replace(tmp, path)
+            with self._lock:
+                self._disk_bytes += path.stat().st_size - previous_size
+                over_budget = self._disk_bytes > self.disk_max_bytes
+            if over_budget:
+                self._prune_disk()
+        except OSError as e:
+            logger.warning(f"Could not write cache file {path}: {e}")
+
+    def _prune_disk(self) -> None:
+        """
+        Deletes the least recently written files once the disk tier exceeds its budget.
+        """
+        files = [(p.stat(), p) for p in self.disk_dir.glob("*/*.json")]
+        total = sum(st.st_size for st, _ in files)
+        # Prune to 90% of the budget so the next few writes don't trigger another scan
+        target = self.disk_max_bytes * 0.9
+        for st, path in sorted(files, key=lambda item: item[0].st_mtime):
+            if total <= target:
+                break
+            path.unlink(missing_ok=True)
+            total -= st.st_size
+        with self._lock:
+            self._disk_bytes = total
@@ -0,0 +1,510 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import AsyncIterator, Deque, Dict, Hashable, List, Optional, Sequence, Tuple, Union
+from urllib.parse import urlsplit
+
+import httpx
+from scraper_common.fingerprint import Normalization, fingerprint
+from scraper_common.timeouts import TimeoutLearner
+
+from .pool import BrowserPool
+from .fetch import WAIT_MODES, WAIT_NETWORKIDLE, WAIT_XPATHS, fetch_static, parse_html, render_content
+from .cache import CacheControl, CachedPage, PageCache
+from .snapshots import SnapshotStore
+from .extract import DATA_TYPES, extract
+from .modes import RenderModeRegistry, TIER_BROWSER, TIER_STATIC
+from .interception import DEFAULT_PROFILE, InterceptionStats, get_profile
+from .scheduler import HostScheduler, RateLimitedError
+from .breaker import CircuitBreaker, PageLoadError
+from .processes import ProcessWorkerPool
+from .metrics import BATCH_SIZE, IN_FLIGHT, RESULTS
+
+logger = logging.getLogger(__name__)
+
+
+def render_key(task, default_profile: str = DEFAULT_PROFILE) -> Hashable:
+    """
+    Identifies one page render: the URL plus the options that affect how it is rendered.
+    """
+    return (task.url, getattr(task, "profile", None) or default_profile)
+
+
+def plan_batch(tasks: Sequence, default_profile: str = DEFAULT_PROFILE) -> Dict[Hashable, List[int]]:
+    """
+    Groups task indices by render key, so every page only has to be rendered once.
+
+    Args:
+        tasks (Sequence): Objects with a `url` and optionally a `profile` attribute.
+        default_profile (str): Interception profile for tasks that do not set one.
+
+    Returns:
+        Dict[Hashable, List[int]]: Task indices per unique render, in order of first appearance.
+    """
+    groups: Dict[Hashable, List[int]] = {}
+    for index, task in enumerate(tasks):
+        groups.setdefault(render_key(task, default_profile), []).append(index)
+    return groups
+
+
+def host_of(url: str) -> str:
+    return (urlsplit(url).hostname or url).lower()
+
+
+def group_by_host(groups: Sequence[List[int]], tasks: Sequence) -> Dict[str, Deque[List[int]]]:
+    """
+    Splits planned groups into one queue per host, keeping their order within each host.
+    """
+    by_host: Dict[str, Deque[List[int]]] = {}
+    for indices in groups:
+        by_host.setdefault(host_of(tasks[indices[0]].url), deque()).append(indices)
+    return by_host
+
+
+def _success(
+    task,
+    scraped_data: str,
+    tier: Optional[str] = None,
+    cache_hit: bool = False,
+    snapshot: Optional[str] = None,
+    data_fingerprint: Optional[str] = None,
+) -> dict:
+    return {
+        "id": getattr(task, "id", None),
+        "url": task.url,
+        "xpath": task.xpath,
+        "scraped_data": scraped_data,
+        "fingerprint": data_fingerprint,
+        "status": "success",
+        "tier": tier,
+        "cache_hit": cache_hit,
+        "snapshot": snapshot,
+    }
+
+
+def _failure(
+    task, error: str, tier: Optional[str] = None, cache_hit: bool = False, snapshot: Optional[str] = None
+) -> dict:
+    return {
+        "id": getattr(task, "id", None),
+        "url": task.url,
+        "xpath": task.xpath,
+        "error": error,
+        "fingerprint": None,
+        "status": "failed",
+        "tier": tier,
+        "cache_hit": cache_hit,
+        "snapshot": snapshot,
+    }
+
+
+def _circuit_open(task, host: str) -> dict:
+    return {
+        "id": getattr(task, "id", None),
+        "url": task.url,
+        "xpath": task.xpath,
+        "error": f"Circuit open for {host}: its pages keep failing to load, so this one was not attempted.",
+        "fingerprint": None,
+        "status": "circuit_open",
+        "tier": None,
+        "cache_hit": False,
+        "snapshot": None,
+    }
+
+
+class ScrapeEngine:
+    """
+    Runs batches of scrape tasks concurrently on pages borrowed from a browser pool.
+
+    Tasks are planned by unique URL: each page is rendered once and every
+    XPath requested for it is evaluated against the same parsed tree. At
+    most `max_in_flight` pages are rendered at the same time, so a batch
+    takes roughly as long as its slowest pages instead of the sum of all of
+    them. Results are always returned in the order of the submitted tasks.
+    The limit is shared across concurrent batches so they never oversubscribe
+    the browser pool.
+
+    When an HTTP client is given, pages are first fetched with a plain GET
+    and only rendered in the browser if an XPath finds nothing there. The
+    tier that worked is remembered per domain in `modes`.
+
+    Browser renders block subresources according to the task's interception
+    profile, or `default_profile` when the task does not name one.
+
+    When a `cache` is given, fetched and rendered pages are reused across
+    requests according to each task's `max_age` and `no_cache` options.
+
+    Requests are kept polite by the `scheduler`: each host gets a limited
+    number of concurrent pages and a minimum interval between requests,
+    batches work on all their hosts side by side instead of queueing up
+    behind one busy site, and a 429/503 with Retry-After holds the host
+    back and retries the page up to `max_retries` times.
+
+    Renders wait for the network to go idle, or with `wait_mode` "xpaths"
+    only until every requested XPath matches in the live DOM. Timeouts are
+    learned per domain by `timeouts`.
+
+    When a `snapshots` store is given, the HTML every result was extracted
+    from is archived there and the result carries its hash as "snapshot".
+
+    Successful results carry a "fingerprint": a hash of the scraped data
+    after `normalization`, so callers can detect changes without comparing
+    full payloads.
+
+    With a `breaker`, hosts whose pages keep failing to load get an open
+    circuit: their tasks are answered at once with status "circuit_open"
+    instead of each waiting out a render timeout.
+
+    `pool` may also be a `ProcessWorkerPool`, in which case every page
+    group is rendered and extracted in one of its worker processes.
+    """
+
+    def __init__(
+        self,
+        pool: Union[BrowserPool, ProcessWorkerPool],
+        max_in_flight: Optional[int] = None,
+        http_client: Optional[httpx.AsyncClient] = None,
+        modes: Optional[RenderModeRegistry] = None,
+        default_profile: str = DEFAULT_PROFILE,
+        cache: Optional[PageCache] = None,
+        scheduler: Optional[HostScheduler] = None,
+        max_retries: int = 2,
+        wait_mode: str = WAIT_NETWORKIDLE,
+        timeouts: Optional[TimeoutLearner] = None,
+        snapshots: Optional[SnapshotStore] = None,
+        normalization: Normalization = Normalization(),
+        breaker: Optional[CircuitBreaker] = None,
+    ):
+        self.pool = pool
+        self.max_in_flight = max_in_flight or pool.capacity
+        if self.max_in_flight < 1:
+            raise ValueError("max_in_flight must be at least 1.")
+        self._in_flight = asyncio.Semaphore(self.max_in_flight)
+        self.http_client = http_client
+        self.modes = modes or RenderModeRegistry()
+        self.default_profile = get_profile(default_profile).name
+        self.interception_stats = InterceptionStats()
+        self.cache = cache
+        self.scheduler = scheduler or HostScheduler()
+        self.max_retries = max_retries
+        if wait_mode not in WAIT_MODES:
+            raise ValueError(f"Unknown wait mode '{wait_mode}'. Use one of: {', '.join(WAIT_MODES)}.")
+        self.wait_mode = wait_mode
+        self.timeouts = timeouts or TimeoutLearner()
+        self.snapshots = snapshots
+        self.normalization = normalization
+        self.breaker = breaker
+
+    async def scrape(self, task) -> dict:
+        """
+        Scrapes a single task through the same tiers as a batch.
+        """
+        return (await self.scrape_group([task]))[0]
+
+    async def run_batch(self, tasks: Sequence) -> List[dict]:
+        """
+        Scrapes every task concurrently and returns one result per task.
+
+        Args:
+            tasks (Sequence): Objects with `url`, `xpath` and `data_type` attributes,
+                and optionally an `id` that is echoed in the task's result.
+
+        Returns:
+            List[dict]: The results, in the same order as `tasks`.
+        """
+        results: List[Optional[dict]] = [None] * len(tasks)
+        async for index, result in self.iter_batch(tasks):
+            results[index] = result
+        return results
+
+    async def iter_batch(self, tasks: Sequence) -> AsyncIterator[Tuple[int, dict]]:
+        """
+        Scrapes every task concurrently and yields `(task index, result)` pairs
+        as soon as each page is done, in completion order.
+
+        Every host gets its own workers, as many as its scheduler policy
+        allows to run concurrently, so pages of different hosts are worked on
+        side by side. Only `max_in_flight` pages are worked on at a time
+        overall and finished results are handed over through a bounded queue,
+        so a slow consumer applies backpressure instead of results piling up
+        in memory.
+        """
+        BATCH_SIZE.observe(len(tasks))
+        by_host = group_by_host(list(plan_batch(tasks, self.default_profile).values()), tasks)
+        finished: asyncio.Queue = asyncio.Queue(maxsize=self.max_in_flight)
+        done = object()
+
+        async def worker(groups: Deque[List[int]]) -> None:
+            try:
+                # The queue is shared by the host's workers; asyncio only switches tasks at awaits
+                while groups:
+                    indices = groups.popleft()
+                    group_results = await self.scrape_group([tasks[i] for i in indices])
+                    await finished.put(list(zip(indices, group_results)))
+            except Exception as e:
+                await finished.put(e)
+            else:
+                await finished.put(done)
+
+        workers = [
+            asyncio.create_task(worker(groups))
+            for host, groups in by_host.items()
+            for _ in range(min(len(groups), self.scheduler.policy(host).max_concurrency))
+        ]
+        try:
+            running = len(workers)
+            while running:
+                item = await finished.get()
+                if item is done:
+                    running -= 1
+                    continue
+                if isinstance(item, Exception):
+                    raise item
+                for pair in item:
+                    yield pair
+        finally:
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+
+    async def scrape_group(self, tasks: Sequence) -> List[dict]:
+        """
+        Runs `run_group` within the politeness limits of the page's host,
+        retrying after the delay the host asks for when it is rate limited.
+        """
+        host = host_of(tasks[0].url)
+        results = await self._scrape_group(host, tasks)
+        for result in results:
+            RESULTS.inc(domain=host, status=result["status"], tier=result["tier"] or "none")
+        return results
+
+    async def _scrape_group(self, host: str, tasks: Sequence) -> List[dict]:
+        async with self.scheduler.slot(host):
+            if self.breaker is None:
+                return (await self._load_group(host, tasks))[1]
+            permit = self.breaker.allow(host)
+            if permit is None:
+                return [_circuit_open(task, host) for task in tasks]
+            loaded = None
+            try:
+                loaded, results = await self._load_group(host, tasks)
+                return results
+            finally:
+                if loaded is None:
+                    # Cancelled or failed before the outcome was known; a half-open probe must not stay taken
+                    self.breaker.release(host, permit)
+                else:
+                    self.breaker.record(host, loaded, permit)
+
+    async def _load_group(self, host: str, tasks: Sequence) -> Tuple[bool, List[dict]]:
+        """
+        Runs `run_group`, retrying while the host is rate limited. Returns
+        whether the page loaded, for the circuit breaker, and the results.
+        """
+        for attempt in range(self.max_retries + 1):
+            # Sit out a Retry-After before taking one of the global in-flight slots
+            await self.scheduler.wait_deferral(host)
+            try:
+                results = await self.run_group(tasks)
+            except RateLimitedError as e:
+                self.scheduler.defer(host, e.retry_after)
+                error = e
+                if e.retry_after > self.scheduler.max_retry_after:
+                    break
+            except PageLoadError as e:
+                return False, e.results
+            else:
+                return True, results
+        # Rate limited: the host is up, it just wants fewer requests
+        logger.error(f"Giving up on URL: {tasks[0].url} after {attempt + 1} attempt(s). {error}")
+        return True, [_failure(task, f"Error during scraping: {error}") for task in tasks]
+
+    async def run_group(self, tasks: Sequence) -> List[dict]:
+        """
+        Renders the page shared by `tasks` once and extracts every task's XPath from it.
+
+        All tasks must share the same render key (see `plan_batch`). The
+        `max_in_flight` limit is shared by all batches, jobs and single
+        scrapes running on this engine.
+
+        Raises:
+            RateLimitedError: If the host answers 429 or 503; see `scrape_group`.
+            PageLoadError: If the page could not be loaded and no task succeeded.
+        """
+        async with self._in_flight:
+            if isinstance(self.pool, ProcessWorkerPool):
+                # Counted by the worker process that renders the page
+                return await self._run_group_in_worker(tasks)
+            with IN_FLIGHT.track():
+                return await self._run_group(tasks)
+
+    async def _run_group_in_worker(self, tasks: Sequence) -> List[dict]:
+        # Workers cannot see each other's traffic, so request spacing is enforced here
+        await self.scheduler.wait_turn(host_of(tasks[0].url))
+        try:
+            return await self.pool.run_group(tasks)
+        except (RateLimitedError, PageLoadError):
+            raise
+        except Exception as e:
+            logger.error(f"Error scraping URL: {tasks[0].url} in a worker process. Error: {e}")
+            return [_failure(task, f"Error during scraping: {e}") for task in tasks]
+
+    async def _run_group(self, tasks: Sequence) -> List[dict]:
+        results: List[Optional[dict]] = [None] * len(tasks)
+        pending = []
+        for i, task in enumerate(tasks):
+            data_type = (task.data_type or "TXT").upper()
+            if data_type in DATA_TYPES:
+                pending.append((i, task, data_type))
+            else:
+                error = f"Unsupported data_type '{task.data_type}'. Use 'TXT' or 'HTML'."
+                logger.error(f"Error scraping URL: {task.url}, XPath: {task.xpath}. Error: {error}")
+                results[i] = _failure(task, error)
+
+        if not pending:
+            return results
+
+        url = tasks[0].url
+        domain = host_of(url)
+        control = CacheControl.for_tasks(tasks)
+
+        if self.http_client is not None and self.modes.preferred(domain) != TIER_BROWSER:
+            try:
+                content, cache_hit = await self._load_static(url, control)
+                # An empty or unparseable body falls back to the browser like a failed fetch
+                tree = parse_html(content)
+            except RateLimitedError:
+                raise
+            except Exception as e:
+                logger.info(f"Static fetch failed for URL: {url}, falling back to the browser. {e}")
+            else:
+                remaining = []
+                succeeded = []
+                for i, task, data_type in pending:
+                    result = self._extract_result(tree, task, data_type, TIER_STATIC, cache_hit)
+                    if result["status"] == "success":
+                        results[i] = result
+                        succeeded.append(i)
+                    else:
+                        remaining.append((i, task, data_type))
+                if succeeded:
+                    # Only archive the static page if results were taken from it
+                    snapshot = await self._archive(content)
+                    for i in succeeded:
+                        results[i]["snapshot"] = snapshot
+                if not remaining:
+                    self.modes.record(domain, TIER_STATIC)
+                    return results
+                pending = remaining
+
+        try:
+            profile = getattr(tasks[0], "profile", None) or self.default_profile
+            xpaths = [task.xpath for _, task, _ in pending]
+            content, cache_hit = await self._load_rendered(url, profile, control, xpaths)
+            tree = parse_html(content)
+        except RateLimitedError:
+            raise
+        except Exception as e:
+            logger.error(f"Error rendering URL: {url}. Error: {e}")
+            for i, task, _ in pending:
+                results[i] = _failure(task, f"Error during scraping: {e}", TIER_BROWSER)
+            if not any(result["status"] == "success" for result in results):
+                # Nothing was loaded from the host at all; let the circuit breaker know
+                raise PageLoadError(url, str(e), results)
+            return results
+
+        snapshot = await self._archive(content)
+        found = False
+        for i, task, data_type in pending:
+            results[i] = self._extract_result(tree, task, data_type, TIER_BROWSER, cache_hit, snapshot)
+            found = found or results[i]["status"] == "success"
+        if found:
+            # Rendering found content the static fetch could not.
+            self.modes.record(domain, TIER_BROWSER)
+        return results
+
+    async def _archive(self, content: str) -> Optional[str]:
+        """
+        Stores page content in the snapshot store, if any, and returns its hash.
+        """
+        if self.snapshots is None:
+            return None
+        try:
+            return await self.snapshots.put(content)
+        except Exception as e:
+            logger.warning(f"Could not archive a page snapshot: {e}")
+            return None
+
+    async def _load_static(self, url: str, control: CacheControl) -> Tuple[str, bool]:
+        """
+        Returns the server-rendered page and whether it came from the cache,
+        revalidating a stale cached copy with a conditional GET.
+        """
+        key = (TIER_STATIC, url)
+        entry = None
+        if self.cache is not None:
+            entry, fresh = await self.cache.lookup(key, control)
+            if fresh:
+                return entry.content, True
+
+        headers = entry.validators() if entry is not None else None
+        await self.scheduler.wait_turn(host_of(url))
+        response = await fetch_static(self.http_client, url, headers=headers)
+        if response.status_code == 304 and entry is not None:
+            await self.cache.revalidated(key, entry)
+            return entry.content, True
+
+        content = response.text
+        if self.cache is not None and "no-store" not in response.headers.get("cache-control", ""):
+            await self.cache.put(key, CachedPage(
+                content=content,
+                stored_at=time.time(),
+                etag=response.headers.get("etag"),
+                last_modified=response.headers.get("last-modified"),
+            ))
+        return content, False
+
+    async def _load_rendered(
+        self, url: str, profile: str, control: CacheControl, xpaths: Sequence[str]
+    ) -> Tuple[str, bool]:
+        """
+        Returns the browser-rendered page and whether it came from the cache.
+        """
+        key = (TIER_BROWSER, url, profile)
+        if self.cache is not None:
+            entry, fresh = await self.cache.lookup(key, control)
+            if fresh and entry.covers(xpaths):
+                return entry.content, True
+
+        wait_xpaths = list(xpaths) if self.wait_mode == WAIT_XPATHS else None
+        await self.scheduler.wait_turn(host_of(url))
+        content = await render_content(
+            self.pool,
+            url,
+            profile=get_profile(profile),
+            stats=self.interception_stats,
+            wait_xpaths=wait_xpaths,
+            timeouts=self.timeouts,
+        )
+        if self.cache is not None:
+            await self.cache.put(key, CachedPage(content=content, stored_at=time.time(), waited_for=wait_xpaths))
+        return content, False
+
+    def _extract_result(
+        self, tree, task, data_type: str, tier: str, cache_hit: bool = False, snapshot: Optional[str] = None
+    ) -> dict:
+        try:
+            scraped_data = extract(tree, task.xpath, data_type)
+        except Exception as e:
+            logger.error(f"Error scraping URL: {task.url}, XPath: {task.xpath}. Error: {e}")
+            return _failure(task, f"Error during scraping: {e}", tier, cache_hit, snapshot)
+
+        if scraped_data:
+            logger.info(f"Successfully scraped data for URL: {task.url}, XPath: {task.xpath} ({tier})")
+            data_fingerprint = fingerprint(scraped_data, data_type, self.normalization)
+            return _success(task, scraped_data, tier, cache_hit, snapshot, data_fingerprint)
+        # A miss on the static tier is expected for rendered pages and falls back to the browser
+        log = logger.warning if tier == TIER_BROWSER else logger.debug
+        log(f"No content found for URL: {task.url}, XPath: {task.xpath} ({tier})")
+        return _failure(task, "No content found at the provided XPath.", tier, cache_hit, snapshot)
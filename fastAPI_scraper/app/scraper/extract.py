@@ -0,0 +1,68 @@
+from typing import Optional
+from lxml import html
+
+from .xpath import compile_xpath
+from .metrics import STAGE_SECONDS
+
+DATA_TYPES = ("TXT", "HTML")
+
+def extract_txt(tree: html.HtmlElement, xpath: str) -> Optional[str]:
+    """
+    Evaluates the XPath against a parsed page and combines the text of
+    every matching element into a single string.
+
+    Args:
+        tree (html.HtmlElement): The parsed HTML tree of the page.
+        xpath (str): The XPath to target the content.
+
+    Returns:
+        Optional[str]: Combined text content from all matching elements, or None if no content found.
+    """
+    with STAGE_SECONDS.time(stage="xpath"):
+        result = compile_xpath(xpath)(tree)
+
+    if result:
+        # Combine all matching elements' text content into a single string
+        with STAGE_SECONDS.time(stage="serialize"):
+            combined_text = " ".join([
+                element.text_content().strip() for element in result if element.text_content()
+            ])
+        return combined_text if combined_text else None
+    else:
+        return None
+
+def extract_html(tree: html.HtmlElement, xpath: str) -> Optional[str]:
+    """
+    Evaluates the XPath against a parsed page and combines the HTML of
+    every matching element into a single string.
+
+    Args:
+        tree (html.HtmlElement): The parsed HTML tree of the page.
+        xpath (str): The XPath to target the content.
+
+    Returns:
+        Optional[str]: Combined HTML from all matching elements, or None if no content found.
+    """
+    with STAGE_SECONDS.time(stage="xpath"):
+        result = compile_xpath(xpath)(tree)
+
+    if result:
+        # Combine all matching elements' HTML content into a single string
+        with STAGE_SECONDS.time(stage="serialize"):
+            combined_html = " ".join([
+                html.tostring(element, pretty_print=True, encoding="unicode") for element in result
+            ])
+        return combined_html if combined_html else None
+    else:
+        return None
+
+def extract(tree: html.HtmlElement, xpath: str, data_type: str) -> Optional[str]:
+    """
+    Dispatches to `extract_txt` or `extract_html` based on the data type.
+    """
+    data_type = data_type.upper()
+    if data_type == "TXT":
+        return extract_txt(tree, xpath)
+    if data_type == "HTML":
+        return extract_html(tree, xpath)
+    raise ValueError(f"Unsupported data_type '{data_type}'. Use 'TXT' or 'HTML'.")
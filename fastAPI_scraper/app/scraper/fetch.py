@@ -0,0 +1,202 @@
+import logging
+import time
+from typing import Dict, Optional, Sequence
+from urllib.parse import urlsplit
+
+import httpx
+from lxml import html
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+from scraper_common.timeouts import TimeoutLearner
+
+from .pool import BrowserPool
+from .interception import InterceptionProfile, InterceptionStats, route_handler
+from .scheduler import RATE_LIMIT_STATUSES, RateLimitedError, parse_retry_after
+from .metrics import STAGE_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# Render timeout (seconds) when no TimeoutLearner is given
+DEFAULT_RENDER_TIMEOUT = 15.0
+WAIT_NETWORKIDLE = "networkidle"
+WAIT_XPATHS = "xpaths"
+WAIT_MODES = (WAIT_NETWORKIDLE, WAIT_XPATHS)
+
+def parse_html(content: str) -> html.HtmlElement:
+    """
+    Parses page content into an lxml tree.
+
+    Args:
+        content (str): The decoded HTML of the page.
+
+    Returns:
+        html.HtmlElement: The parsed HTML tree.
+    """
+    with STAGE_SECONDS.time(stage="parse"):
+        try:
+            return html.fromstring(content)
+        except ValueError:
+            # lxml refuses str input that carries an XML encoding declaration
+            return html.fromstring(content.encode("utf-8"), parser=html.HTMLParser(encoding="utf-8"))
+
+# True once every XPath in `xpaths` selects something in the live DOM.
+# Expressions the browser cannot evaluate count as matched, so they never block the wait.
+ALL_XPATHS_MATCH_JS = """
+xpaths => xpaths.every(xpath => {
+    try {
+        return document.evaluate(`boolean(${xpath})`, document, null, XPathResult.BOOLEAN_TYPE, null).booleanValue;
+    } catch (e) {
+        return true;
+    }
+})
+"""
+
+async def render_content(
+    pool: BrowserPool,
+    url: str,
+    wait_xpath: Optional[str] = None,
+    profile: Optional[InterceptionProfile] = None,
+    stats: Optional[InterceptionStats] = None,
+    wait_xpaths: Optional[Sequence[str]] = None,
+    timeouts: Optional[TimeoutLearner] = None,
+) -> str:
+    """
+    Renders the page using a page borrowed from the browser pool, waiting
+    for a specific element if provided, and returns its HTML.
+
+    With `wait_xpaths`, the page is returned as soon as every one of the
+    XPaths matches in the live DOM, without waiting for the load event or
+    for the network to go idle. If they do not all match in time, the page
+    is returned as it is and extraction reports the missing ones.
+
+    Args:
+        pool (BrowserPool): The pool to borrow a browser page from.
+        url (str): The URL of the website to fetch.
+        wait_xpath (Optional[str]): The XPath of the element to wait for.
+        profile (Optional[InterceptionProfile]): Subresources to block while rendering.
+        stats (Optional[InterceptionStats]): Counters updated with every intercepted request.
+        wait_xpaths (Optional[Sequence[str]]): XPaths that must all match before returning.
+        timeouts (Optional[TimeoutLearner]): Supplies the domain's timeout and learns from this load.
+
+    Returns:
+        str: The rendered HTML of the page.
+
+    Raises:
+        RateLimitedError: If the site answers 429 or 503.
+    """
+    domain = (urlsplit(url).hostname or url).lower()
+    budget = timeouts.timeout_for(domain) if timeouts is not None else DEFAULT_RENDER_TIMEOUT
+    started = time.monotonic()
+
+    def remaining_ms() -> float:
+        return max(budget - (time.monotonic() - started), 1.0) * 1000
+
+    checkout_started = time.perf_counter()
+    try:
+        async with pool.page() as page:
+            # Waiting for a free context, and launching a browser when the pool has to
+            STAGE_SECONDS.observe(time.perf_counter() - checkout_started, stage="checkout")
+            if profile is not None and profile.blocks_anything:
+                await page.route("**/*", route_handler(profile, stats or InterceptionStats()))
+            started = time.monotonic()
+            with STAGE_SECONDS.time(stage="goto"):
+                response = await page.goto(
+                    url,
+                    timeout=budget * 1000,
+                    wait_until="domcontentloaded" if wait_xpaths else "load",
+                )
+            if response is not None and response.status in RATE_LIMIT_STATUSES:
+                retry_after = parse_retry_after(await response.header_value("retry-after"))
+                raise RateLimitedError(url, response.status, retry_after)
+
+            with STAGE_SECONDS.time(stage="wait"):
+                if wait_xpaths:
+                    # Poll the DOM until every target XPath matches
+                    try:
+                        await page.wait_for_function(
+                            ALL_XPATHS_MATCH_JS, arg=list(wait_xpaths), timeout=remaining_ms(), polling=100
+                        )
+                    except PlaywrightTimeoutError:
+                        logger.info(f"Not every XPath matched on URL: {url} within {budget:.1f}s; using the page as is.")
+                elif wait_xpath:
+                    # Wait for the element matching the XPath to be visible
+                    await page.wait_for_selector(f'xpath={wait_xpath}', timeout=remaining_ms())
+                else:
+                    # Wait for the network to be idle
+                    await page.wait_for_load_state('networkidle', timeout=remaining_ms())
+
+            with STAGE_SECONDS.time(stage="content"):
+                content = await page.content()
+            if timeouts is not None:
+                timeouts.record(domain, time.monotonic() - started)
+            return content
+    except RateLimitedError:
+        raise
+    except PlaywrightTimeoutError:
+        if timeouts is not None:
+            timeouts.record(domain, time.monotonic() - started)
+        raise RuntimeError("Timeout while waiting for the element to appear.")
+    except Exception as e:
+        raise RuntimeError(f"Error fetching the page: {e}")
+
+async def get_page(
+    pool: BrowserPool,
+    url: str,
+    wait_xpath: Optional[str] = None,
+    profile: Optional[InterceptionProfile] = None,
+    stats: Optional[InterceptionStats] = None,
+) -> html.HtmlElement:
+    """
+    Renders the page in the browser pool (see `render_content`) and parses it.
+
+    Returns:
+        html.HtmlElement: The parsed HTML tree of the page content.
+    """
+    content = await render_content(pool, url, wait_xpath=wait_xpath, profile=profile, stats=stats)
+    return parse_html(content)
+
+async def fetch_static(
+    client: httpx.AsyncClient,
+    url: str,
+    headers: Optional[Dict[str, str]] = None,
+) -> httpx.Response:
+    """
+    Fetches the page with a plain HTTP GET, without rendering any JavaScript.
+
+    Args:
+        client (httpx.AsyncClient): The shared HTTP client.
+        url (str): The URL of the website to fetch.
+        headers (Optional[Dict[str, str]]): Extra request headers, e.g. conditional ones.
+
+    Returns:
+        httpx.Response: A successful HTML response, or a 304 for a conditional request.
+
+    Raises:
+        RateLimitedError: If the site answers 429 or 503.
+    """
+    try:
+        with STAGE_SECONDS.time(stage="static_fetch"):
+            response = await client.get(url, headers=headers)
+        if response.status_code == 304:
+            return response
+        if response.status_code in RATE_LIMIT_STATUSES:
+            retry_after = parse_retry_after(response.headers.get("retry-after"))
+            raise RateLimitedError(url, response.status_code, retry_after)
+        response.raise_for_status()
+        content_type = response.headers.get("content-type", "")
+        if content_type and "html" not in content_type and "xml" not in content_type:
+            raise ValueError(f"Unexpected content type '{content_type}'.")
+        return response
+    except RateLimitedError:
+        raise
+    except Exception as e:
+        raise RuntimeError(f"Error fetching the page over HTTP: {e}")
+
+async def get_static_page(client: httpx.AsyncClient, url: str) -> html.HtmlElement:
+    """
+    Fetches the page over plain HTTP (see `fetch_static`) and parses it.
+
+    Returns:
+        html.HtmlElement: The parsed HTML tree of the server-rendered page.
+    """
+    response = await fetch_static(client, url)
+    return parse_html(response.text)
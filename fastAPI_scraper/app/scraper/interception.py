@@ -0,0 +1,185 @@
+import re
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, FrozenSet, Pattern, Tuple
+from urllib.parse import urlsplit
+
+from playwright.async_api import Route
+
+# Third-party analytics, advertising and session-recording domains.
+# Subdomains of these are blocked as well.
+TRACKER_DOMAINS = frozenset({
+    "google-analytics.com",
+    "googletagmanager.com",
+    "googleadservices.com",
+    "googlesyndication.com",
+    "doubleclick.net",
+    "adservice.google.com",
+    "connect.facebook.net",
+    "facebook.net",
+    "analytics.twitter.com",
+    "ads-twitter.com",
+    "snap.licdn.com",
+    "bat.bing.com",
+    "clarity.ms",
+    "hotjar.com",
+    "hotjar.io",
+    "segment.io",
+    "segment.com",
+    "mixpanel.com",
+    "amplitude.com",
+    "fullstory.com",
+    "newrelic.com",
+    "nr-data.net",
+    "criteo.com",
+    "taboola.com",
+    "outbrain.com",
+    "scorecardresearch.com",
+    "quantserve.com",
+    "cookielaw.org",
+    "onetrust.com",
+})
+
+# Typical transfer sizes used to estimate the bytes saved by a blocked request.
+# Aborted requests are never downloaded, so their real size is unknown.
+ESTIMATED_RESOURCE_BYTES = {
+    "image": 60_000,
+    "media": 500_000,
+    "font": 40_000,
+    "stylesheet": 30_000,
+    "script": 50_000,
+    "xhr": 5_000,
+    "fetch": 5_000,
+}
+DEFAULT_ESTIMATED_BYTES = 10_000
+
+
+@dataclass(frozen=True)
+class InterceptionProfile:
+    """
+    A named set of rules deciding which subresources are aborted while rendering.
+
+    Requests are blocked by Playwright resource type (e.g. "image", "font"),
+    by URL regular expression, or when their host is one of `block_domains`
+    or a subdomain of it.
+    """
+    name: str
+    resource_types: FrozenSet[str] = frozenset()
+    url_patterns: Tuple[str, ...] = ()
+    block_domains: FrozenSet[str] = frozenset()
+    _compiled: Tuple[Pattern, ...] = field(default=(), init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        object.__setattr__(self, "_compiled", tuple(re.compile(p) for p in self.url_patterns))
+
+    @property
+    def blocks_anything(self) -> bool:
+        return bool(self.resource_types or self.url_patterns or self.block_domains)
+
+    def should_block(self, resource_type: str, url: str) -> bool:
+        if resource_type == "document":
+            # Never block the page (or frame) being navigated to
+            return False
+        if resource_type in self.resource_types:
+            return True
+        if self.block_domains:
+            host = (urlsplit(url).hostname or "").lower()
+            parts = host.split(".")
+            # Check the host and each parent domain ("a.b.example.com" -> "b.example.com" -> ...)
+            if any(".".join(parts[i:]) in self.block_domains for i in range(len(parts) - 1)):
+                return True
+        return any(pattern.search(url) for pattern in self._compiled)
+
+
+INTERCEPTION_PROFILES: Dict[str, InterceptionProfile] = {
+    profile.name: profile
+    for profile in (
+        # Load everything, as a normal browser would.
+        InterceptionProfile(name="none"),
+        # Skip heavy binary resources that never affect the DOM.
+        InterceptionProfile(
+            name="media",
+            resource_types=frozenset({"image", "media", "font"}),
+        ),
+        # Also skip third-party analytics and ads.
+        InterceptionProfile(
+            name="standard",
+            resource_types=frozenset({"image", "media", "font"}),
+            block_domains=TRACKER_DOMAINS,
+        ),
+        # Only keep what is needed to build the DOM.
+        InterceptionProfile(
+            name="strict",
+            resource_types=frozenset({"image", "media", "font", "stylesheet", "texttrack", "manifest", "eventsource", "websocket"}),
+            url_patterns=(r"/ads?[/?._-]", r"[?&](utm_[a-z]+)=", r"/(pixel|beacon|collect)(\.gif|\?|$)"),
+            block_domains=TRACKER_DOMAINS,
+        ),
+    )
+}
+DEFAULT_PROFILE = "standard"
+
+
+def get_profile(name: str) -> InterceptionProfile:
+    """
+    Looks up an interception profile by name.
+
+    Raises:
+        ValueError: If no profile with that name exists.
+    """
+    try:
+        return INTERCEPTION_PROFILES[name]
+    except KeyError:
+        raise ValueError(
+            f"Unknown interception profile '{name}'. Use one of: {', '.join(INTERCEPTION_PROFILES)}."
+        )
+
+
+class InterceptionStats:
+    """
+    Counts the requests seen and blocked by each interception profile.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats: Dict[str, dict] = {}
+
+    def _entry(self, profile: str) -> dict:
+        return self._stats.setdefault(profile, {
+            "requests_seen": 0,
+            "requests_blocked": 0,
+            "estimated_bytes_blocked": 0,
+            "blocked_by_type": {},
+        })
+
+    def record(self, profile: str, resource_type: str, blocked: bool) -> None:
+        with self._lock:
+            entry = self._entry(profile)
+            entry["requests_seen"] += 1
+            if blocked:
+                entry["requests_blocked"] += 1
+                entry["estimated_bytes_blocked"] += ESTIMATED_RESOURCE_BYTES.get(resource_type, DEFAULT_ESTIMATED_BYTES)
+                by_type = entry["blocked_by_type"]
+                by_type[resource_type] = by_type.get(resource_type, 0) + 1
+
+    def snapshot(self) -> Dict[str, dict]:
+        with self._lock:
+            return {
+                profile: dict(entry, blocked_by_type=dict(entry["blocked_by_type"]))
+                for profile, entry in self._stats.items()
+            }
+
+
+def route_handler(profile: InterceptionProfile, stats: InterceptionStats):
+    """
+    Builds a Playwright route handler that aborts requests blocked by the profile.
+    """
+    async def handle(route: Route) -> None:
+        request = route.request
+        blocked = profile.should_block(request.resource_type, request.url)
+        stats.record(profile.name, request.resource_type, blocked)
+        if blocked:
+            await route.abort("blockedbyclient")
+        else:
+            await route.continue_()
+
+    return handle
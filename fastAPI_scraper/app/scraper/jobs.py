@@ -0,0 +1,167 @@
+import asyncio
+import logging
+import time
+import uuid
+from typing import Dict, List, Optional, Sequence
+
+from .engine import ScrapeEngine
+
+logger = logging.getLogger(__name__)
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+
+
+class JobQueueFull(Exception):
+    """
+    Raised when a job is submitted while the job queue is at capacity.
+    """
+
+
+class Job:
+    """
+    A batch of scrape tasks executed in the background.
+
+    Results are appended in completion order, each carrying the index of
+    its task, so clients can page through them while the job is running.
+    """
+
+    def __init__(self, tasks: Sequence):
+        self.id = uuid.uuid4().hex
+        self.tasks = list(tasks)
+        self.status = JOB_QUEUED
+        self.error: Optional[str] = None
+        self.results: List[dict] = []
+        self.succeeded = 0
+        self.failed = 0
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    @property
+    def total(self) -> int:
+        return len(self.tasks)
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (JOB_DONE, JOB_FAILED)
+
+    def add_result(self, index: int, result: dict) -> None:
+        self.results.append({"index": index, **result})
+        if result.get("status") == "success":
+            self.succeeded += 1
+        else:
+            self.failed += 1
+
+    def progress(self) -> dict:
+        completed = len(self.results)
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "total": self.total,
+            "completed": completed,
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "remaining": self.total - completed,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class JobManager:
+    """
+    Runs submitted jobs on a fixed number of in-process workers.
+
+    At most `max_queued` jobs wait for a worker; submitting more raises
+    `JobQueueFull`. Finished jobs are kept for `ttl` seconds so their
+    results can be fetched, then expire.
+    """
+
+    def __init__(
+        self,
+        engine: ScrapeEngine,
+        workers: int = 2,
+        max_queued: int = 100,
+        ttl: float = 3600.0,
+        sweep_interval: float = 60.0,
+    ):
+        self.engine = engine
+        self.workers = workers
+        self.ttl = ttl
+        self.sweep_interval = sweep_interval
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_queued)
+        self._jobs: Dict[str, Job] = {}
+        self._tasks: List[asyncio.Task] = []
+
+    async def start(self) -> None:
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._sweeper()))
+        logger.info(f"Job manager started with {self.workers} worker(s).")
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def submit(self, tasks: Sequence) -> Job:
+        """
+        Queues a new job for the given tasks and returns it immediately.
+
+        Raises:
+            JobQueueFull: If `max_queued` jobs are already waiting.
+        """
+        job = Job(tasks)
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            raise JobQueueFull("Too many queued jobs; try again later.")
+        self._jobs[job.id] = job
+        logger.info(f"Queued job {job.id} with {job.total} task(s).")
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    def stats(self) -> dict:
+        counts: Dict[str, int] = {}
+        for job in self._jobs.values():
+            counts[job.status] = counts.get(job.status, 0) + 1
+        return {"queued": self._queue.qsize(), "workers": self.workers, "jobs": counts}
+
+    async def _worker(self) -> None:
+        while True:
+            job = await self._queue.get()
+            job.status = JOB_RUNNING
+            job.started_at = time.time()
+            try:
+                async for index, result in self.engine.iter_batch(job.tasks):
+                    job.add_result(index, result)
+                job.status = JOB_DONE
+            except Exception as e:
+                logger.error(f"Job {job.id} failed: {e}")
+                job.status = JOB_FAILED
+                job.error = str(e)
+            finally:
+                job.finished_at = time.time()
+                self._queue.task_done()
+            logger.info(f"Job {job.id} {job.status}: {job.succeeded} succeeded, {job.failed} failed.")
+
+    async def _sweeper(self) -> None:
+        while True:
+            await asyncio.sleep(self.sweep_interval)
+            self.expire()
+
+    def expire(self) -> int:
+        """
+        Drops finished jobs older than the TTL and returns how many were removed.
+        """
+        cutoff = time.time() - self.ttl
+        expired = [job_id for job_id, job in self._jobs.items() if job.finished and job.finished_at < cutoff]
+        for job_id in expired:
+            del self._jobs[job_id]
+        return len(expired)
@@ -0,0 +1,284 @@
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+# Latency buckets in seconds, from a fast XPath evaluation to a slow render
+STAGE_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+BATCH_SIZE_BUCKETS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+Labels = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class _Metric(ABC):
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values: Dict[Labels, object] = {}
+
+    def _key(self, labels: Dict[str, str]) -> Labels:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"Metric {self.name} expects labels {self.labelnames}, got {tuple(labels)}.")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    @abstractmethod
+    def snapshot(self) -> Dict[Labels, object]:
+        """
+        Returns a copy of the current values, keyed by label values.
+        """
+
+    def merge(self, into: Dict[Labels, object], other: Dict[Labels, object]) -> None:
+        for key, value in other.items():
+            into[key] = into.get(key, 0) + value
+
+    def samples(self, values: Dict[Labels, object]) -> Iterator[str]:
+        for key, value in sorted(values.items()):
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def snapshot(self) -> Dict[Labels, object]:
+        with self._lock:
+            return dict(self._values)
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, amount: float = 1, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    @contextmanager
+    def track(self, **labels: str) -> Iterator[None]:
+        """
+        Counts the block as in progress while it runs.
+        """
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = STAGE_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                # Per-bucket (non-cumulative) counts, then sum and count
+                entry = self._values[key] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[i] += 1
+                    break
+            entry[-2] += value
+            entry[-1] += 1
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        """
+        Observes the wall-clock duration of the block, also when it raises.
+        """
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def snapshot(self) -> Dict[Labels, object]:
+        with self._lock:
+            return {key: list(entry) for key, entry in self._values.items()}
+
+    def merge(self, into: Dict[Labels, object], other: Dict[Labels, object]) -> None:
+        for key, entry in other.items():
+            if key in into:
+                into[key] = [a + b for a, b in zip(into[key], entry)]
+            else:
+                into[key] = list(entry)
+
+    def samples(self, values: Dict[Labels, object]) -> Iterator[str]:
+        for key, entry in sorted(values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, entry):
+                cumulative += count
+                le = 'le="' + _format_value(bound) + '"'
+                yield f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(entry[-2])}"
+            yield f"{self.name}_count{_format_labels(self.labelnames, key)} {entry[-1]}"
+
+
+class Registry:
+    """
+    A set of metrics rendered together in the Prometheus text exposition format.
+
+    Most metrics are updated as things happen. Metrics added with `collect`
+    are read from elsewhere (e.g. `functools.lru_cache` statistics) whenever
+    a snapshot is taken, and metrics added with `derive` are computed from
+    the other values at render time, such as hit ratios from hit and miss
+    counters. Snapshots taken in worker processes can be merged in when
+    rendering; their values are added up.
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: Dict[str, Callable[[], Iterable[Tuple[Dict[str, str], float]]]] = {}
+        self._derived: List[Tuple[_Metric, Callable[[Dict[str, Dict[Labels, object]]], Iterable[Tuple[Dict[str, str], float]]]]] = []
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            if metric.name in self._metrics or any(m.name == metric.name for m, _ in self._derived):
+                raise ValueError(f"Metric {metric.name} is already registered.")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = STAGE_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def collect(self, metric: _Metric, collector: Callable[[], Iterable[Tuple[Dict[str, str], float]]]) -> _Metric:
+        """
+        Registers a metric whose `(labels, value)` pairs are read from `collector` on every snapshot.
+        """
+        self.register(metric)
+        self._collectors[metric.name] = collector
+        return metric
+
+    def derive(self, metric: _Metric, compute: Callable[[Dict[str, Dict[Labels, object]]], Iterable[Tuple[Dict[str, str], float]]]) -> _Metric:
+        """
+        Adds a metric computed at render time from the merged values of the
+        registered metrics, keyed by metric name.
+        """
+        with self._lock:
+            self._derived.append((metric, compute))
+        return metric
+
+    def snapshot(self) -> Dict[str, Dict[Labels, object]]:
+        """
+        Returns the current values of all registered metrics in a picklable form.
+        """
+        values = {}
+        for name, metric in self._metrics.items():
+            collector = self._collectors.get(name)
+            if collector is None:
+                values[name] = metric.snapshot()
+            else:
+                values[name] = {metric._key(labels): value for labels, value in collector()}
+        return values
+
+    def render(self, merge: Optional[Iterable[Dict[str, Dict[Labels, object]]]] = None) -> str:
+        values = self.snapshot()
+        for other in merge or ():
+            for name, metric_values in other.items():
+                metric = self._metrics.get(name)
+                if metric is not None:
+                    metric.merge(values.setdefault(name, {}), metric_values)
+
+        metrics = list(self._metrics.values())
+        for metric, compute in self._derived:
+            metrics.append(metric)
+            values[metric.name] = {metric._key(labels): value for labels, value in compute(values)}
+
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples(values.get(metric.name, {})))
+        return "\n".join(lines) + "\n"
+
+
+def hit_ratios(counters: Dict[str, str]) -> Callable[[Dict[str, Dict[Labels, object]]], Iterator[Tuple[Dict[str, str], float]]]:
+    """
+    Builds a `Registry.derive` function reporting hits / (hits + misses)
+    per cache, from counters labelled with `result` "hit" or "miss".
+
+    Args:
+        counters (Dict[str, str]): Counter name per cache name.
+    """
+    def compute(values: Dict[str, Dict[Labels, object]]) -> Iterator[Tuple[Dict[str, str], float]]:
+        for cache, name in counters.items():
+            counts = values.get(name, {})
+            hits, misses = counts.get(("hit",), 0), counts.get(("miss",), 0)
+            if hits + misses:
+                yield {"cache": cache}, round(hits / (hits + misses), 4)
+    return compute
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    "scraper_stage_seconds",
+    "Time spent per scraping stage: launch, checkout, goto, wait, content, static_fetch, parse, xpath, serialize.",
+    ("stage",),
+)
+RESULTS = REGISTRY.counter(
+    "scraper_results_total",
+    "Scrape results by domain, status and fetch tier.",
+    ("domain", "status", "tier"),
+)
+BATCH_SIZE = REGISTRY.histogram(
+    "scraper_batch_size",
+    "Number of tasks per batch or job.",
+    buckets=BATCH_SIZE_BUCKETS,
+)
+IN_FLIGHT = REGISTRY.gauge(
+    "scraper_in_flight_pages",
+    "Pages being fetched or rendered right now.",
+)
+PAGE_CACHE_LOOKUPS = REGISTRY.counter(
+    "scraper_page_cache_lookups_total",
+    "Page cache lookups by result (hit or miss).",
+    ("result",),
+)
+CACHE_HIT_RATIO = REGISTRY.derive(
+    Gauge("scraper_cache_hit_ratio", "Share of cache lookups that were hits, since startup.", ("cache",)),
+    hit_ratios({"page": "scraper_page_cache_lookups_total", "xpath": "scraper_xpath_cache_lookups_total"}),
+)
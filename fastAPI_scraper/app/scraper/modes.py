@@ -0,0 +1,38 @@
+import time
+from typing import Dict, Optional, Tuple
+
+TIER_STATIC = "static"
+TIER_BROWSER = "browser"
+
+
+class RenderModeRegistry:
+    """
+    Remembers per domain which fetch tier last produced results.
+
+    Domains that needed the browser skip the static HTTP attempt on later
+    requests. The learned mode expires after `relearn_after` seconds so a
+    site that switches to server-side rendering is picked up again.
+    """
+
+    def __init__(self, relearn_after: float = 3600.0):
+        self.relearn_after = relearn_after
+        self._modes: Dict[str, Tuple[str, float]] = {}
+
+    def preferred(self, domain: str) -> Optional[str]:
+        """
+        Returns the tier learned for the domain, or None if nothing is known.
+        """
+        entry = self._modes.get(domain)
+        if entry is None:
+            return None
+        tier, learned_at = entry
+        if time.monotonic() - learned_at > self.relearn_after:
+            del self._modes[domain]
+            return None
+        return tier
+
+    def record(self, domain: str, tier: str) -> None:
+        self._modes[domain] = (tier, time.monotonic())
+
+    def snapshot(self) -> Dict[str, str]:
+        return {domain: tier for domain, (tier, _) in self._modes.items()}
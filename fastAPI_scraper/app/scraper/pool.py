@@ -0,0 +1,227 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import AsyncIterator, List, Optional
+
+from playwright.async_api import async_playwright, Browser, BrowserContext, Page, Playwright
+
+from .metrics import STAGE_SECONDS
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _Slot:
+    """
+    A single checkout unit of the pool: one browser context on one browser.
+    """
+    browser_index: int
+    browser: Optional[Browser] = None
+    context: Optional[BrowserContext] = None
+    uses: int = 0
+
+
+class BrowserPool:
+    """
+    Long-lived pool of headless Chromium browsers and their contexts.
+
+    The pool launches `size` browsers once and keeps `contexts_per_browser`
+    contexts open on each of them. Callers borrow a fresh page through
+    `page()`, which checks a context out of the pool and checks it back in
+    when the block exits, so no request pays for a browser launch.
+    """
+
+    def __init__(
+        self,
+        size: int = 2,
+        contexts_per_browser: int = 2,
+        max_context_uses: int = 50,
+        checkout_timeout: float = 30.0,
+        headless: bool = True,
+    ):
+        if size < 1 or contexts_per_browser < 1:
+            raise ValueError("Pool size and contexts_per_browser must be at least 1.")
+        self.size = size
+        self.contexts_per_browser = contexts_per_browser
+        self.max_context_uses = max_context_uses
+        self.checkout_timeout = checkout_timeout
+        self.headless = headless
+
+        self._playwright: Optional[Playwright] = None
+        self._browsers: List[Optional[Browser]] = []
+        self._browser_locks: List[asyncio.Lock] = []
+        self._available: Optional[asyncio.Queue] = None
+        self._slots: List[_Slot] = []
+        self._restarts = 0
+        self._started = False
+
+    @property
+    def capacity(self) -> int:
+        return self.size * self.contexts_per_browser
+
+    async def start(self) -> None:
+        """
+        Starts Playwright and launches every browser in the pool.
+        """
+        if self._started:
+            return
+        self._playwright = await async_playwright().start()
+        self._available = asyncio.Queue()
+        self._browsers = [None] * self.size
+        self._browser_locks = [asyncio.Lock() for _ in range(self.size)]
+
+        for index in range(self.size):
+            self._browsers[index] = await self._launch()
+            for _ in range(self.contexts_per_browser):
+                slot = _Slot(browser_index=index)
+                self._slots.append(slot)
+                self._available.put_nowait(slot)
+
+        self._started = True
+        logger.info(f"Browser pool started with {self.size} browser(s) and {self.capacity} context(s).")
+
+    async def stop(self) -> None:
+        """
+        Closes every context and browser and stops Playwright.
+        """
+        if not self._started:
+            return
+        self._started = False
+
+        for slot in self._slots:
+            await self._close_context(slot)
+        for browser in self._browsers:
+            if browser is not None:
+                try:
+                    await browser.close()
+                except Exception as e:
+                    logger.warning(f"Error closing browser: {e}")
+        self._slots = []
+        self._browsers = []
+
+        if self._playwright is not None:
+            await self._playwright.stop()
+            self._playwright = None
+        logger.info("Browser pool stopped.")
+
+    @asynccontextmanager
+    async def page(self) -> AsyncIterator[Page]:
+        """
+        Borrows a new page from the pool for the duration of the block.
+
+        The page is closed and its context returned to the pool afterwards.
+        If the page cannot be closed or the browser died while it was in use,
+        the context is discarded and recreated on the next checkout.
+        """
+        slot = await self.checkout()
+        healthy = True
+        page = None
+        try:
+            page = await slot.context.new_page()
+            yield page
+        except BaseException:
+            healthy = slot.browser is not None and slot.browser.is_connected()
+            raise
+        finally:
+            if page is not None:
+                try:
+                    await page.close()
+                except Exception:
+                    healthy = False
+            await self.checkin(slot, healthy=healthy)
+
+    async def checkout(self) -> _Slot:
+        """
+        Takes a context out of the pool, waiting up to `checkout_timeout` seconds.
+        """
+        if not self._started:
+            raise RuntimeError("Browser pool is not started.")
+        try:
+            slot = await asyncio.wait_for(self._available.get(), timeout=self.checkout_timeout)
+        except asyncio.TimeoutError:
+            raise RuntimeError("Timed out waiting for a browser from the pool.")
+
+        try:
+            await self._ensure_ready(slot)
+        except Exception:
+            self._available.put_nowait(slot)
+            raise
+        slot.uses += 1
+        return slot
+
+    async def checkin(self, slot: _Slot, healthy: bool = True) -> None:
+        """
+        Returns a context to the pool, recycling it if it is worn out or unhealthy.
+        """
+        if not healthy or slot.uses >= self.max_context_uses:
+            await self._close_context(slot)
+        self._available.put_nowait(slot)
+
+    async def health_check(self) -> dict:
+        """
+        Relaunches disconnected browsers and reports the state of the pool.
+        """
+        browsers = []
+        for index in range(len(self._browsers)):
+            browser = self._browsers[index]
+            connected = browser is not None and browser.is_connected()
+            if self._started and not connected:
+                logger.warning(f"Browser {index} is disconnected; relaunching.")
+                try:
+                    await self._restart_browser(index, browser)
+                    connected = True
+                except Exception as e:
+                    logger.error(f"Failed to relaunch browser {index}: {e}")
+            browsers.append({"index": index, "connected": connected})
+
+        return {
+            "started": self._started,
+            "size": self.size,
+            "capacity": self.capacity,
+            "available": self._available.qsize() if self._available else 0,
+            "restarts": self._restarts,
+            "browsers": browsers,
+        }
+
+    async def _ensure_ready(self, slot: _Slot) -> None:
+        browser = self._browsers[slot.browser_index]
+        if browser is None or not browser.is_connected():
+            browser = await self._restart_browser(slot.browser_index, browser)
+
+        if slot.context is not None and slot.browser is not browser:
+            # The browser was relaunched after this context was created.
+            slot.context = None
+        if slot.context is None:
+            slot.context = await browser.new_context()
+            slot.browser = browser
+            slot.uses = 0
+
+    async def _restart_browser(self, index: int, dead: Optional[Browser]) -> Browser:
+        async with self._browser_locks[index]:
+            current = self._browsers[index]
+            if current is not dead and current is not None and current.is_connected():
+                # Another coroutine already relaunched it.
+                return current
+            if current is not None:
+                try:
+                    await current.close()
+                except Exception:
+                    pass
+            self._browsers[index] = await self._launch()
+            self._restarts += 1
+            return self._browsers[index]
+
+    async def _launch(self) -> Browser:
+        with STAGE_SECONDS.time(stage="launch"):
+            return await self._playwright.chromium.launch(headless=self.headless)
+
+    async def _close_context(self, slot: _Slot) -> None:
+        if slot.context is not None:
+            try:
+                await slot.context.close()
+            except Exception as e:
+                logger.debug(f"Error closing browser context: {e}")
+        slot.context = None
+        slot.browser = None
+        slot.uses = 0
@@ -0,0 +1,326 @@
+import asyncio
+import itertools
+import logging
+import multiprocessing
+import threading
+from dataclasses import dataclass, field
+from multiprocessing.connection import Connection
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional, Sequence
+
+import httpx
+from scraper_common.timeouts import TimeoutLearner
+
+from .pool import BrowserPool
+from .cache import PageCache
+from .snapshots import SnapshotStore
+from .modes import RenderModeRegistry
+from .scheduler import HostPolicy, HostScheduler, RateLimitedError
+from .breaker import PageLoadError
+from .metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+# Task attributes sent to the worker processes
+TASK_FIELDS = ("id", "url", "xpath", "data_type", "profile", "max_age", "no_cache")
+
+
+class WorkerCrashed(RuntimeError):
+    """
+    Raised for requests that were running on a worker process when it died.
+    """
+
+
+def _task_payload(task) -> dict:
+    return {name: getattr(task, name, None) for name in TASK_FIELDS}
+
+
+def _worker_main(conn: Connection, options: dict) -> None:
+    """
+    Entry point of a worker process: serves requests from the parent until it says stop.
+    """
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(processName)s - %(message)s")
+    asyncio.run(_serve(conn, options))
+
+
+async def _serve(conn: Connection, options: dict) -> None:
+    # Imported here because the engine itself imports this module
+    from .engine import ScrapeEngine
+
+    pool = BrowserPool(**options["pool"])
+    await pool.start()
+    http_client = httpx.AsyncClient(**options["http"]) if options.get("http") is not None else None
+    engine = ScrapeEngine(
+        pool,
+        http_client=http_client,
+        modes=RenderModeRegistry(**options.get("modes", {})),
+        timeouts=TimeoutLearner(**options.get("timeouts", {})),
+        cache=PageCache(**options["cache"]) if options.get("cache") is not None else None,
+        snapshots=SnapshotStore(**options["snapshots"]) if options.get("snapshots") is not None else None,
+        # Politeness and retries are handled by the parent, which sees every host's traffic
+        scheduler=HostScheduler(HostPolicy(max_concurrency=pool.capacity, min_interval=0)),
+        max_retries=0,
+        **options.get("engine", {}),
+    )
+
+    loop = asyncio.get_running_loop()
+    requests: asyncio.Queue = asyncio.Queue()
+
+    def receive() -> None:
+        # Connection.recv blocks, so it runs on its own thread
+        while True:
+            try:
+                message = conn.recv()
+            except (EOFError, OSError):
+                message = None
+            loop.call_soon_threadsafe(requests.put_nowait, message)
+            if message is None:
+                return
+
+    async def handle(request_id: int, method: str, payload: Any) -> None:
+        try:
+            if method == "run_group":
+                reply = (request_id, await engine.run_group([SimpleNamespace(**t) for t in payload]), None)
+            elif method == "stats":
+                reply = (request_id, {
+                    "interception": engine.interception_stats.snapshot(),
+                    "render_modes": engine.modes.snapshot(),
+                    "render_timeouts": engine.timeouts.snapshot(),
+                    "cache": engine.cache.stats() if engine.cache is not None else None,
+                }, None)
+            elif method == "metrics":
+                reply = (request_id, REGISTRY.snapshot(), None)
+            else:
+                reply = (request_id, None, RuntimeError(f"Unknown worker method '{method}'."))
+        except (RateLimitedError, PageLoadError) as e:
+            reply = (request_id, None, e)
+        except Exception as e:
+            # Not every exception can be pickled; the message is all the parent needs
+            reply = (request_id, None, RuntimeError(str(e)))
+        conn.send(reply)
+
+    threading.Thread(target=receive, daemon=True).start()
+    running = set()
+    try:
+        while True:
+            message = await requests.get()
+            if message is None:
+                break
+            task = asyncio.create_task(handle(*message))
+            running.add(task)
+            task.add_done_callback(running.discard)
+    finally:
+        for task in running:
+            task.cancel()
+        await asyncio.gather(*running, return_exceptions=True)
+        if http_client is not None:
+            await http_client.aclose()
+        await pool.stop()
+
+
+@dataclass
+class _Worker:
+    index: int
+    process: multiprocessing.Process
+    conn: Connection
+    pending: Dict[int, asyncio.Future] = field(default_factory=dict)
+    alive: bool = True
+
+
+class ProcessWorkerPool:
+    """
+    Runs page groups in separate worker processes, each with its own browser.
+
+    Every worker process runs its own event loop, `BrowserPool` and
+    `ScrapeEngine`, so rendering, parsing and extraction spread over
+    `workers` CPU cores instead of sharing one. The parent sends each
+    group of tasks for a page to the least busy worker and awaits the
+    results; politeness, retries and the global in-flight limit stay in
+    the parent's engine. A worker that dies is replaced, and the groups it
+    was running are retried once on another worker.
+
+    It stands in for a `BrowserPool`: pass it to `ScrapeEngine` and the
+    engine hands its groups to the workers instead of rendering in process.
+    """
+
+    def __init__(
+        self,
+        workers: int = 2,
+        pool_options: Optional[dict] = None,
+        engine_options: Optional[dict] = None,
+        modes_options: Optional[dict] = None,
+        timeouts_options: Optional[dict] = None,
+        http_options: Optional[dict] = None,
+        cache_options: Optional[dict] = None,
+        snapshot_options: Optional[dict] = None,
+    ):
+        if workers < 1:
+            raise ValueError("workers must be at least 1.")
+        self.workers = workers
+        self.options = {
+            "pool": dict(pool_options or {}, size=1),
+            "engine": engine_options or {},
+            "modes": modes_options or {},
+            "timeouts": timeouts_options or {},
+            "http": http_options,
+            "cache": cache_options,
+            "snapshots": snapshot_options,
+        }
+        # Playwright does not survive fork(); always start clean interpreters
+        self._context = multiprocessing.get_context("spawn")
+        self._workers: List[_Worker] = []
+        self._request_ids = itertools.count()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._restarts = 0
+        self._stopping = False
+
+    @property
+    def capacity(self) -> int:
+        return self.workers * self.options["pool"].get("contexts_per_browser", 2)
+
+    async def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._stopping = False
+        self._workers = [self._spawn(i) for i in range(self.workers)]
+        logger.info(f"Started {self.workers} scraper worker process(es).")
+
+    async def stop(self) -> None:
+        self._stopping = True
+        for worker in self._workers:
+            if worker.alive:
+                try:
+                    worker.conn.send(None)
+                except OSError:
+                    pass
+        for worker in self._workers:
+            await asyncio.to_thread(worker.process.join, 10)
+            if worker.process.is_alive():
+                worker.process.terminate()
+            worker.conn.close()
+        self._workers = []
+
+    async def run_group(self, tasks: Sequence) -> List[dict]:
+        """
+        Runs `ScrapeEngine.run_group` for the tasks in a worker process.
+
+        Raises:
+            RateLimitedError: If the host answers 429 or 503.
+            PageLoadError: If the page could not be loaded.
+            WorkerCrashed: If the worker died, twice in a row.
+        """
+        payload = [_task_payload(task) for task in tasks]
+        try:
+            return await self._call("run_group", payload)
+        except WorkerCrashed as e:
+            logger.warning(f"Retrying URL: {tasks[0].url} on another worker. {e}")
+            return await self._call("run_group", payload)
+
+    async def worker_stats(self) -> List[dict]:
+        """
+        Collects the interception, render mode and cache counters of every live worker.
+        """
+        alive = [worker for worker in self._workers if worker.alive]
+        results = await asyncio.gather(*(self._call("stats", None, worker) for worker in alive), return_exceptions=True)
+        return [
+            {"worker": worker.index, **(result if isinstance(result, dict) else {"error": str(result)})}
+            for worker, result in zip(alive, results)
+        ]
+
+    async def worker_metrics(self) -> List[dict]:
+        """
+        Collects the metric snapshots of every live worker, for `Registry.render` to merge.
+        Workers that do not answer are left out.
+        """
+        alive = [worker for worker in self._workers if worker.alive]
+        results = await asyncio.gather(*(self._call("metrics", None, worker) for worker in alive), return_exceptions=True)
+        return [result for result in results if isinstance(result, dict)]
+
+    async def health_check(self) -> dict:
+        """
+        Replaces any worker process that exited without being noticed and reports the state of all of them.
+        """
+        for worker in list(self._workers):
+            if worker.alive and not worker.process.is_alive():
+                self._on_exit(worker)
+        return {
+            "mode": "process",
+            "workers": self.workers,
+            "capacity": self.capacity,
+            "restarts": self._restarts,
+            "processes": [
+                {"worker": w.index, "pid": w.process.pid, "alive": w.alive, "pending": len(w.pending)}
+                for w in self._workers
+            ],
+        }
+
+    async def _call(self, method: str, payload: Any, worker: Optional[_Worker] = None) -> Any:
+        if worker is None:
+            alive = [w for w in self._workers if w.alive]
+            if not alive:
+                raise RuntimeError("No scraper worker processes are running.")
+            worker = min(alive, key=lambda w: len(w.pending))
+        request_id = next(self._request_ids)
+        future = self._loop.create_future()
+        worker.pending[request_id] = future
+        try:
+            worker.conn.send((request_id, method, payload))
+        except OSError:
+            self._on_exit(worker)
+        return await future
+
+    def _spawn(self, index: int) -> _Worker:
+        parent_conn, child_conn = self._context.Pipe()
+        process = self._context.Process(
+            target=_worker_main,
+            args=(child_conn, self.options),
+            name=f"scraper-worker-{index}",
+            daemon=True,
+        )
+        process.start()
+        child_conn.close()
+        worker = _Worker(index=index, process=process, conn=parent_conn)
+        threading.Thread(target=self._receive, args=(worker,), daemon=True).start()
+        return worker
+
+    def _receive(self, worker: _Worker) -> None:
+        # One thread per worker; replies are handed to the event loop
+        while True:
+            try:
+                reply = worker.conn.recv()
+            except (EOFError, OSError):
+                reply = None
+            try:
+                if reply is None:
+                    self._loop.call_soon_threadsafe(self._on_exit, worker)
+                    return
+                self._loop.call_soon_threadsafe(self._resolve, worker, reply)
+            except RuntimeError:
+                # The event loop has been closed during shutdown
+                return
+
+    def _resolve(self, worker: _Worker, reply: tuple) -> None:
+        request_id, result, error = reply
+        future = worker.pending.pop(request_id, None)
+        if future is None or future.done():
+            return
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def _on_exit(self, worker: _Worker) -> None:
+        if not worker.alive:
+            return
+        worker.alive = False
+        for future in worker.pending.values():
+            if not future.done():
+                future.set_exception(WorkerCrashed(f"Worker process {worker.index} exited."))
+        worker.pending.clear()
+        if worker.process.is_alive():
+            worker.process.terminate()
+        worker.conn.close()
+        if self._stopping:
+            return
+        logger.error(f"Worker process {worker.index} (pid {worker.process.pid}) died; starting a new one.")
+        self._restarts += 1
+        self._workers[self._workers.index(worker)] = self._spawn(worker.index)
@@ -0,0 +1,165 @@
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import AsyncIterator, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMIT_STATUSES = (429, 503)
+
+
+class RateLimitedError(RuntimeError):
+    """
+    Raised when a host answers 429 or 503, asking us to come back later.
+    """
+
+    def __init__(self, url: str, status: int, retry_after: float):
+        super().__init__(f"Rate limited by {url} (HTTP {status}); retry after {retry_after:.0f}s.")
+        self.url = url
+        self.status = status
+        self.retry_after = retry_after
+
+    def __reduce__(self):
+        # Lets the error cross process boundaries (see ProcessWorkerPool)
+        return type(self), (self.url, self.status, self.retry_after)
+
+
+def parse_retry_after(value: Optional[str], default: float = 5.0) -> float:
+    """
+    Parses a Retry-After header, given either as seconds or as an HTTP date.
+
+    Args:
+        value (Optional[str]): The header value, if the response had one.
+        default (float): Seconds to use when the header is missing or invalid.
+
+    Returns:
+        float: The number of seconds to wait, never negative.
+    """
+    if not value:
+        return default
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return default
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+@dataclass(frozen=True)
+class HostPolicy:
+    """
+    Politeness limits for one host.
+
+    `max_concurrency` pages of the host are scraped at the same time at
+    most, and consecutive requests to it start at least `min_interval`
+    seconds apart.
+    """
+    max_concurrency: int = 2
+    min_interval: float = 0.5
+
+
+class _HostState:
+    def __init__(self, policy: HostPolicy):
+        self.policy = policy
+        self.semaphore = asyncio.Semaphore(policy.max_concurrency)
+        self.next_start = 0.0
+        self.blocked_until = 0.0
+        self.requests = 0
+        self.deferrals = 0
+
+
+class HostScheduler:
+    """
+    Enforces per-host concurrency, request spacing and Retry-After back-off.
+
+    Limits come from `default_policy`, with `overrides` keyed by domain;
+    an override for "example.com" also applies to its subdomains. State is
+    shared by every batch and job running on the engine, so concurrent
+    requests cannot add up to more load on a site than its policy allows.
+    """
+
+    def __init__(
+        self,
+        default_policy: HostPolicy = HostPolicy(),
+        overrides: Optional[Dict[str, HostPolicy]] = None,
+        max_retry_after: float = 120.0,
+    ):
+        self.default_policy = default_policy
+        self.overrides = {domain.lower(): policy for domain, policy in (overrides or {}).items()}
+        self.max_retry_after = max_retry_after
+        self._hosts: Dict[str, _HostState] = {}
+
+    def policy(self, host: str) -> HostPolicy:
+        parts = host.lower().split(".")
+        for i in range(len(parts)):
+            policy = self.overrides.get(".".join(parts[i:]))
+            if policy is not None:
+                return policy
+        return self.default_policy
+
+    def _state(self, host: str) -> _HostState:
+        state = self._hosts.get(host)
+        if state is None:
+            state = self._hosts[host] = _HostState(self.policy(host))
+        return state
+
+    @asynccontextmanager
+    async def slot(self, host: str) -> AsyncIterator[None]:
+        """
+        Holds one of the host's concurrency slots for the duration of the block.
+        """
+        async with self._state(host).semaphore:
+            yield
+
+    async def wait_deferral(self, host: str) -> None:
+        """
+        Sleeps until a Retry-After deferral of the host has passed.
+        """
+        delay = self._state(host).blocked_until - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    async def wait_turn(self, host: str) -> None:
+        """
+        Waits until the host may receive its next request and reserves that turn.
+        Call this right before every request that goes over the network.
+        """
+        state = self._state(host)
+        while True:
+            now = time.monotonic()
+            delay = max(state.next_start, state.blocked_until) - now
+            if delay <= 0:
+                break
+            await asyncio.sleep(delay)
+        state.next_start = now + state.policy.min_interval
+        state.requests += 1
+
+    def defer(self, host: str, seconds: float) -> None:
+        """
+        Holds back all requests to the host for `seconds` (from a Retry-After header).
+        """
+        state = self._state(host)
+        state.blocked_until = max(state.blocked_until, time.monotonic() + seconds)
+        state.deferrals += 1
+        logger.warning(f"Deferring requests to {host} for {seconds:.0f}s.")
+
+    def snapshot(self) -> Dict[str, dict]:
+        now = time.monotonic()
+        return {
+            host: {
+                "max_concurrency": state.policy.max_concurrency,
+                "min_interval": state.policy.min_interval,
+                "requests": state.requests,
+                "deferrals": state.deferrals,
+                "blocked_for": round(max(0.0, state.blocked_until - now), 1),
+            }
+            for host, state in self._hosts.items()
+        }
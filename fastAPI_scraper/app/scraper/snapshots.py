@@ -0,0 +1,157 @@
+import asyncio
+import gzip
+import hashlib
+import logging
+import os
+import re
+import threading
+from pathlib import Path
+from typing import Optional
+
+try:
+    import zstandard
+except ImportError:  # optional; snapshots fall back to gzip
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+COMPRESSIONS = ("auto", "zstd", "gzip")
+_DIGEST_RE = re.compile(r"^[0-9a-f]{64}$")
+_SUFFIXES = {"zstd": ".html.zst", "gzip": ".html.gz"}
+
+
+class SnapshotStore:
+    """
+    Content-addressed archive of the page HTML that results were extracted from.
+
+    Snapshots are named by the SHA-256 of their content, so a page that did
+    not change between scrapes is stored once. They are compressed with
+    zstd when the `zstandard` package is installed, otherwise with gzip,
+    and both formats can be read back. Once the store exceeds `max_bytes`,
+    the least recently stored or reused snapshots are deleted.
+    """
+
+    def __init__(self, root: str, max_bytes: int = 1024 * 1024 * 1024, compression: str = "auto"):
+        if compression not in COMPRESSIONS:
+            raise ValueError(f"Unknown snapshot compression '{compression}'. Use one of: {', '.join(COMPRESSIONS)}.")
+        if compression == "zstd" and zstandard is None:
+            raise ValueError("Snapshot compression 'zstd' requires the zstandard package.")
+        if compression == "auto":
+            compression = "zstd" if zstandard is not None else "gzip"
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.compression = compression
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._bytes = sum(p.stat().st_size for p in self._files())
+        self._stats = {"stored": 0, "deduplicated": 0, "deleted": 0}
+
+    @staticmethod
+    def digest(content: str) -> str:
+        return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+    async def put(self, content: str) -> str:
+        """
+        Archives page content and returns its snapshot hash.
+        """
+        return await asyncio.to_thread(self.put_sync, content)
+
+    async def get(self, digest: str) -> Optional[str]:
+        """
+        Returns the content of a snapshot, or None if it is unknown or was deleted.
+        """
+        return await asyncio.to_thread(self.get_sync, digest)
+
+    def put_sync(self, content: str) -> str:
+        digest = self.digest(content)
+        existing = self._find(digest)
+        if existing is not None:
+            # Refresh the mtime so retention keeps snapshots that are still in use
+            try:
+                os.utime(existing)
+                self._count("deduplicated")
+                return digest
+            except FileNotFoundError:
+                pass
+
+        path = self.root / digest[:2] / f"{digest}{_SUFFIXES[self.compression]}"
+        data = content.encode("utf-8")
+        if self.compression == "zstd":
+            data = zstandard.ZstdCompressor(level=10).compress(data)
+        else:
+            data = gzip.compress(data, compresslevel=6)
+        try:
+            path.parent.mkdir(exist_ok=True)
+            tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+            with open(tmp, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except OSError as e:
+            logger.warning(f"Could not write snapshot {path}: {e}")
+            return digest
+        with self._lock:
+            self._stats["stored"] += 1
+            self._bytes += len(data)
+            over_budget = self._bytes > self.max_bytes
+        if over_budget:
+            self.collect_garbage()
+        return digest
+
+    def get_sync(self, digest: str) -> Optional[str]:
+        if not _DIGEST_RE.match(digest):
+            return None
+        path = self._find(digest)
+        if path is None:
+            return None
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return None
+        if path.name.endswith(_SUFFIXES["zstd"]):
+            if zstandard is None:
+                raise RuntimeError("Snapshot is zstd-compressed but the zstandard package is not installed.")
+            data = zstandard.ZstdDecompressor().decompress(data)
+        else:
+            data = gzip.decompress(data)
+        return data.decode("utf-8")
+
+    def collect_garbage(self) -> int:
+        """
+        Deletes the least recently used snapshots until the store is within
+        90% of `max_bytes`, and returns how many were deleted.
+        """
+        files = [(p.stat(), p) for p in self._files()]
+        total = sum(st.st_size for st, _ in files)
+        target = self.max_bytes * 0.9
+        deleted = 0
+        for st, path in sorted(files, key=lambda item: item[0].st_mtime):
+            if total <= target:
+                break
+            path.unlink(missing_ok=True)
+            total -= st.st_size
+            deleted += 1
+        with self._lock:
+            self._bytes = total
+            self._stats["deleted"] += deleted
+        if deleted:
+            logger.info(f"Deleted {deleted} old snapshot(s) to stay within {self.max_bytes} bytes.")
+        return deleted
+
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(self._stats, bytes=self._bytes, max_bytes=self.max_bytes, compression=self.compression)
+
+    def _files(self):
+        return (p for p in self.root.glob("*/*") if not p.name.endswith(".tmp"))
+
+    def _find(self, digest: str) -> Optional[Path]:
+        for suffix in _SUFFIXES.values():
+            path = self.root / digest[:2] / f"{digest}{suffix}"
+            if path.exists():
+                return path
+        return None
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._stats[name] += 1
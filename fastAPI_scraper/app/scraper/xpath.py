@@ -0,0 +1,62 @@
+from functools import lru_cache
+from lxml import etree
+
+from .metrics import REGISTRY, Counter
+
+XPATH_CACHE_SIZE = 4096
+
+
+class InvalidXPathError(ValueError):
+    """
+    Raised when an XPath expression cannot be compiled.
+    """
+
+
+@lru_cache(maxsize=XPATH_CACHE_SIZE)
+def _compile(expression: str) -> etree.XPath:
+    return etree.XPath(expression)
+
+
+def compile_xpath(expression: str) -> etree.XPath:
+    """
+    Returns the compiled form of an XPath expression, reusing earlier compilations.
+
+    Args:
+        expression (str): The XPath expression.
+
+    Returns:
+        etree.XPath: The compiled expression, callable with an element or tree.
+
+    Raises:
+        InvalidXPathError: If the expression is not valid XPath.
+    """
+    try:
+        return _compile(expression)
+    except etree.XPathSyntaxError as e:
+        raise InvalidXPathError(f"Invalid XPath expression '{expression}': {e}")
+
+
+def xpath_cache_info() -> dict:
+    """
+    Reports hit/miss statistics of the compiled XPath cache.
+    """
+    info = _compile.cache_info()
+    lookups = info.hits + info.misses
+    return {
+        "hits": info.hits,
+        "misses": info.misses,
+        "size": info.currsize,
+        "maxsize": info.maxsize,
+        "hit_ratio": round(info.hits / lookups, 4) if lookups else None,
+    }
+
+
+def _cache_lookups():
+    info = _compile.cache_info()
+    return [({"result": "hit"}, info.hits), ({"result": "miss"}, info.misses)]
+
+
+XPATH_CACHE_LOOKUPS = REGISTRY.collect(
+    Counter("scraper_xpath_cache_lookups_total", "Compiled XPath cache lookups by result (hit or miss).", ("result",)),
+    _cache_lookups,
+)
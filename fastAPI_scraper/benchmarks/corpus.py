@@ -0,0 +1,136 @@
+import threading
+from dataclasses import dataclass
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Tuple
+from urllib.parse import urlsplit
+
+
+@dataclass(frozen=True)
+class Fixture:
+    """
+    A benchmark page and the XPaths scraped from it.
+    """
+    name: str
+    description: str
+    txt_xpath: str
+    html_xpath: str
+
+
+FIXTURES: Dict[str, Fixture] = {
+    fixture.name: fixture
+    for fixture in (
+        Fixture("small", "a 1 KB article", "//h1[@id='title']", "//ul[@id='facts']"),
+        Fixture("huge", "a 5 MB table of 20,000 rows, target in the last row", "//tr[@id='row-19999']/td[2]", "//tr[@id='row-19999']"),
+        Fixture("js_heavy", "content built by 400 KB of inline script after a delay", "//h1[@id='title']", "//div[@id='app']/ul"),
+        Fixture("nested", "200 levels of nested divs, 50 branches wide", "//span[@class='leaf' and @data-branch='49']", "//div[@data-depth='195'][@data-branch='7']"),
+    )
+}
+
+
+def _page(title: str, body: str, head: str = "") -> str:
+    return f"<!DOCTYPE html><html><head><meta charset='utf-8'><title>{title}</title>{head}</head><body>{body}</body></html>"
+
+
+def _small() -> str:
+    facts = "".join(f"<li>Fact number {i}: the value is {i * 7}.</li>" for i in range(10))
+    paragraphs = "".join(f"<p>Paragraph {i} of a short article with a little text.</p>" for i in range(12))
+    return _page("Small", f"<h1 id='title'>Small fixture</h1><ul id='facts'>{facts}</ul>{paragraphs}")
+
+
+def _huge() -> str:
+    rows = "".join(
+        f"<tr id='row-{i}'><td>{i}</td><td>Product {i}</td><td>{i * 1.25:.2f} EUR</td>"
+        f"<td class='description'>{'Lorem ipsum dolor sit amet, consectetur adipiscing elit. ' * 3}</td></tr>"
+        for i in range(20000)
+    )
+    return _page("Huge", f"<h1 id='title'>Huge fixture</h1><table><tbody>{rows}</tbody></table>")
+
+
+def _js_heavy() -> str:
+    # Inline data the script has to parse before it can render anything
+    data = ",".join(f'{{"id":{i},"label":"Item {i}","tags":["a","b","c"]}}' for i in range(8000))
+    script = f"""
+<script>
+const DATA = [{data}];
+setTimeout(() => {{
+    const app = document.getElementById('app');
+    const title = document.createElement('h1');
+    title.id = 'title';
+    title.textContent = 'JS-heavy fixture';
+    app.appendChild(title);
+    const list = document.createElement('ul');
+    for (const item of DATA.slice(0, 500)) {{
+        const li = document.createElement('li');
+        li.textContent = item.label + ' (' + item.tags.join(', ') + ')';
+        list.appendChild(li);
+    }}
+    app.appendChild(list);
+}}, 50);
+</script>"""
+    return _page("JS-heavy", "<div id='app'></div>" + script)
+
+
+def _nested() -> str:
+    def branch(index: int) -> str:
+        opening = "".join(f"<div data-depth='{d}' data-branch='{index}'>" for d in range(200))
+        return opening + f"<span class='leaf' data-branch='{index}'>Leaf {index}</span>" + "</div>" * 200
+    return _page("Nested", "".join(branch(i) for i in range(50)))
+
+
+_BUILDERS = {"small": _small, "huge": _huge, "js_heavy": _js_heavy, "nested": _nested}
+
+
+@lru_cache(maxsize=None)
+def render_fixture(name: str) -> bytes:
+    return _BUILDERS[name]().encode("utf-8")
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        # The query string only makes URLs unique so nothing is served from a cache
+        name = urlsplit(self.path).path.strip("/")
+        if name not in FIXTURES:
+            self.send_error(404)
+            return
+        body = render_fixture(name)
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class CorpusServer:
+    """
+    Serves the fixture pages from a local HTTP server on a free port, so
+    benchmarks never touch the network. Use as a context manager.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0):
+        self.address: Tuple[str, int] = (host, port)
+        self._server = None
+        self._thread = None
+
+    def url(self, name: str, nonce: int = 0) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/{name}?n={nonce}"
+
+    def __enter__(self) -> "CorpusServer":
+        for name in FIXTURES:
+            # Build every page up front so generating them is not measured
+            render_fixture(name)
+        self._server = ThreadingHTTPServer(self.address, _Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
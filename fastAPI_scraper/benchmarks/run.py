@@ -0,0 +1,328 @@
+"""
+Offline benchmark of the scraping pipeline against the fixture corpus.
+
+Run from the fastAPI_scraper directory:
+
+    python -m benchmarks.run --output before.json
+    python -m benchmarks.run --output after.json --compare before.json
+
+Every page is served by a local HTTP server (see `benchmarks.corpus`), so
+no network access is needed; Chromium must be installed (`playwright install`).
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence
+
+try:
+    import psutil
+except ImportError:  # optional; peak RSS then comes from getrusage and misses live browser processes
+    psutil = None
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+from app import scraper as s
+from scraper_common.timeouts import percentile
+
+from .corpus import FIXTURES, CorpusServer
+
+SCENARIOS = ("txt", "html", "batch")
+API_TOKEN = "benchmark"
+
+
+class PeakRss:
+    """
+    Tracks the peak resident memory of this process and its children
+    (the browsers) while the block runs, in bytes.
+
+    With psutil the whole process tree is sampled every `interval` seconds.
+    Without it, the high-water marks of `getrusage` are used; those only
+    grow, so they report the peak since the benchmark started.
+    """
+
+    def __init__(self, interval: float = 0.05):
+        self.interval = interval
+        self.peak = 0
+        self.source = "psutil" if psutil is not None else "getrusage" if resource is not None else None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _sample(self) -> int:
+        if psutil is not None:
+            process = psutil.Process()
+            total = process.memory_info().rss
+            for child in process.children(recursive=True):
+                try:
+                    total += child.memory_info().rss
+                except psutil.Error:
+                    pass
+            return total
+        if resource is not None:
+            # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+            scale = 1 if sys.platform == "darwin" else 1024
+            return (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+                    + resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss) * scale
+        return 0
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, self._sample())
+
+    def __enter__(self) -> "PeakRss":
+        self.peak = self._sample()
+        if psutil is not None:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.peak = max(self.peak, self._sample())
+
+
+def summarize(scenario: str, page: str, latencies: List[float], pages: int, errors: int, elapsed: float, rss: PeakRss) -> dict:
+    """
+    Reduces the measured request latencies (in seconds) of one scenario to its report entry.
+    """
+    return {
+        "scenario": scenario,
+        "page": page,
+        "requests": len(latencies),
+        "pages": pages,
+        "errors": errors,
+        "elapsed_s": round(elapsed, 3),
+        "pages_per_sec": round(pages / elapsed, 2) if elapsed else None,
+        "latency_ms": {
+            "p50": round(percentile(latencies, 50) * 1000, 1),
+            "p99": round(percentile(latencies, 99) * 1000, 1),
+            "mean": round(sum(latencies) / len(latencies) * 1000, 1),
+            "max": round(max(latencies) * 1000, 1),
+        } if latencies else None,
+        "peak_rss_bytes": rss.peak,
+        "rss_source": rss.source,
+    }
+
+
+async def bench_function(
+    scrape: Callable,
+    scenario: str,
+    pool: s.BrowserPool,
+    server: CorpusServer,
+    page: str,
+    requests: int,
+    concurrency: int,
+    warmup: int,
+) -> dict:
+    """
+    Calls `scrape_content_txt` or `scrape_content_html` `requests` times on
+    one fixture, `concurrency` at a time, each on a fresh URL.
+    """
+    fixture = FIXTURES[page]
+    xpath = fixture.txt_xpath if scenario == "txt" else fixture.html_xpath
+    for i in range(warmup):
+        await scrape(pool, server.url(page, -1 - i), xpath)
+
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    errors = 0
+
+    async def one(nonce: int) -> None:
+        nonlocal errors
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                found = await scrape(pool, server.url(page, nonce), xpath)
+            except Exception:
+                found = None
+            latencies.append(time.perf_counter() - started)
+            if not found:
+                errors += 1
+
+    with PeakRss() as rss:
+        started = time.perf_counter()
+        await asyncio.gather(*(one(nonce) for nonce in range(requests)))
+        elapsed = time.perf_counter() - started
+    return summarize(scenario, page, latencies, requests, errors, elapsed, rss)
+
+
+async def run_functions(args: argparse.Namespace, server: CorpusServer) -> List[dict]:
+    scrapers = {"txt": s.scrape_content_txt, "html": s.scrape_content_html}
+    pool = s.BrowserPool(size=args.pool_size, contexts_per_browser=args.contexts_per_browser)
+    await pool.start()
+    try:
+        results = []
+        for scenario in (name for name in args.scenarios if name in scrapers):
+            for page in args.pages:
+                results.append(await bench_function(
+                    scrapers[scenario], scenario, pool, server, page, args.requests, args.concurrency, args.warmup
+                ))
+                log_result(results[-1])
+        return results
+    finally:
+        await pool.stop()
+
+
+def run_batches(args: argparse.Namespace, server: CorpusServer) -> List[dict]:
+    """
+    Posts `batches` requests of `batch_size` tasks each to /scrape/batch on
+    an in-process instance of the API, one fixture at a time.
+    """
+    # Read by app.main at import. The corpus is one host, so politeness limits would only measure themselves.
+    os.environ.setdefault("SCRAPER_API_TOKEN", API_TOKEN)
+    os.environ.setdefault("SCRAPER_HOST_OVERRIDES", json.dumps({"127.0.0.1": {"max_concurrency": 64, "min_interval": 0}}))
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    headers = {"Authorization": f"Bearer {os.environ['SCRAPER_API_TOKEN']}"}
+    nonces = iter(range(sys.maxsize))
+    results = []
+    with TestClient(app) as client:
+        for page in args.pages:
+            fixture = FIXTURES[page]
+
+            def post() -> List[dict]:
+                tasks = [
+                    {"url": server.url(page, next(nonces)), "xpath": fixture.txt_xpath, "no_cache": True}
+                    for _ in range(args.batch_size)
+                ]
+                response = client.post("/scrape/batch", json={"tasks": tasks}, headers=headers, timeout=None)
+                response.raise_for_status()
+                return response.json()["results"]
+
+            for _ in range(args.warmup):
+                post()
+            latencies: List[float] = []
+            errors = 0
+            with PeakRss() as rss:
+                started = time.perf_counter()
+                for _ in range(args.batches):
+                    request_started = time.perf_counter()
+                    try:
+                        errors += sum(1 for result in post() if result["status"] != "success")
+                    except Exception:
+                        errors += args.batch_size
+                    latencies.append(time.perf_counter() - request_started)
+                elapsed = time.perf_counter() - started
+            results.append(summarize("batch", page, latencies, args.batches * args.batch_size, errors, elapsed, rss))
+            log_result(results[-1])
+    return results
+
+
+def log_result(result: dict) -> None:
+    latency = result["latency_ms"] or {}
+    print(
+        f"{result['scenario']:>5} {result['page']:<9} {result['pages_per_sec'] or 0:>8.2f} pages/s"
+        f"  p50 {latency.get('p50', 0):>8.1f} ms  p99 {latency.get('p99', 0):>8.1f} ms"
+        f"  peak RSS {result['peak_rss_bytes'] / 2 ** 20:>7.1f} MB  errors {result['errors']}",
+        file=sys.stderr,
+    )
+
+
+def git_revision() -> Optional[dict]:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(["git", "status", "--porcelain"], capture_output=True, text=True, check=True).stdout.strip())
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return {"commit": commit, "dirty": dirty}
+
+
+def compare(current: dict, baseline: dict, max_regression: float) -> List[str]:
+    """
+    Compares two reports and returns a description of every scenario whose
+    throughput dropped, or p99 latency rose, by more than `max_regression`
+    (a fraction, e.g. 0.1 for 10%).
+    """
+    before = {(r["scenario"], r["page"]): r for r in baseline["results"]}
+    regressions = []
+    for result in current["results"]:
+        old = before.get((result["scenario"], result["page"]))
+        if old is None or not old["pages_per_sec"] or not result["pages_per_sec"]:
+            continue
+        label = f"{result['scenario']}/{result['page']}"
+        throughput = result["pages_per_sec"] / old["pages_per_sec"] - 1
+        p99 = result["latency_ms"]["p99"] / old["latency_ms"]["p99"] - 1 if old["latency_ms"]["p99"] else 0
+        print(f"{label:<16} pages/s {throughput:+7.1%}  p99 {p99:+7.1%}", file=sys.stderr)
+        if throughput < -max_regression:
+            regressions.append(f"{label}: pages/s {old['pages_per_sec']} -> {result['pages_per_sec']}")
+        if p99 > max_regression:
+            regressions.append(f"{label}: p99 {old['latency_ms']['p99']} ms -> {result['latency_ms']['p99']} ms")
+    return regressions
+
+
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark the scraper against local fixture pages.")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help=f"comma-separated, from: {', '.join(SCENARIOS)}")
+    parser.add_argument("--pages", default=",".join(FIXTURES), help=f"comma-separated, from: {', '.join(FIXTURES)}")
+    parser.add_argument("--requests", type=int, default=20, help="scrape_content_* calls per page (default 20)")
+    parser.add_argument("--concurrency", type=int, default=4, help="scrape_content_* calls in flight (default 4)")
+    parser.add_argument("--batches", type=int, default=5, help="/scrape/batch requests per page (default 5)")
+    parser.add_argument("--batch-size", type=int, default=10, help="tasks per /scrape/batch request (default 10)")
+    parser.add_argument("--warmup", type=int, default=1, help="unmeasured requests per page before measuring (default 1)")
+    parser.add_argument("--pool-size", type=int, default=2, help="browsers for the scrape_content_* scenarios (default 2)")
+    parser.add_argument("--contexts-per-browser", type=int, default=2, help="contexts per browser (default 2)")
+    parser.add_argument("--output", help="write the JSON report here instead of to stdout")
+    parser.add_argument("--compare", help="a previous JSON report to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.1,
+                        help="with --compare, exit with status 1 if pages/s drops or p99 rises by more than this fraction (default 0.1)")
+    args = parser.parse_args(argv)
+    args.scenarios = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    args.pages = [name.strip() for name in args.pages.split(",") if name.strip()]
+    for name in args.scenarios:
+        if name not in SCENARIOS:
+            parser.error(f"Unknown scenario '{name}'.")
+    for name in args.pages:
+        if name not in FIXTURES:
+            parser.error(f"Unknown page '{name}'.")
+    return args
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    args = parse_args(argv)
+    report: Dict[str, object] = {
+        "meta": {
+            "started_at": datetime.now(timezone.utc).isoformat(),
+            "git": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "fixtures": {name: fixture.description for name, fixture in FIXTURES.items()},
+            "options": {key: value for key, value in vars(args).items() if key not in ("output", "compare")},
+        },
+        "results": [],
+    }
+    with CorpusServer() as server:
+        if any(name in ("txt", "html") for name in args.scenarios):
+            report["results"] += asyncio.run(run_functions(args, server))
+        if "batch" in args.scenarios:
+            report["results"] += run_batches(args, server)
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(text + "\n")
+    else:
+        print(text)
+
+    if args.compare:
+        regressions = compare(report, json.loads(Path(args.compare).read_text()), args.max_regression)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,72 @@
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+
+import httpx
+
+
+class FakeResponse:
+    status = 200
+
+    async def header_value(self, name):
+        return None
+
+
+class FakePage:
+    """
+    Stands in for a Playwright page: "renders" the HTML given for each URL.
+    """
+
+    def __init__(self, pages, hold=None):
+        self.pages = pages
+        self.hold = hold
+        self.url = None
+
+    async def route(self, pattern, handler):
+        pass
+
+    async def goto(self, url, timeout=None, wait_until=None):
+        self.url = url
+        if self.hold is not None:
+            # Keeps the page loading until the test sets the event
+            await self.hold.wait()
+        return FakeResponse()
+
+    async def wait_for_load_state(self, state, timeout=None):
+        pass
+
+    async def wait_for_function(self, js, arg=None, timeout=None, polling=None):
+        pass
+
+    async def content(self):
+        return self.pages[self.url]
+
+
+class FakePool:
+    capacity = 2
+
+    def __init__(self, pages, hold=None):
+        self.pages = pages
+        self.hold = hold
+        self.renders = []
+
+    @asynccontextmanager
+    async def page(self):
+        page = FakePage(self.pages, self.hold)
+        try:
+            yield page
+        finally:
+            self.renders.append(page.url)
+
+
+def static_client(bodies):
+    """
+    An httpx client answering every GET with 200 and the body given for its URL.
+    """
+    def handler(request):
+        return httpx.Response(200, text=bodies[str(request.url)], headers={"content-type": "text/html"})
+
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
+def task(url, xpath="//h1", data_type="TXT", id=None):
+    return SimpleNamespace(id=id, url=url, xpath=xpath, data_type=data_type)
@@ -0,0 +1,143 @@
+import asyncio
+
+from app.scraper.breaker import CLOSED, HALF_OPEN, OPEN, BreakerPolicy, CircuitBreaker
+from app.scraper.engine import ScrapeEngine
+
+from .fakes import FakePool, task
+
+POLICY = BreakerPolicy(window=4, min_requests=2, failure_ratio=0.5, open_for=30, half_open_probes=1, probe_timeout=60)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def tripped():
+    clock = FakeClock()
+    breaker = CircuitBreaker(POLICY, clock=clock)
+    for _ in range(2):
+        breaker.record("a.test", False, breaker.allow("a.test"))
+    return breaker, clock
+
+
+def state(breaker, host="a.test"):
+    return breaker.snapshot()[host]["state"]
+
+
+def test_stays_closed_below_the_failure_ratio():
+    breaker = CircuitBreaker(POLICY, clock=FakeClock())
+    for success in (True, True, True, False):
+        permit = breaker.allow("a.test")
+        assert permit
+        breaker.record("a.test", success, permit)
+    assert state(breaker) == CLOSED
+
+
+def test_opens_and_rejects_until_open_for_has_passed():
+    breaker, clock = tripped()
+    assert state(breaker) == OPEN
+    assert not breaker.allow("a.test")
+    clock.now += 29
+    assert not breaker.allow("a.test")
+    assert breaker.snapshot()["a.test"]["rejected"] == 2
+
+
+def test_half_open_probe_that_loads_closes_the_circuit():
+    breaker, clock = tripped()
+    clock.now += 30
+    probe = breaker.allow("a.test")
+    assert probe and probe.probe
+    assert state(breaker) == HALF_OPEN
+    assert not breaker.allow("a.test"), "only one probe at a time"
+    breaker.record("a.test", True, probe)
+    assert state(breaker) == CLOSED
+    assert breaker.allow("a.test")
+
+
+def test_half_open_probe_that_fails_reopens_the_circuit():
+    breaker, clock = tripped()
+    clock.now += 30
+    breaker.record("a.test", False, breaker.allow("a.test"))
+    assert state(breaker) == OPEN
+    assert breaker.snapshot()["a.test"]["trips"] == 2
+    assert not breaker.allow("a.test")
+
+
+def test_released_probe_lets_another_probe_through():
+    breaker, clock = tripped()
+    clock.now += 30
+    breaker.release("a.test", breaker.allow("a.test"))
+    assert state(breaker) == HALF_OPEN
+    assert breaker.allow("a.test")
+
+
+def test_lost_probe_is_replaced_after_probe_timeout():
+    breaker, clock = tripped()
+    clock.now += 30
+    assert breaker.allow("a.test")
+    clock.now += 59
+    assert not breaker.allow("a.test")
+    clock.now += 1
+    assert breaker.allow("a.test")
+
+
+def test_late_outcome_of_a_load_allowed_before_the_circuit_opened_is_ignored():
+    breaker = CircuitBreaker(POLICY, clock=FakeClock())
+    early = breaker.allow("a.test")
+    clock = breaker.clock
+    for _ in range(2):
+        breaker.record("a.test", False, breaker.allow("a.test"))
+    clock.now += 30
+    probe = breaker.allow("a.test")
+    assert probe and state(breaker) == HALF_OPEN
+    breaker.record("a.test", True, early)
+    assert state(breaker) == HALF_OPEN, "only the probe closes a half-open circuit"
+    breaker.release("a.test", early)
+    assert not breaker.allow("a.test"), "releasing a non-probe frees no probe"
+    breaker.record("a.test", False, probe)
+    assert state(breaker) == OPEN
+
+
+def test_lost_probe_reporting_late_is_ignored():
+    breaker, clock = tripped()
+    clock.now += 30
+    lost = breaker.allow("a.test")
+    clock.now += 60
+    probe = breaker.allow("a.test")
+    assert probe
+    breaker.record("a.test", False, lost)
+    assert state(breaker) == HALF_OPEN
+    breaker.record("a.test", True, probe)
+    assert state(breaker) == CLOSED
+
+
+def test_release_outside_half_open_changes_nothing():
+    breaker = CircuitBreaker(POLICY, clock=FakeClock())
+    breaker.release("a.test", breaker.allow("a.test"))
+    assert state(breaker) == CLOSED
+
+
+def test_cancelled_probe_is_released_by_the_engine():
+    pages = {"http://a.test/": "<html><body><h1>a</h1></body></html>"}
+    breaker, clock = tripped()
+    clock.now += 30
+
+    async def run():
+        hold = asyncio.Event()
+        engine = ScrapeEngine(FakePool(pages, hold=hold), breaker=breaker)
+        probe = asyncio.create_task(engine.scrape(task("http://a.test/")))
+        await asyncio.sleep(0.05)
+        assert state(breaker) == HALF_OPEN and not breaker.allow("a.test")
+        probe.cancel()
+        await asyncio.gather(probe, return_exceptions=True)
+        # The next page is the new probe, and loading it closes the circuit
+        hold.set()
+        return await engine.scrape(task("http://a.test/"))
+
+    result = asyncio.run(run())
+    assert result["status"] == "success"
+    assert state(breaker) == CLOSED
@@ -0,0 +1,34 @@
+import asyncio
+
+from app.scraper.engine import ScrapeEngine
+
+from .fakes import FakePool, static_client, task
+
+
+def test_empty_static_body_falls_back_to_the_browser():
+    pages = {"http://a.test/": "<html><body><h1>rendered</h1></body></html>"}
+    pool = FakePool(pages)
+
+    async def run():
+        async with static_client({"http://a.test/": "  "}) as client:
+            engine = ScrapeEngine(pool, http_client=client)
+            return await engine.run_batch([task("http://a.test/")])
+
+    [result] = asyncio.run(run())
+    assert result["status"] == "success"
+    assert result["scraped_data"] == "rendered"
+    assert result["tier"] == "browser"
+    assert pool.renders == ["http://a.test/"]
+
+
+def test_empty_page_fails_only_its_own_tasks():
+    pages = {"http://a.test/": "", "http://b.test/": "<html><body><h1>b</h1></body></html>"}
+
+    async def run():
+        async with static_client({"http://a.test/": "", "http://b.test/": ""}) as client:
+            engine = ScrapeEngine(FakePool(pages), http_client=client)
+            return await engine.run_batch([task("http://a.test/"), task("http://b.test/")])
+
+    first, second = asyncio.run(run())
+    assert first["status"] == "failed"
+    assert second["status"] == "success"
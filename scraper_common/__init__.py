@@ -0,0 +1,3 @@
+# Code shared by the FastAPI scraper service and the Django app's run_scraper
+# command, so both fingerprint scraped data and learn page timeouts the same way.
+# Each project puts the repository root on sys.path to import it.
@@ -0,0 +1,112 @@
+import hashlib
+import re
+from dataclasses import dataclass, field
+from typing import FrozenSet, List, Pattern, Tuple
+
+from lxml import etree, html
+
+# Attributes that change between page loads without the content changing:
+# CSP nonces, framework bookkeeping, CSRF tokens and request ids.
+VOLATILE_ATTRIBUTES = frozenset({
+    "nonce",
+    "data-reactid",
+    "data-react-checksum",
+    "data-reactroot",
+    "data-csrf",
+    "data-csrf-token",
+    "data-token",
+    "data-request-id",
+    "data-timestamp",
+    "data-nonce",
+    "jsaction",
+    "jscontroller",
+    "jsmodel",
+})
+# Generated attribute names, e.g. Vue's scoped-style markers ("data-v-1a2b3c4d")
+VOLATILE_ATTRIBUTE_PATTERNS = (r"^data-v-[0-9a-f]{6,}$",)
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+@dataclass(frozen=True)
+class Normalization:
+    """
+    How scraped data is normalized before it is fingerprinted.
+
+    `collapse_whitespace` turns every run of whitespace into a single
+    space and trims it around tags, so re-indentation and `pretty_print`
+    line breaks do not count as changes. For HTML, `sort_attributes`
+    ignores the order attributes are written in, and attributes named in
+    `strip_attributes` or matching `strip_attribute_patterns` are left out
+    entirely.
+    """
+    collapse_whitespace: bool = True
+    sort_attributes: bool = True
+    strip_attributes: FrozenSet[str] = VOLATILE_ATTRIBUTES
+    strip_attribute_patterns: Tuple[str, ...] = VOLATILE_ATTRIBUTE_PATTERNS
+    _compiled: Tuple[Pattern, ...] = field(default=(), init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        object.__setattr__(self, "_compiled", tuple(re.compile(p) for p in self.strip_attribute_patterns))
+
+    def keeps_attribute(self, name: str) -> bool:
+        return name not in self.strip_attributes and not any(p.search(name) for p in self._compiled)
+
+    def text(self, value: str) -> str:
+        return _WHITESPACE_RE.sub(" ", value).strip() if self.collapse_whitespace else value
+
+
+def fingerprint(scraped_data: str, data_type: str, normalization: Normalization = Normalization()) -> str:
+    """
+    Returns the SHA-256 hex digest of scraped data after normalizing it.
+
+    Two results with the same fingerprint are considered unchanged, so
+    callers can compare 64-character hashes instead of full payloads.
+
+    Args:
+        scraped_data (str): The text or HTML returned for a task.
+        data_type (str): "TXT" or "HTML".
+        normalization (Normalization): What to ignore when comparing results.
+
+    Returns:
+        str: The hex digest of the normalized data.
+    """
+    if data_type.upper() == "HTML":
+        normalized = _normalize_html(scraped_data, normalization)
+    else:
+        normalized = normalization.text(scraped_data)
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+def _normalize_html(fragment: str, normalization: Normalization) -> str:
+    try:
+        parts = html.fragments_fromstring(fragment)
+    except (etree.ParserError, ValueError):
+        # Not parseable as markup; fingerprint it as text
+        return normalization.text(fragment)
+    out: List[str] = []
+    for part in parts:
+        if isinstance(part, str):
+            out.append(normalization.text(part))
+        else:
+            _serialize(part, normalization, out)
+    return "".join(out)
+
+
+def _serialize(element, normalization: Normalization, out: List[str]) -> None:
+    """
+    Writes a canonical form of the element: comments and processing
+    instructions are dropped, attributes filtered and optionally sorted.
+    """
+    if isinstance(element.tag, str):
+        attributes = [(k, v) for k, v in element.attrib.items() if normalization.keeps_attribute(k)]
+        if normalization.sort_attributes:
+            attributes.sort()
+        out.append("<" + element.tag + "".join(f' {k}="{v}"' for k, v in attributes) + ">")
+        if element.text:
+            out.append(normalization.text(element.text))
+        for child in element:
+            _serialize(child, normalization, out)
+        out.append(f"</{element.tag}>")
+    if element.tail:
+        out.append(normalization.text(element.tail))
@@ -0,0 +1,72 @@
+import math
+import threading
+from collections import deque
+from typing import Deque, Dict, Sequence
+
+
+def percentile(samples: Sequence[float], q: float) -> float:
+    """
+    Returns the nearest-rank `q` percentile (0-100) of a non-empty sequence.
+    """
+    ordered = sorted(samples)
+    return ordered[max(0, math.ceil(q / 100 * len(ordered)) - 1)]
+
+
+class TimeoutLearner:
+    """
+    Learns how long pages of each domain take to load and derives render timeouts from it.
+
+    The last `window` load times of a domain are kept; once `min_samples`
+    are known, its timeout is their 95th percentile times `headroom`,
+    clamped to [`minimum`, `maximum`]. Until then `default` is used. Loads
+    that time out are recorded too, so a domain that keeps hitting its
+    timeout has it raised step by step instead of failing forever.
+    All durations are in seconds.
+    """
+
+    def __init__(
+        self,
+        default: float = 15.0,
+        minimum: float = 3.0,
+        maximum: float = 60.0,
+        headroom: float = 1.5,
+        window: int = 50,
+        min_samples: int = 5,
+    ):
+        if not 0 < minimum <= default <= maximum:
+            raise ValueError("Render timeouts must satisfy 0 < minimum <= default <= maximum.")
+        self.default = default
+        self.minimum = minimum
+        self.maximum = maximum
+        self.headroom = headroom
+        self.window = window
+        self.min_samples = min_samples
+        self._samples: Dict[str, Deque[float]] = {}
+        self._lock = threading.Lock()
+
+    def timeout_for(self, domain: str) -> float:
+        with self._lock:
+            samples = self._samples.get(domain)
+            if samples is None or len(samples) < self.min_samples:
+                return self.default
+            learned = percentile(samples, 95) * self.headroom
+        return min(self.maximum, max(self.minimum, learned))
+
+    def record(self, domain: str, seconds: float) -> None:
+        with self._lock:
+            samples = self._samples.get(domain)
+            if samples is None:
+                samples = self._samples[domain] = deque(maxlen=self.window)
+            samples.append(seconds)
+
+    def snapshot(self) -> Dict[str, dict]:
+        with self._lock:
+            domains = {domain: list(samples) for domain, samples in self._samples.items()}
+        return {
+            domain: {
+                "samples": len(samples),
+                "p95": round(percentile(samples, 95), 3),
+                "timeout": round(self.timeout_for(domain), 3),
+            }
+            for domain, samples in domains.items()
+        }